@@ -0,0 +1,190 @@
+from datetime import datetime, timedelta
+from functools import reduce
+import operator
+from sqlalchemy import func, select, delete, cast, text, Date
+from sqlalchemy.dialects.postgresql import array
+from models import UserActivity, Transaction
+from utils.clock import limit_day, local_time, utc_offset
+from config import Config
+
+class ActivityTracker:
+    """
+    Per-user daily activity buckets backing the rolling-window detectors
+    Bucket days and hours are server-local, like daily limits (utils.clock)
+    """
+
+    # Evict this user's expired buckets and fold one purchase (or a pre-merged
+    # group of purchases) into the bucket for its day, in a single statement
+    UPSERT_SQL = text("""
+        WITH evicted AS (
+            DELETE FROM user_activity
+            WHERE user_id = :user_id AND bucket_date < :expires_before
+        )
+        INSERT INTO user_activity (
+            user_id, bucket_date, purchase_count, total_units,
+            bulk_purchase_count, bulk_volume_ml, hour_counts
+        )
+        VALUES (
+            :user_id, :bucket_date, :purchase_count, :total_units,
+            :bulk_purchase_count, :bulk_volume_ml, CAST(:hour_counts AS integer[])
+        )
+        ON CONFLICT (user_id, bucket_date) DO UPDATE SET
+            purchase_count = user_activity.purchase_count + EXCLUDED.purchase_count,
+            total_units = user_activity.total_units + EXCLUDED.total_units,
+            bulk_purchase_count = user_activity.bulk_purchase_count + EXCLUDED.bulk_purchase_count,
+            bulk_volume_ml = user_activity.bulk_volume_ml + EXCLUDED.bulk_volume_ml,
+            hour_counts = ARRAY(
+                SELECT a + b
+                FROM unnest(user_activity.hour_counts, EXCLUDED.hour_counts)
+                    WITH ORDINALITY AS h(a, b, slot)
+                ORDER BY slot
+            )
+    """)
+
+    @staticmethod
+    def window_start(days):
+        """First bucket date of a window of `days` calendar days ending today"""
+        return limit_day() - timedelta(days=days - 1)
+
+    @staticmethod
+    def expiry_date():
+        """Buckets dated before this are outside every detection window"""
+        return ActivityTracker.window_start(Config.ACTIVITY_RETENTION_DAYS)
+
+    @staticmethod
+    def hours(start, end):
+        """SQL expression summing the hour-of-day histogram over [start, end)"""
+        return reduce(operator.add, [UserActivity.hour_counts[h + 1] for h in range(start, end)])
+
+    @staticmethod
+    def bucket_params(user_id, units, quantity_ml, purchased_at):
+        """Bind parameters for folding a single purchase into its bucket"""
+        local = local_time(purchased_at)
+        hour_counts = [0] * 24
+        hour_counts[local.hour] = 1
+        is_bulk = bool(quantity_ml and quantity_ml > Config.BULK_PURCHASE_THRESHOLD_ML)
+
+        return {
+            'user_id': user_id,
+            'bucket_date': local.date(),
+            'purchase_count': 1,
+            'total_units': units or 0,
+            'bulk_purchase_count': 1 if is_bulk else 0,
+            'bulk_volume_ml': quantity_ml if is_bulk else 0,
+            'hour_counts': hour_counts,
+            'expires_before': ActivityTracker.expiry_date()
+        }
+
+    @staticmethod
+    def record_purchase(user_id, units, quantity_ml, purchased_at, db_session):
+        """Add a purchase to the user's rolling aggregates in O(1)"""
+        db_session.execute(
+            ActivityTracker.UPSERT_SQL,
+            ActivityTracker.bucket_params(user_id, units, quantity_ml, purchased_at)
+        )
+
+    @staticmethod
+    def record_purchases(purchases, db_session):
+        """
+        Fold many (user_id, units, quantity_ml, purchased_at) purchases into
+        their buckets, merged per (user, day) so each bucket is written once
+        Purchases already outside the retention window are skipped
+        """
+        expires_before = ActivityTracker.expiry_date()
+        buckets = {}
+        for user_id, units, quantity_ml, purchased_at in purchases:
+            if limit_day(purchased_at) < expires_before:
+                continue
+            params = ActivityTracker.bucket_params(user_id, units, quantity_ml, purchased_at)
+            merged = buckets.get((user_id, params['bucket_date']))
+            if merged is None:
+                buckets[(user_id, params['bucket_date'])] = params
+                continue
+            for key in ('purchase_count', 'total_units', 'bulk_purchase_count', 'bulk_volume_ml'):
+                merged[key] += params[key]
+            merged['hour_counts'] = [a + b for a, b in zip(merged['hour_counts'], params['hour_counts'])]
+
+        if buckets:
+            db_session.execute(ActivityTracker.UPSERT_SQL, list(buckets.values()))
+        return len(buckets)
+
+    @staticmethod
+    def window_totals(user_id, days, db_session, **columns):
+        """
+        Aggregate named SQL expressions over a user's last `days` buckets
+        Returns a row mapping with one key per keyword argument
+        """
+        stmt = select(*[
+            func.coalesce(func.sum(expr), 0).label(name)
+            for name, expr in columns.items()
+        ]).where(
+            UserActivity.user_id == user_id,
+            UserActivity.bucket_date >= ActivityTracker.window_start(days)
+        )
+        return db_session.execute(stmt).mappings().one()
+
+    @staticmethod
+    def evict_expired(db_session):
+        """Drop every bucket that has aged out of the retention window"""
+        result = db_session.execute(
+            delete(UserActivity).where(UserActivity.bucket_date < ActivityTracker.expiry_date())
+        )
+        db_session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def rebuild(db_session, user_id=None):
+        """
+        Recompute buckets in the retention window from transactions, for
+        every user or just one
+        """
+        offset = utc_offset()
+        local = Transaction.transaction_date + offset
+        bucket_date = cast(local, Date)
+        hour = func.extract('hour', local)
+        is_bulk = Transaction.quantity_ml > Config.BULK_PURCHASE_THRESHOLD_ML
+
+        buckets = select(
+            Transaction.user_id,
+            bucket_date,
+            func.count(Transaction.transaction_id),
+            func.coalesce(func.sum(Transaction.units), 0),
+            func.count().filter(is_bulk),
+            func.coalesce(func.sum(Transaction.quantity_ml).filter(is_bulk), 0),
+            array([func.count().filter(hour == h) for h in range(24)])
+        ).where(
+            Transaction.transaction_date >= datetime.combine(ActivityTracker.expiry_date(), datetime.min.time()) - offset
+        ).group_by(Transaction.user_id, bucket_date)
+
+        clear = delete(UserActivity)
+        if user_id is not None:
+            buckets = buckets.where(Transaction.user_id == user_id)
+            clear = clear.where(UserActivity.user_id == user_id)
+
+        db_session.execute(clear)
+        result = db_session.execute(
+            UserActivity.__table__.insert().from_select([
+                'user_id', 'bucket_date', 'purchase_count', 'total_units',
+                'bulk_purchase_count', 'bulk_volume_ml', 'hour_counts'
+            ], buckets)
+        )
+        db_session.commit()
+        return result.rowcount
+
+
+if __name__ == '__main__':
+    import sys
+    from database import Session
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'rebuild'
+    db = Session()
+    try:
+        if command == 'rebuild':
+            print(f"✅ Rebuilt {ActivityTracker.rebuild(db)} activity buckets")
+        elif command == 'evict':
+            print(f"✅ Evicted {ActivityTracker.evict_expired(db)} expired activity buckets")
+        else:
+            print(f"Unknown command: {command} (expected 'rebuild' or 'evict')")
+            sys.exit(1)
+    finally:
+        db.close()
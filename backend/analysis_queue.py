@@ -0,0 +1,171 @@
+import queue
+import threading
+import time
+from database import Session
+from models import Alert, Transaction, User, Shop
+from risk_engine import RiskEngine
+from utils.dashboard_stats import DashboardStats
+from utils.query_budget import QueryBudget
+from utils.read_cache import TableVersions
+from config import Config
+
+class AnalysisQueue:
+    """
+    In-process work queue for post-purchase risk scoring and pattern detection
+    Workers run as threads (green threads under the eventlet worker) and push
+    their results over the Socket.IO broadcast helpers once committed
+    """
+
+    def __init__(self, workers=2, maxsize=10000):
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._lock = threading.Lock()
+        self.broadcast_transaction = None
+        self.broadcast_alert = None
+
+        # Metrics
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.ran_inline = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def init_app(self, app):
+        """Bind to the app's broadcast helpers and expose as app.analysis_queue"""
+        self.broadcast_transaction = app.broadcast_transaction
+        self.broadcast_alert = app.broadcast_alert
+        app.analysis_queue = self
+
+    def _ensure_started(self):
+        """Start worker threads on first use rather than at import time"""
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                worker = threading.Thread(
+                    target=self._run, name=f"analysis-worker-{i}", daemon=True
+                )
+                worker.start()
+                self._threads.append(worker)
+
+    def submit(self, user_id, transaction_id):
+        """
+        Queue analysis for a committed purchase
+        Falls back to running inline when async analysis is disabled or the
+        queue is full, so no purchase is ever left unscored
+        """
+        job = (user_id, transaction_id, time.monotonic())
+
+        if not Config.ASYNC_ANALYSIS:
+            with QueryBudget.detached():
+                self._process(job)
+            return False
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.ran_inline += 1
+            with QueryBudget.detached():
+                self._process(job)
+            return False
+
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._process(job)
+            finally:
+                self._queue.task_done()
+
+    def _process(self, job):
+        user_id, transaction_id, enqueued_at = job
+        lag = time.monotonic() - enqueued_at
+        with self._lock:
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+
+        db = Session()
+        try:
+            score, level, factors = RiskEngine.calculate_risk_score(user_id, db)
+            patterns = RiskEngine.run_pattern_detection(user_id, db)
+            alerts = [obj for obj in db.new if isinstance(obj, Alert)]
+            TableVersions.bump(db, 'users')
+            db.commit()
+
+            transaction = db.get(Transaction, transaction_id)
+            user = db.get(User, user_id)
+            shop = db.get(Shop, transaction.shop_id) if transaction else None
+            transaction_data = {
+                'transaction': transaction.to_dict() if transaction else None,
+                'district': shop.district if shop else None,
+                'user': {
+                    'user_id': user.user_id,
+                    'name': user.name,
+                    'risk_level': user.risk_level,
+                    'risk_score': user.risk_score
+                },
+                'patterns': [{'type': p[0], 'confidence': p[1]} for p in patterns]
+            }
+            alert_data = [alert.to_dict() for alert in alerts]
+
+            # A level change raises an alert and a first detection inserts a
+            # flag; repeat detections only refresh the open flag, so the
+            # dashboard counts stay valid
+            if alerts or any(new_flag for _, _, new_flag in patterns):
+                DashboardStats.invalidate()
+
+            with self._lock:
+                self.processed += 1
+        except Exception as e:
+            db.rollback()
+            with self._lock:
+                self.failed += 1
+            print(f"Analysis error for user {user_id}: {e}")
+            return
+        finally:
+            Session.remove()
+
+        try:
+            if self.broadcast_transaction:
+                self.broadcast_transaction(transaction_data)
+            if self.broadcast_alert:
+                for alert in alert_data:
+                    self.broadcast_alert(alert)
+        except Exception as e:
+            print(f"Websocket broadcast error: {e}")
+
+    def metrics(self):
+        """Queue depth, lag and throughput counters"""
+        with self._queue.mutex:
+            depth = len(self._queue.queue)
+            oldest = self._queue.queue[0][2] if depth else None
+
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'depth': depth,
+                'capacity': self._queue.maxsize,
+                'oldest_wait_seconds': round(time.monotonic() - oldest, 3) if oldest else 0.0,
+                'last_lag_seconds': round(self.last_lag, 3),
+                'max_lag_seconds': round(self.max_lag, 3),
+                'enqueued': self.enqueued,
+                'processed': self.processed,
+                'failed': self.failed,
+                'ran_inline': self.ran_inline
+            }
+
+
+analysis_queue = AnalysisQueue(
+    workers=Config.ANALYSIS_WORKERS,
+    maxsize=Config.ANALYSIS_QUEUE_SIZE
+)
@@ -1,24 +1,40 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 from config import Config
-from database import init_db
+from database import init_db, engine, replica_set, profile
+from engine_profile import EngineProfile, pool_status, probe
+from analysis_queue import analysis_queue
+from realtime import event_hub, EventHub
+from replicas import use_primary
+from utils.metrics import Metrics
+from utils.query_budget import QueryBudget
 
 # Import blueprints
 from routes.users import users_bp
 from routes.transactions import transactions_bp
 from routes.incidents import incidents_bp
 from routes.analytics import analytics_bp
+from routes.exports import exports_bp
 
 app = Flask(__name__)
 app.config.from_object(Config)
 app.config['SECRET_KEY'] = Config.SECRET_KEY
 
 # Enable CORS for frontend
-CORS(app, resources={r"/*": {"origins": ["http://localhost:3000", "http://localhost:3001"]}})
+# (credentials carry the session cookie that keeps a client's reads on the primary after it writes)
+CORS(
+    app,
+    resources={r"/*": {"origins": ["http://localhost:3000", "http://localhost:3001"]}},
+    supports_credentials=True
+)
 
 # Initialize SocketIO for real-time updates
-socketio = SocketIO(app, cors_allowed_origins=["http://localhost:3000", "http://localhost:3001"])
+socketio = SocketIO(
+    app,
+    cors_allowed_origins=["http://localhost:3000", "http://localhost:3001"],
+    **EventHub.socketio_options()
+)
 
 # Store socketio instance globally for use in routes
 app.socketio = socketio
@@ -28,6 +44,7 @@ app.register_blueprint(users_bp, url_prefix='/api/users')
 app.register_blueprint(transactions_bp, url_prefix='/api/transactions')
 app.register_blueprint(incidents_bp, url_prefix='/api/incidents')
 app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
+app.register_blueprint(exports_bp, url_prefix='/api/exports')
 
 @app.route('/')
 def home():
@@ -40,46 +57,102 @@ def home():
             'users': '/api/users',
             'transactions': '/api/transactions',
             'incidents': '/api/incidents',
-            'analytics': '/api/analytics'
+            'analytics': '/api/analytics',
+            'exports': '/api/exports',
+            'metrics': '/metrics'
         }
     })
 
 @app.route('/api/health')
+@use_primary
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint with pool occupancy and a database round-trip probe"""
+    ok, latency_ms, error = probe(engine)
+    replicas = replica_set.metrics()
+    
     return jsonify({
-        'status': 'healthy',
-        'timestamp': str(__import__('datetime').datetime.now())
-    })
+        'status': 'healthy' if ok else 'unhealthy',
+        'timestamp': str(__import__('datetime').datetime.now()),
+        'database': {
+            'ok': ok,
+            'latency_ms': latency_ms,
+            'error': error,
+            'profile': profile.name,
+            'pool': pool_status(engine)
+        },
+        'replicas': {
+            'configured': len(replicas['replicas']),
+            'healthy': replicas['healthy']
+        }
+    }), 200 if ok else 503
 
 # WebSocket event handlers
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
+    event_hub.add_client(request.sid)
     emit('connection_response', {'data': 'Connected to TASMAC SafeGuard System'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected')
+    event_hub.remove_client(request.sid)
+
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """Join shop/district/user rooms, optionally limited to some event types"""
+    emit('subscribed', event_hub.subscribe(request.sid, data or {}))
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data):
+    """Leave shop/district/user rooms"""
+    emit('subscribed', event_hub.unsubscribe(request.sid, data or {}))
 
 # Broadcast events (called from routes)
 def broadcast_transaction(transaction_data):
-    """Broadcast new transaction to all connected clients"""
-    socketio.emit('new_transaction', transaction_data)
+    """Publish a new transaction to subscribers of its shop, district and user"""
+    transaction = transaction_data.get('transaction') or {}
+    event_hub.publish(
+        'new_transaction', transaction_data,
+        shop_id=transaction.get('shop_id'),
+        district=transaction_data.get('district'),
+        user_id=transaction.get('user_id')
+    )
 
 def broadcast_alert(alert_data):
-    """Broadcast alert to all connected clients"""
-    socketio.emit('new_alert', alert_data)
+    """Publish an alert to subscribers of its user"""
+    event_hub.publish('new_alert', alert_data, user_id=alert_data.get('user_id'))
 
 def broadcast_approval_request(request_data):
-    """Broadcast approval request to organization dashboard"""
-    socketio.emit('approval_request', request_data)
+    """Publish an approval request to subscribers of its shop and user"""
+    event_hub.publish(
+        'approval_request', request_data,
+        shop_id=request_data.get('shop_id'),
+        user_id=(request_data.get('user') or {}).get('user_id')
+    )
 
 # Make broadcast functions available globally
 app.broadcast_transaction = broadcast_transaction
 app.broadcast_alert = broadcast_alert
 app.broadcast_approval_request = broadcast_approval_request
 
+# Post-purchase analysis pushes its results through the broadcasts above
+event_hub.init_app(app, socketio)
+analysis_queue.init_app(app)
+
+# Statement timeouts per route class (see engine_profile.py)
+EngineProfile.init_app(app)
+
+# GET requests read from a healthy replica when DATABASE_REPLICA_URLS is set
+replica_set.init_app(app)
+replica_engines = [replica.engine for replica in replica_set.replicas]
+
+# Prometheus /metrics for request, SQL, pool and Socket.IO figures
+Metrics.init_app(app, engine, event_hub, replica_engines)
+
+# Per-request statement counts and budget checks (development)
+QueryBudget.init_app(app, engine, replica_engines)
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
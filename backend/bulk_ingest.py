@@ -0,0 +1,294 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from models import Transaction, User, Shop, DailyLimit
+from utils.validators import Validator
+from activity_tracker import ActivityTracker
+from rollups import PurchaseRollups
+from utils.clock import limit_day
+from config import Config
+
+class BulkIngestor:
+    """Batch write path for purchases replayed by shops that were offline"""
+
+    # Shop clocks may run slightly ahead of the server
+    CLOCK_SKEW = timedelta(minutes=5)
+
+    OPTIONAL_FIELDS = (
+        'alcohol_type', 'brand', 'quantity_ml', 'abv_percentage',
+        'amount_paid', 'payment_method', 'latitude', 'longitude'
+    )
+
+    @staticmethod
+    def parse_row(row, default_shop_id, now):
+        """
+        Validate one submitted purchase without touching the database
+        Returns: (values, error)
+        """
+        if not isinstance(row, dict):
+            return None, 'Transaction must be an object'
+
+        client_ref = row.get('client_ref')
+        if not client_ref or not isinstance(client_ref, str) or len(client_ref) > 64:
+            return None, 'client_ref is required (at most 64 characters)'
+
+        user_id = row.get('user_id')
+        shop_id = row.get('shop_id', default_shop_id)
+        # type() rather than isinstance(): JSON true/false arrive as bool, a subclass of int
+        if type(user_id) is not int or type(shop_id) is not int:
+            return None, 'user_id and shop_id are required'
+
+        quantity_ml = row.get('quantity_ml')
+        if quantity_ml is not None:
+            valid, error = Validator.validate_quantity(quantity_ml)
+            if not valid:
+                return None, error
+
+        units = row.get('units')
+        if not units:
+            abv = row.get('abv_percentage')
+            if quantity_ml and abv:
+                units = Validator.calculate_units(quantity_ml, abv)
+            else:
+                return None, 'Units or (quantity_ml + abv_percentage) required'
+
+        valid, error = Validator.validate_units(units)
+        if not valid:
+            return None, error
+
+        purchased_at = row.get('transaction_date')
+        if purchased_at:
+            try:
+                purchased_at = datetime.fromisoformat(purchased_at)
+            except (TypeError, ValueError):
+                return None, 'Invalid transaction_date'
+            if purchased_at.tzinfo:
+                purchased_at = purchased_at.astimezone(timezone.utc).replace(tzinfo=None)
+            if purchased_at > now + BulkIngestor.CLOCK_SKEW:
+                return None, 'transaction_date is in the future'
+            if purchased_at < now - timedelta(days=Config.BULK_REPLAY_WINDOW_DAYS):
+                return None, f"transaction_date is older than the {Config.BULK_REPLAY_WINDOW_DAYS}-day replay window"
+        else:
+            purchased_at = now
+
+        values = {field: row.get(field) for field in BulkIngestor.OPTIONAL_FIELDS}
+        values.update(
+            user_id=user_id,
+            shop_id=shop_id,
+            client_ref=client_ref,
+            transaction_date=purchased_at,
+            units=units
+        )
+        return values, None
+
+    @staticmethod
+    def lock_shops(shop_ids, db_session):
+        """
+        Serialise replays per shop for the rest of the transaction, so two
+        retries of the same upload cannot both pass the duplicate check
+        """
+        db_session.execute(text("""
+            SELECT pg_advisory_xact_lock(hashtext('bulk_ingest'), shop_id)
+            FROM (SELECT unnest(CAST(:shop_ids AS integer[])) AS shop_id ORDER BY 1) AS shops
+        """), {'shop_ids': sorted(shop_ids)})
+
+    @staticmethod
+    def reserve_units(purchases, db_session):
+        """
+        Apply the daily limit to purchases grouped by (user, limit_day)
+        Each group's daily_limits row is created if missing and locked, then
+        purchases are admitted in time order until the limit is reached, and
+        the admitted totals are written back in one statement
+        Returns: (admitted, over_limit) lists of (index, values)
+        """
+        groups = defaultdict(list)
+        for index, values in purchases:
+            groups[(values['user_id'], limit_day(values['transaction_date']))].append((index, values))
+        keys = sorted(groups)
+        if not keys:
+            return [], []
+
+        db_session.execute(
+            insert(DailyLimit).on_conflict_do_nothing(constraint='unique_user_date'),
+            [
+                {'user_id': user_id, 'date': day, 'total_units_today': 0, 'purchase_count_today': 0}
+                for user_id, day in keys
+            ]
+        )
+        totals = {
+            (user_id, day): total or 0
+            for user_id, day, total in db_session.execute(
+                select(DailyLimit.user_id, DailyLimit.date, DailyLimit.total_units_today)
+                .where(tuple_(DailyLimit.user_id, DailyLimit.date).in_(keys))
+                .order_by(DailyLimit.user_id, DailyLimit.date)
+                .with_for_update()
+            ).all()
+        }
+
+        admitted, over_limit = [], []
+        deltas = {}
+        for key in keys:
+            total = totals[key]
+            added_units, added_count = 0, 0
+            for index, values in sorted(groups[key], key=lambda p: p[1]['transaction_date']):
+                if total + values['units'] > Config.DAILY_UNIT_LIMIT:
+                    over_limit.append((index, values))
+                    continue
+                total += values['units']
+                added_units += values['units']
+                added_count += 1
+                admitted.append((index, values))
+            if added_count:
+                deltas[key] = (added_units, added_count)
+
+        if deltas:
+            db_session.execute(text("""
+                UPDATE daily_limits AS d
+                SET total_units_today = d.total_units_today + v.units,
+                    purchase_count_today = d.purchase_count_today + v.purchases
+                FROM unnest(
+                    CAST(:user_ids AS integer[]),
+                    CAST(:dates AS date[]),
+                    CAST(:units AS double precision[]),
+                    CAST(:purchases AS integer[])
+                ) AS v(user_id, date, units, purchases)
+                WHERE d.user_id = v.user_id AND d.date = v.date
+            """), {
+                'user_ids': [user_id for user_id, _ in deltas],
+                'dates': [day for _, day in deltas],
+                'units': [units for units, _ in deltas.values()],
+                'purchases': [count for _, count in deltas.values()]
+            })
+
+        return admitted, over_limit
+
+    @staticmethod
+    def update_user_stats(purchases, db_session):
+        """Add purchase counts, units and latest purchase date per user in one statement"""
+        stats = {}
+        for _, values in purchases:
+            count, units, last_date = stats.get(values['user_id'], (0, 0, None))
+            day = limit_day(values['transaction_date'])
+            stats[values['user_id']] = (
+                count + 1, units + values['units'], max(day, last_date) if last_date else day
+            )
+
+        db_session.execute(text("""
+            UPDATE users AS u
+            SET total_purchases = COALESCE(u.total_purchases, 0) + v.purchases,
+                total_units_consumed = COALESCE(u.total_units_consumed, 0) + v.units,
+                last_purchase_date = GREATEST(u.last_purchase_date, v.last_date)
+            FROM unnest(
+                CAST(:user_ids AS integer[]),
+                CAST(:purchases AS integer[]),
+                CAST(:units AS double precision[]),
+                CAST(:last_dates AS date[])
+            ) AS v(user_id, purchases, units, last_date)
+            WHERE u.user_id = v.user_id
+        """), {
+            'user_ids': list(stats),
+            'purchases': [s[0] for s in stats.values()],
+            'units': [s[1] for s in stats.values()],
+            'last_dates': [s[2] for s in stats.values()]
+        })
+
+    @staticmethod
+    def ingest(rows, default_shop_id, db_session):
+        """
+        Validate, deduplicate, limit-check and insert a batch of purchases
+        Does not commit; the caller owns the transaction
+        Returns: (summary, latest transaction_id per affected user)
+        """
+        now = datetime.utcnow()
+        results = [None] * len(rows)
+
+        def reject(index, error):
+            results[index] = {
+                'index': index,
+                'client_ref': rows[index].get('client_ref') if isinstance(rows[index], dict) else None,
+                'status': 'rejected',
+                'error': error
+            }
+
+        candidates = []
+        for index, row in enumerate(rows):
+            values, error = BulkIngestor.parse_row(row, default_shop_id, now)
+            if error:
+                reject(index, error)
+            else:
+                candidates.append((index, values))
+
+        if candidates:
+            shop_ids = {values['shop_id'] for _, values in candidates}
+            user_ids = {values['user_id'] for _, values in candidates}
+            BulkIngestor.lock_shops(shop_ids, db_session)
+
+            # One lookup each for shops, users and already-synced purchases
+            known_shops = set(db_session.scalars(
+                select(Shop.shop_id).where(Shop.shop_id.in_(shop_ids))
+            ))
+            blocked = dict(db_session.execute(
+                select(User.user_id, User.is_blocked).where(User.user_id.in_(user_ids))
+            ).all())
+            synced = set(db_session.execute(
+                select(Transaction.shop_id, Transaction.client_ref).where(
+                    tuple_(Transaction.shop_id, Transaction.client_ref).in_(
+                        {(values['shop_id'], values['client_ref']) for _, values in candidates}
+                    )
+                )
+            ).all())
+
+        valid = []
+        for index, values in candidates:
+            key = (values['shop_id'], values['client_ref'])
+            if key in synced:
+                results[index] = {'index': index, 'client_ref': values['client_ref'], 'status': 'duplicate'}
+            elif values['shop_id'] not in known_shops:
+                reject(index, 'Shop not found')
+            elif values['user_id'] not in blocked:
+                reject(index, 'User not found')
+            elif blocked[values['user_id']]:
+                reject(index, 'User is blocked from purchasing')
+            else:
+                # Later copies of the same purchase within this batch are duplicates too
+                synced.add(key)
+                valid.append((index, values))
+
+        admitted, over_limit = BulkIngestor.reserve_units(valid, db_session)
+        for index, _ in over_limit:
+            reject(index, 'Daily limit exceeded')
+
+        latest = {}
+        if admitted:
+            inserted = db_session.execute(
+                insert(Transaction).returning(
+                    Transaction.transaction_id, sort_by_parameter_order=True
+                ),
+                [values for _, values in admitted]
+            ).scalars().all()
+
+            for (index, values), transaction_id in zip(admitted, inserted):
+                results[index] = {
+                    'index': index,
+                    'client_ref': values['client_ref'],
+                    'status': 'accepted',
+                    'transaction_id': transaction_id
+                }
+                latest[values['user_id']] = max(latest.get(values['user_id'], 0), transaction_id)
+
+            BulkIngestor.update_user_stats(admitted, db_session)
+            ActivityTracker.record_purchases([
+                (v['user_id'], v['units'], v['quantity_ml'], v['transaction_date']) for _, v in admitted
+            ], db_session)
+            PurchaseRollups.record_purchases([
+                (v['shop_id'], v['units'], v['transaction_date']) for _, v in admitted
+            ], db_session)
+
+        summary = {
+            'accepted': sum(1 for r in results if r['status'] == 'accepted'),
+            'rejected': sum(1 for r in results if r['status'] == 'rejected'),
+            'duplicates': sum(1 for r in results if r['status'] == 'duplicate'),
+            'results': results
+        }
+        return summary, latest
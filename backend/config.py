@@ -3,6 +3,13 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def _optional(name, cast):
+    """Environment override, or None to keep the engine profile's default"""
+    value = os.getenv(name)
+    if value is None or value == '':
+        return None
+    return value == 'True' if cast is bool else cast(value)
+
 class Config:
     """Application configuration"""
     
@@ -11,9 +18,39 @@ class Config:
     if DATABASE_URL and DATABASE_URL.startswith('postgres://'):
         DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
     
+    # Read replicas (comma-separated URLs) serving GET requests
+    DATABASE_REPLICA_URLS = [
+        url.strip().replace('postgres://', 'postgresql://', 1)
+        for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()
+    ]
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5))
+    REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', 5))
+    # A client's reads stay on the primary this long after its last write (0 = off)
+    READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', 5))
+    # Session cookie attributes applied only when replicas are configured: the
+    # write timestamp has to travel with the frontends' cross-site requests
+    READ_YOUR_WRITES_COOKIE_SAMESITE = os.getenv('READ_YOUR_WRITES_COOKIE_SAMESITE', 'None')
+    READ_YOUR_WRITES_COOKIE_SECURE = os.getenv('READ_YOUR_WRITES_COOKIE_SECURE', 'True') == 'True'
+    
     # Flask
-    SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-this')
     DEBUG = os.getenv('FLASK_DEBUG', 'True') == 'True'
+    # Signs the session cookie; the development key is only a default in DEBUG
+    SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-this' if DEBUG else None)
+    
+    # Database engine profile: development, production or pgbouncer (transaction
+    # pooling); the DB_* and SQL_LOG_* settings override the profile's defaults
+    DB_PROFILE = os.getenv('DB_PROFILE', 'development')
+    DB_POOL_SIZE = _optional('DB_POOL_SIZE', int)
+    DB_MAX_OVERFLOW = _optional('DB_MAX_OVERFLOW', int)
+    DB_POOL_TIMEOUT = _optional('DB_POOL_TIMEOUT', float)
+    DB_POOL_RECYCLE = _optional('DB_POOL_RECYCLE', int)
+    DB_POOL_PRE_PING = _optional('DB_POOL_PRE_PING', bool)
+    DB_PGBOUNCER = _optional('DB_PGBOUNCER', bool)
+    # Per route class, e.g. "read=5000,write=10000,analytics=30000,export=0,background=0"
+    DB_STATEMENT_TIMEOUTS = _optional('DB_STATEMENT_TIMEOUTS', str)
+    # Share of statements printed (0-1); statements slower than SQL_LOG_SLOW_MS always are
+    SQL_LOG_SAMPLE_RATE = _optional('SQL_LOG_SAMPLE_RATE', float)
+    SQL_LOG_SLOW_MS = _optional('SQL_LOG_SLOW_MS', float)
     
     # Business Rules
     DAILY_UNIT_LIMIT = float(os.getenv('DAILY_UNIT_LIMIT', 40))
@@ -25,4 +62,53 @@ class Config:
     
     # Pattern Detection
     BULK_PURCHASE_THRESHOLD_ML = 1000
-    HIGH_FREQUENCY_THRESHOLD = 20
\ No newline at end of file
+    HIGH_FREQUENCY_THRESHOLD = 20
+    
+    # List endpoint pagination
+    PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', 50))
+    PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 500))
+    
+    # Dashboard statistics cache
+    DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', 10))
+    
+    # Bulk ingestion for offline shop sync
+    BULK_INGEST_MAX_ROWS = int(os.getenv('BULK_INGEST_MAX_ROWS', 5000))
+    # Oldest transaction_date a replayed purchase may carry
+    BULK_REPLAY_WINDOW_DAYS = int(os.getenv('BULK_REPLAY_WINDOW_DAYS', 7))
+    
+    # Streaming exports
+    EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', 5000))
+    
+    # Rows encoded per chunk by the column-select JSON read path
+    JSON_CHUNK_ROWS = int(os.getenv('JSON_CHUNK_ROWS', 500))
+    
+    # Rendered list responses, revalidated against table versions
+    READ_CACHE_SIZE = int(os.getenv('READ_CACHE_SIZE', 256))
+    READ_CACHE_TTL = int(os.getenv('READ_CACHE_TTL', 300))
+    # Rows each table's change version is spread over, so writes rarely contend
+    READ_VERSION_STRIPES = int(os.getenv('READ_VERSION_STRIPES', 16))
+    
+    # Post-purchase analysis queue
+    ASYNC_ANALYSIS = os.getenv('ASYNC_ANALYSIS', 'True') == 'True'
+    ANALYSIS_WORKERS = int(os.getenv('ANALYSIS_WORKERS', 2))
+    ANALYSIS_QUEUE_SIZE = int(os.getenv('ANALYSIS_QUEUE_SIZE', 10000))
+    
+    # Query budgets: 'off', 'warn' or 'raise' when a request or RiskEngine
+    # call exceeds its declared statement budget or repeats statements
+    QUERY_BUDGET = os.getenv('QUERY_BUDGET', 'warn' if DEBUG else 'off')
+    QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', 5))
+    
+    # Real-time event batching
+    SOCKET_BATCH_SIZE = int(os.getenv('SOCKET_BATCH_SIZE', 100))
+    SOCKET_BATCH_INTERVAL_MS = int(os.getenv('SOCKET_BATCH_INTERVAL_MS', 250))
+    SOCKET_CLIENT_QUEUE_SIZE = int(os.getenv('SOCKET_CLIENT_QUEUE_SIZE', 1000))
+    
+    # Multi-worker Socket.IO (gunicorn reads WEB_CONCURRENCY as its worker count)
+    WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+    STICKY_SESSIONS = os.getenv('STICKY_SESSIONS', 'False') == 'True'
+    MESSAGE_BUS = os.getenv('MESSAGE_BUS', 'local')
+    MESSAGE_BUS_URL = os.getenv('MESSAGE_BUS_URL', DATABASE_URL)
+    MESSAGE_BUS_CHANNEL = os.getenv('MESSAGE_BUS_CHANNEL', 'tasmac_events')
+    
+    # Rolling activity buckets (must cover the longest detection window)
+    ACTIVITY_RETENTION_DAYS = 30
\ No newline at end of file
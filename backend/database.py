@@ -1,28 +1,73 @@
+import re
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.orm import Session as OrmSession, sessionmaker, scoped_session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
 from config import Config
+from utils.metrics import InstrumentedQueuePool
+from replicas import ReplicaSet, read_engine
+from engine_profile import EngineProfile
 
-# Create engine
-engine = create_engine(
-    Config.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=Config.DEBUG
+# Pool sizing, pgbouncer mode, statement timeouts and SQL logging (DB_PROFILE)
+profile = EngineProfile()
+profile.check()
+
+def make_engine(url):
+    engine = create_engine(url, poolclass=InstrumentedQueuePool, **profile.engine_options(url))
+    profile.instrument(engine)
+    return engine
+
+# Create engines: the primary takes every write, replicas serve GET requests
+engine = make_engine(Config.DATABASE_URL)
+replica_set = ReplicaSet([make_engine(url) for url in Config.DATABASE_REPLICA_URLS])
+
+
+# text() statements a read-only replica would reject: DML, DDL, row locks,
+# sequence and advisory-lock calls (WITH may wrap DML, so it counts too).
+# This is a safety net, not a parser: anything else that must run on the
+# primary uses replicas.on_primary() or an explicit bind
+WRITE_SQL = re.compile(
+    r"^\s*(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|CREATE|ALTER|DROP|LOCK|COPY|WITH)\b"
+    r"|\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE)\b|\bFOR\s+KEY\s+SHARE\b"
+    r"|\b(nextval|setval|pg_advisory\w*)\s*\(",
+    re.IGNORECASE
 )
 
+
+def writes(clause):
+    """Whether a statement must run on the primary"""
+    if isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, TextClause):
+        return WRITE_SQL.search(clause.text) is not None
+    return getattr(clause, '_for_update_arg', None) is not None
+
+
+class RoutingSession(OrmSession):
+    """Reads from the current request's replica, if any; flushes and writes always hit the primary"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = read_engine()
+        if replica is None or self._flushing or writes(clause):
+            return super().get_bind(mapper, clause=clause, **kw)
+        return replica
+
+
 # Create session factory
-session_factory = sessionmaker(bind=engine)
+session_factory = sessionmaker(bind=engine, class_=RoutingSession)
 Session = scoped_session(session_factory)
 
 # Base class for models
 Base = declarative_base()
 
 def init_db():
-    """Initialize database tables"""
+    """Initialize database tables and apply pending migrations"""
     import models
+    from migrations import run_migrations
     Base.metadata.create_all(bind=engine)
     print("✅ Database tables created successfully")
+    run_migrations(engine)
 
 def get_db():
     """Get database session"""
@@ -30,4 +75,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
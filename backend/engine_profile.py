@@ -0,0 +1,225 @@
+"""
+Database engine profiles: pooling, statement timeouts and SQL logging
+
+DB_PROFILE picks a set of defaults (PROFILES below); any DB_* or SQL_LOG_*
+setting in Config overrides a single value. Every engine (primary and
+replicas) is built from the same profile.
+
+Statement timeouts are set per route class: 'read' (GET), 'write',
+'analytics', 'export', and 'background' for work outside a request
+(analysis queue, migrations, data generators). A class without a timeout
+leaves the server's statement_timeout alone; 0 disables it. The timeout
+is SET LOCAL at the start of each transaction, so it never outlives the
+transaction: nothing leaks to the next user of a pooled connection, or to
+another client's server connection behind pgbouncer. It goes through the
+raw DBAPI cursor, so it is not counted in metrics or query budgets.
+
+pgbouncer mode also turns off server-side prepared statements for drivers
+that use them (psycopg 3); psycopg2 never prepares. LISTEN needs a session
+of its own, so a Postgres message bus must connect around pgbouncer.
+
+SQL logging replaces echo: a SQL_LOG_SAMPLE_RATE share of statements is
+printed, and statements slower than SQL_LOG_SLOW_MS always are.
+Parameters are only printed in DEBUG.
+"""
+import contextvars
+import random
+import time
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from config import Config
+from utils.metrics import sql_caller
+from utils.query_budget import QueryScope
+
+PROFILES = {
+    'development': {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_timeout': 30,
+        'pool_recycle': 300,
+        'pool_pre_ping': True,
+        'pool_use_lifo': False,
+        'pgbouncer': False,
+        'statement_timeouts': {},
+        'sql_log_sample_rate': 1.0,
+        'sql_log_slow_ms': 200,
+    },
+    'production': {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 10,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        # Reuse the most recent connections so surplus ones go idle and are recycled
+        'pool_use_lifo': True,
+        'pgbouncer': False,
+        'statement_timeouts': {'read': 5000, 'write': 10000, 'analytics': 30000, 'export': 0},
+        'sql_log_sample_rate': 0.0,
+        'sql_log_slow_ms': 1000,
+    },
+}
+PROFILES['pgbouncer'] = {**PROFILES['production'], 'pgbouncer': True}
+
+ROUTE_CLASSES = ('read', 'write', 'analytics', 'export', 'background')
+
+# Blueprints whose routes get their own timeout class
+BLUEPRINT_CLASSES = {'analytics': 'analytics', 'exports': 'export'}
+
+_route_class = contextvars.ContextVar('route_class', default='background')
+
+
+class EngineProfile:
+    """A resolved profile: the named defaults with Config overrides applied"""
+
+    def __init__(self, name=None):
+        self.name = name or Config.DB_PROFILE
+        if self.name not in PROFILES:
+            raise RuntimeError(f"Unknown DB_PROFILE '{self.name}' (choose from {', '.join(PROFILES)})")
+        settings = dict(PROFILES[self.name])
+
+        overrides = {
+            'pool_size': Config.DB_POOL_SIZE,
+            'max_overflow': Config.DB_MAX_OVERFLOW,
+            'pool_timeout': Config.DB_POOL_TIMEOUT,
+            'pool_recycle': Config.DB_POOL_RECYCLE,
+            'pool_pre_ping': Config.DB_POOL_PRE_PING,
+            'pgbouncer': Config.DB_PGBOUNCER,
+            'sql_log_sample_rate': Config.SQL_LOG_SAMPLE_RATE,
+            'sql_log_slow_ms': Config.SQL_LOG_SLOW_MS,
+        }
+        settings.update({k: v for k, v in overrides.items() if v is not None})
+        if Config.DB_STATEMENT_TIMEOUTS is not None:
+            settings['statement_timeouts'] = EngineProfile.parse_timeouts(Config.DB_STATEMENT_TIMEOUTS)
+
+        self.settings = settings
+        self.pgbouncer = settings['pgbouncer']
+        self.statement_timeouts = settings['statement_timeouts']
+
+    @staticmethod
+    def parse_timeouts(spec):
+        """'read=5000,write=10000' -> {'read': 5000, 'write': 10000}"""
+        timeouts = {}
+        for part in spec.split(','):
+            if not part.strip():
+                continue
+            route_class, _, ms = part.partition('=')
+            route_class = route_class.strip()
+            if route_class not in ROUTE_CLASSES:
+                raise RuntimeError(f"Unknown route class '{route_class}' in DB_STATEMENT_TIMEOUTS")
+            timeouts[route_class] = int(ms)
+        return timeouts
+
+    def check(self):
+        """Refuse settings that cannot work behind pgbouncer in transaction mode"""
+        if self.pgbouncer and Config.MESSAGE_BUS == 'postgres' and Config.MESSAGE_BUS_URL == Config.DATABASE_URL:
+            raise RuntimeError(
+                'MESSAGE_BUS=postgres needs LISTEN on a dedicated session; point MESSAGE_BUS_URL '
+                'at Postgres directly rather than through pgbouncer'
+            )
+
+    def engine_options(self, url):
+        """Keyword arguments for create_engine"""
+        s = self.settings
+        options = {
+            'pool_size': s['pool_size'],
+            'max_overflow': s['max_overflow'],
+            'pool_timeout': s['pool_timeout'],
+            'pool_recycle': s['pool_recycle'],
+            'pool_pre_ping': s['pool_pre_ping'],
+            'pool_use_lifo': s['pool_use_lifo'],
+        }
+        if self.pgbouncer and make_url(url).get_driver_name() == 'psycopg':
+            # psycopg 3 prepares repeated statements server-side; pgbouncer
+            # would hand them to other clients' server connections
+            options['connect_args'] = {'prepare_threshold': None}
+        return options
+
+    def instrument(self, engine):
+        """Attach statement timeouts and sampled SQL logging to an engine"""
+        if self.statement_timeouts:
+            event.listen(engine, 'begin', self._apply_timeout)
+
+        sample_rate = self.settings['sql_log_sample_rate']
+        slow_ms = self.settings['sql_log_slow_ms']
+        if sample_rate <= 0 and slow_ms is None:
+            return
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def start_clock(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context.sql_log_started = time.perf_counter()
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def log_statement(conn, cursor, statement, parameters, context, executemany):
+            started = getattr(context, 'sql_log_started', None)
+            if started is None:
+                return
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            slow = slow_ms is not None and elapsed_ms >= slow_ms
+            if not slow and random.random() >= sample_rate:
+                return
+
+            line = f"{'🐢 ' if slow else ''}SQL {elapsed_ms:.1f}ms [{sql_caller.get()}] {QueryScope.shorten(statement)}"
+            if Config.DEBUG and parameters:
+                line += f" {repr(parameters)[:200]}"
+            print(line)
+
+    def _apply_timeout(self, conn):
+        timeout = self.statement_timeouts.get(_route_class.get())
+        if timeout is None:
+            return
+
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"SET LOCAL statement_timeout = {int(timeout)}")
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def init_app(app):
+        """Classify each request for its statement timeout"""
+        @app.before_request
+        def set_route_class():
+            if request.blueprint in BLUEPRINT_CLASSES:
+                route_class = BLUEPRINT_CLASSES[request.blueprint]
+            else:
+                route_class = 'read' if request.method in ('GET', 'HEAD') else 'write'
+            g.route_class_token = _route_class.set(route_class)
+
+        @app.teardown_request
+        def reset_route_class(exc):
+            token = g.pop('route_class_token', None)
+            if token is not None:
+                _route_class.reset(token)
+
+    def to_dict(self):
+        return {'name': self.name, **self.settings}
+
+
+def pool_status(engine):
+    """Checked-out and idle connections of an engine's pool"""
+    pool = engine.pool
+    checked_out = pool.checkedout() if hasattr(pool, 'checkedout') else None
+    idle = pool.checkedin() if hasattr(pool, 'checkedin') else None
+    return {
+        'size': pool.size() if hasattr(pool, 'size') else None,
+        'checked_out': checked_out,
+        'idle': idle,
+        'overflow': pool.overflow() if hasattr(pool, 'overflow') else None,
+        'capacity': getattr(pool, 'capacity', None)
+    }
+
+
+def probe(engine):
+    """
+    Time a checkout plus a SELECT 1 round trip on the engine
+    Returns: (ok, latency_ms, error)
+    """
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql('SELECT 1').scalar()
+        return True, round((time.perf_counter() - started) * 1000, 2), None
+    except Exception as e:
+        return False, round((time.perf_counter() - started) * 1000, 2), str(e)
@@ -0,0 +1,166 @@
+import json
+import select
+import threading
+import time
+import psycopg2
+import psycopg2.extensions
+from config import Config
+
+class LocalBus:
+    """
+    In-process message bus
+    Delivers every message synchronously to the callbacks subscribed to this
+    instance. Sharing one LocalBus between several EventHubs stands in for
+    several workers in tests; on its own it only serves a single process
+    """
+
+    cross_process = False
+
+    def __init__(self):
+        self._callbacks = []
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    def start(self, spawn):
+        pass
+
+    def publish(self, message):
+        self.published += 1
+        for callback in list(self._callbacks):
+            self.received += 1
+            callback(message)
+        return True
+
+    def metrics(self):
+        return {
+            'backend': 'local',
+            'published': self.published,
+            'received': self.received
+        }
+
+
+class PostgresBus:
+    """
+    Cross-process message bus over Postgres LISTEN/NOTIFY
+    Publishes with pg_notify on a dedicated autocommit connection and listens
+    on another, reconnecting with backoff if the listener connection drops
+    """
+
+    cross_process = True
+
+    # NOTIFY payloads must stay under 8000 bytes
+    MAX_PAYLOAD_BYTES = 7900
+
+    def __init__(self, dsn, channel='tasmac_events'):
+        # SQLAlchemy URLs may name a driver; libpq only understands the plain scheme
+        self.dsn = dsn.replace('postgresql+psycopg2://', 'postgresql://', 1)
+        self.channel = channel
+        self._callbacks = []
+        self._publisher = None
+        self._lock = threading.Lock()
+        self._listener = None
+
+        # Metrics
+        self.published = 0
+        self.received = 0
+        self.oversize = 0
+        self.reconnects = 0
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        return conn
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    def start(self, spawn):
+        """Start the listener with the server's background-task spawner"""
+        if self._listener is None:
+            self._listener = spawn(self._listen_loop)
+
+    def publish(self, message):
+        """
+        Notify every listening process
+        Returns False when the message is too large to send, in which case
+        only the publishing process sees it
+        """
+        payload = json.dumps(message, default=str)
+        if len(payload.encode()) > self.MAX_PAYLOAD_BYTES:
+            self.oversize += 1
+            return False
+
+        with self._lock:
+            try:
+                if self._publisher is None or self._publisher.closed:
+                    self._publisher = self._connect()
+                with self._publisher.cursor() as cursor:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+            except psycopg2.Error:
+                self._publisher = None
+                raise
+            self.published += 1
+        return True
+
+    def _listen_loop(self):
+        backoff = 1
+        while True:
+            conn = None
+            try:
+                conn = self._connect()
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                backoff = 1
+
+                while True:
+                    # select() is cooperative under the eventlet worker
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self._dispatch(notify.payload)
+
+            except (psycopg2.Error, OSError) as e:
+                self.reconnects += 1
+                print(f"Message bus listener error: {e}; reconnecting in {backoff}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None and not conn.closed:
+                    conn.close()
+
+    def _dispatch(self, payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        self.received += 1
+        for callback in list(self._callbacks):
+            try:
+                callback(message)
+            except Exception as e:
+                print(f"Message bus callback error: {e}")
+
+    def metrics(self):
+        return {
+            'backend': 'postgres',
+            'channel': self.channel,
+            'published': self.published,
+            'received': self.received,
+            'oversize': self.oversize,
+            'reconnects': self.reconnects
+        }
+
+
+def create_bus(backend=None):
+    """Build the message bus named by MESSAGE_BUS ('local' or 'postgres')"""
+    backend = backend or Config.MESSAGE_BUS
+    if backend == 'local':
+        return LocalBus()
+    if backend == 'postgres':
+        return PostgresBus(Config.MESSAGE_BUS_URL, Config.MESSAGE_BUS_CHANNEL)
+    raise ValueError(f"Unknown message bus: {backend}")
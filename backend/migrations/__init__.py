@@ -0,0 +1,79 @@
+import importlib
+import pkgutil
+from sqlalchemy import text
+
+class MigrationRunner:
+    """
+    Applies versioned schema migrations on top of Base.metadata.create_all
+    Each module in migrations.versions defines VERSION, DESCRIPTION and
+    STATEMENTS; statements must be idempotent so they are safe on databases
+    whose tables were just created from the current models. A data
+    migration may also define run(connection), called after its statements
+    in the same transaction
+    """
+
+    # Arbitrary key so concurrent workers apply migrations one at a time
+    LOCK_ID = 74210001
+
+    @staticmethod
+    def discover():
+        """Load every migration module, ordered by VERSION"""
+        from migrations import versions
+
+        modules = [
+            importlib.import_module(f"{versions.__name__}.{info.name}")
+            for info in pkgutil.iter_modules(versions.__path__)
+        ]
+        modules.sort(key=lambda m: m.VERSION)
+
+        seen = set()
+        for module in modules:
+            if module.VERSION in seen:
+                raise RuntimeError(f"Duplicate migration version {module.VERSION}")
+            seen.add(module.VERSION)
+        return modules
+
+    @staticmethod
+    def applied_versions(connection):
+        rows = connection.execute(text("SELECT version FROM schema_migrations"))
+        return {row[0] for row in rows}
+
+    @staticmethod
+    def upgrade(engine):
+        """
+        Apply pending migrations, each in its own transaction
+        Returns the list of versions applied
+        """
+        applied = []
+        with engine.begin() as connection:
+            connection.execute(text("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT,
+                    applied_at TIMESTAMP NOT NULL DEFAULT now()
+                )
+            """))
+
+        for migration in MigrationRunner.discover():
+            with engine.begin() as connection:
+                connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {'id': MigrationRunner.LOCK_ID})
+                if migration.VERSION in MigrationRunner.applied_versions(connection):
+                    continue
+
+                for statement in migration.STATEMENTS:
+                    connection.execute(text(statement))
+                if hasattr(migration, 'run'):
+                    migration.run(connection)
+                connection.execute(
+                    text("INSERT INTO schema_migrations (version, description) VALUES (:v, :d)"),
+                    {'v': migration.VERSION, 'd': migration.DESCRIPTION}
+                )
+                applied.append(migration.VERSION)
+                print(f"✅ Applied migration {migration.VERSION}: {migration.DESCRIPTION}")
+
+        return applied
+
+
+def run_migrations(engine):
+    """Bring the database schema up to the latest version"""
+    return MigrationRunner.upgrade(engine)
@@ -0,0 +1 @@
+# Versioned migrations, applied in VERSION order by MigrationRunner
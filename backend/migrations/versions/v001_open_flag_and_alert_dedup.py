@@ -0,0 +1,33 @@
+"""Columns and partial unique indexes for upserted pattern flags and alerts"""
+
+VERSION = 1
+DESCRIPTION = "Deduplicate open pattern flags and alerts"
+
+STATEMENTS = [
+    "ALTER TABLE pattern_flags ADD COLUMN IF NOT EXISTS window_days INTEGER",
+    "ALTER TABLE alerts ADD COLUMN IF NOT EXISTS dedup_key VARCHAR(100)",
+
+    # Adopt the newest open flag per user and pattern as the one future
+    # detections update; older duplicates keep a NULL window and stay
+    # visible for review
+    """
+    UPDATE pattern_flags SET window_days = (details->>'period_days')::integer
+    WHERE window_days IS NULL AND flag_id IN (
+        SELECT DISTINCT ON (user_id, pattern_type) flag_id
+        FROM pattern_flags
+        WHERE reviewed = false
+        ORDER BY user_id, pattern_type, detected_date DESC, flag_id DESC
+    )
+    """,
+
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS unique_open_pattern_flag
+    ON pattern_flags (user_id, pattern_type, window_days)
+    WHERE reviewed = false
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS unique_open_alert
+    ON alerts (dedup_key)
+    WHERE acknowledged = false
+    """,
+]
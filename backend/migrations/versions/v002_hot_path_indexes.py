@@ -0,0 +1,25 @@
+"""Indexes for the predicates used by the risk engine and list routes"""
+
+VERSION = 2
+DESCRIPTION = "Hot-path composite and partial indexes"
+
+STATEMENTS = [
+    # Per-user purchase history, newest first
+    "CREATE INDEX IF NOT EXISTS ix_transactions_user_date ON transactions (user_id, transaction_date)",
+    # Recent purchases, trends and activity rebuilds
+    "CREATE INDEX IF NOT EXISTS ix_transactions_date ON transactions (transaction_date)",
+    # Incident history for scoring and the per-user incident list
+    "CREATE INDEX IF NOT EXISTS ix_incidents_user_date ON incidents (user_id, incident_date)",
+    # Recent-incident counts and the incident list, newest first
+    "CREATE INDEX IF NOT EXISTS ix_incidents_date ON incidents (incident_date)",
+    # Unreviewed flags in risk scoring and the dashboard
+    "CREATE INDEX IF NOT EXISTS ix_pattern_flags_user_unreviewed ON pattern_flags (user_id) WHERE reviewed = false",
+    # Active alerts on the dashboard
+    "CREATE INDEX IF NOT EXISTS ix_alerts_unacknowledged ON alerts (created_at) WHERE acknowledged = false",
+    # Limit-violation counts in risk scoring
+    "CREATE INDEX IF NOT EXISTS ix_daily_limits_user_units ON daily_limits (user_id, total_units_today)",
+    # High-risk user list and risk distribution
+    "CREATE INDEX IF NOT EXISTS ix_users_risk_level ON users (risk_level)",
+    # Blocked-user count on the dashboard
+    "CREATE INDEX IF NOT EXISTS ix_users_blocked ON users (user_id) WHERE is_blocked = true",
+]
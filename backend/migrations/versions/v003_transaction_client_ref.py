@@ -0,0 +1,13 @@
+"""Idempotency key for purchases replayed by offline shops"""
+
+VERSION = 3
+DESCRIPTION = "Shop-scoped client reference on transactions"
+
+STATEMENTS = [
+    "ALTER TABLE transactions ADD COLUMN IF NOT EXISTS client_ref VARCHAR(64)",
+    # A replayed purchase is recognised by its shop and shop-side id
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS unique_shop_client_ref
+    ON transactions (shop_id, client_ref) WHERE client_ref IS NOT NULL
+    """,
+]
@@ -0,0 +1,19 @@
+"""Per-table change versions behind ETag / Last-Modified on list endpoints"""
+
+VERSION = 4
+DESCRIPTION = "Change versions for users, transactions and incidents"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS table_versions (
+        table_name VARCHAR(50) PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0,
+        changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    """
+    INSERT INTO table_versions (table_name)
+    VALUES ('users'), ('transactions'), ('incidents')
+    ON CONFLICT (table_name) DO NOTHING
+    """,
+]
@@ -0,0 +1,10 @@
+"""Prefix indexes behind the user list's ?search= filter"""
+
+VERSION = 5
+DESCRIPTION = "Aadhaar and name prefix indexes for user search"
+
+STATEMENTS = [
+    # LIKE 'prefix%' can only use a btree under the C collation or a pattern opclass
+    "CREATE INDEX IF NOT EXISTS ix_users_aadhaar_prefix ON users (aadhaar_mock varchar_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_name_prefix ON users (lower(name) varchar_pattern_ops)",
+]
@@ -0,0 +1,10 @@
+"""Split each table's change version over stripes written by the writes themselves"""
+
+VERSION = 6
+DESCRIPTION = "Striped table_versions rows"
+
+STATEMENTS = [
+    "ALTER TABLE table_versions ADD COLUMN IF NOT EXISTS stripe SMALLINT NOT NULL DEFAULT 0",
+    "ALTER TABLE table_versions DROP CONSTRAINT IF EXISTS table_versions_pkey",
+    "ALTER TABLE table_versions ADD PRIMARY KEY (table_name, stripe)",
+]
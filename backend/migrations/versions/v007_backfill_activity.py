@@ -0,0 +1,15 @@
+"""Backfill user_activity from transaction history, on server-local days"""
+
+VERSION = 7
+DESCRIPTION = "Rebuild activity buckets"
+
+STATEMENTS = []
+
+
+def run(connection):
+    # The rebuild's commit only releases a savepoint inside the migration's transaction
+    from sqlalchemy.orm import Session
+    from activity_tracker import ActivityTracker
+
+    with Session(bind=connection, join_transaction_mode='create_savepoint') as db:
+        ActivityTracker.rebuild(db)
@@ -0,0 +1,15 @@
+"""Backfill purchase_rollups from transaction history"""
+
+VERSION = 8
+DESCRIPTION = "Rebuild purchase rollups"
+
+STATEMENTS = []
+
+
+def run(connection):
+    # The rebuild's commit only releases a savepoint inside the migration's transaction
+    from sqlalchemy.orm import Session
+    from rollups import PurchaseRollups
+
+    with Session(bind=connection, join_transaction_mode='create_savepoint') as db:
+        PurchaseRollups.rebuild(db)
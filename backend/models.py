@@ -1,8 +1,8 @@
 from sqlalchemy import (
     Column, Integer, String, Float, Boolean, Date, DateTime, 
-    Text, DECIMAL, ForeignKey, CheckConstraint, UniqueConstraint
+    Text, DECIMAL, ForeignKey, CheckConstraint, UniqueConstraint, Index, text
 )
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -24,12 +24,18 @@ class User(Base):
     total_purchases = Column(Integer, default=0)
     total_units_consumed = Column(Float, default=0.0)
     
+    __table_args__ = (
+        Index('ix_users_risk_level', 'risk_level'),
+        Index('ix_users_blocked', 'user_id', postgresql_where=text('is_blocked = true')),
+    )
+    
     # Relationships
     transactions = relationship('Transaction', back_populates='user', cascade='all, delete-orphan')
     incidents = relationship('Incident', back_populates='user', cascade='all, delete-orphan')
     daily_limits = relationship('DailyLimit', back_populates='user', cascade='all, delete-orphan')
     pattern_flags = relationship('PatternFlag', back_populates='user', cascade='all, delete-orphan')
     alerts = relationship('Alert', back_populates='user', cascade='all, delete-orphan')
+    activity = relationship('UserActivity', back_populates='user', cascade='all, delete-orphan')
     
     def to_dict(self):
         return {
@@ -70,8 +76,8 @@ class Shop(Base):
             'location': self.location,
             'district': self.district,
             'pincode': self.pincode,
-            'latitude': float(self.latitude) if self.latitude else None,
-            'longitude': float(self.longitude) if self.longitude else None,
+            'latitude': float(self.latitude) if self.latitude is not None else None,
+            'longitude': float(self.longitude) if self.longitude is not None else None,
             'license_number': self.license_number
         }
 
@@ -92,6 +98,14 @@ class Transaction(Base):
     payment_method = Column(String(20))
     latitude = Column(DECIMAL(10, 8))
     longitude = Column(DECIMAL(11, 8))
+    client_ref = Column(String(64))  # Shop-side id of a purchase synced in bulk
+    
+    __table_args__ = (
+        Index('ix_transactions_user_date', 'user_id', 'transaction_date'),
+        Index('ix_transactions_date', 'transaction_date'),
+        Index('unique_shop_client_ref', 'shop_id', 'client_ref',
+              unique=True, postgresql_where=text('client_ref IS NOT NULL')),
+    )
     
     # Relationships
     user = relationship('User', back_populates='transactions')
@@ -108,11 +122,40 @@ class Transaction(Base):
             'quantity_ml': self.quantity_ml,
             'units': self.units,
             'abv_percentage': self.abv_percentage,
-            'amount_paid': float(self.amount_paid) if self.amount_paid else None,
+            'amount_paid': float(self.amount_paid) if self.amount_paid is not None else None,
             'payment_method': self.payment_method
         }
 
 
+class PurchaseRollup(Base):
+    __tablename__ = 'purchase_rollups'
+    
+    rollup_id = Column(Integer, primary_key=True)
+    rollup_date = Column(Date, nullable=False)
+    shop_id = Column(Integer, ForeignKey('shops.shop_id', ondelete='CASCADE'), nullable=False)
+    district = Column(String(50))
+    hour = Column(Integer, nullable=False)
+    purchase_count = Column(Integer, default=0)
+    total_units = Column(Float, default=0.0)
+    
+    __table_args__ = (
+        # A shop belongs to one district, so (date, shop, hour) identifies the bucket
+        UniqueConstraint('rollup_date', 'shop_id', 'hour', name='unique_rollup_bucket'),
+        Index('ix_purchase_rollups_district_date', 'district', 'rollup_date'),
+        Index('ix_purchase_rollups_date', 'rollup_date'),
+    )
+    
+    def to_dict(self):
+        return {
+            'rollup_date': self.rollup_date.isoformat() if self.rollup_date else None,
+            'shop_id': self.shop_id,
+            'district': self.district,
+            'hour': self.hour,
+            'purchase_count': self.purchase_count,
+            'total_units': self.total_units
+        }
+
+
 class DailyLimit(Base):
     __tablename__ = 'daily_limits'
     
@@ -124,6 +167,7 @@ class DailyLimit(Base):
     
     __table_args__ = (
         UniqueConstraint('user_id', 'date', name='unique_user_date'),
+        Index('ix_daily_limits_user_units', 'user_id', 'total_units_today'),
     )
     
     # Relationships
@@ -139,6 +183,37 @@ class DailyLimit(Base):
         }
 
 
+class UserActivity(Base):
+    __tablename__ = 'user_activity'
+    
+    activity_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    bucket_date = Column(Date, nullable=False)
+    purchase_count = Column(Integer, default=0)
+    total_units = Column(Float, default=0.0)
+    bulk_purchase_count = Column(Integer, default=0)
+    bulk_volume_ml = Column(Integer, default=0)
+    hour_counts = Column(ARRAY(Integer), nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint('user_id', 'bucket_date', name='unique_user_bucket'),
+    )
+    
+    # Relationships
+    user = relationship('User', back_populates='activity')
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'bucket_date': self.bucket_date.isoformat() if self.bucket_date else None,
+            'purchase_count': self.purchase_count,
+            'total_units': self.total_units,
+            'bulk_purchase_count': self.bulk_purchase_count,
+            'bulk_volume_ml': self.bulk_volume_ml,
+            'hour_counts': self.hour_counts
+        }
+
+
 class Incident(Base):
     __tablename__ = 'incidents'
     
@@ -155,6 +230,11 @@ class Incident(Base):
     reported_by = Column(String(100))
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        Index('ix_incidents_user_date', 'user_id', 'incident_date'),
+        Index('ix_incidents_date', 'incident_date'),
+    )
+    
     # Relationships
     user = relationship('User', back_populates='incidents')
     
@@ -182,6 +262,15 @@ class PatternFlag(Base):
     confidence_score = Column(Float)
     details = Column(JSONB)
     reviewed = Column(Boolean, default=False)
+    window_days = Column(Integer)
+    
+    __table_args__ = (
+        # At most one open flag per pattern and detection window
+        Index('unique_open_pattern_flag', 'user_id', 'pattern_type', 'window_days',
+              unique=True, postgresql_where=text('reviewed = false')),
+        Index('ix_pattern_flags_user_unreviewed', 'user_id',
+              postgresql_where=text('reviewed = false')),
+    )
     
     # Relationships
     user = relationship('User', back_populates='pattern_flags')
@@ -194,7 +283,8 @@ class PatternFlag(Base):
             'detected_date': self.detected_date.isoformat() if self.detected_date else None,
             'confidence_score': self.confidence_score,
             'details': self.details,
-            'reviewed': self.reviewed
+            'reviewed': self.reviewed,
+            'window_days': self.window_days
         }
 
 
@@ -208,6 +298,15 @@ class Alert(Base):
     severity = Column(String(20))
     created_at = Column(DateTime, default=datetime.utcnow)
     acknowledged = Column(Boolean, default=False)
+    dedup_key = Column(String(100))
+    
+    __table_args__ = (
+        # Repeated conditions update the open alert instead of adding rows
+        Index('unique_open_alert', 'dedup_key',
+              unique=True, postgresql_where=text('acknowledged = false')),
+        Index('ix_alerts_unacknowledged', 'created_at',
+              postgresql_where=text('acknowledged = false')),
+    )
     
     # Relationships
     user = relationship('User', back_populates='alerts')
@@ -0,0 +1,6 @@
+"""
+Performance tooling run against a local server and a seeded local Postgres
+
+    python -m utils.synthetic_data --scale 1 --reset
+    python -m perf.load_test run --duration 60 --output load.json
+"""
@@ -0,0 +1,234 @@
+"""
+Micro-benchmarks for the RiskEngine helpers
+
+Creates one benchmark user per history size (10, 1,000 and 100,000
+transactions by default) with matching activity buckets, daily limits and
+incidents, then times each RiskEngine method against each of them. Every
+call runs in its own transaction that is rolled back, so repeated runs
+measure the same state.
+
+Recorded per method and history size:
+    - wall time (median, min and max over the timed repeats)
+    - SQL statements issued
+    - peak Python memory allocated during the call (separate traced run)
+
+Usage (from backend/, against a seeded local database with at least one shop):
+    python -m perf.bench_risk_engine
+    python -m perf.bench_risk_engine --sizes 10,1000,100000 --repeat 7 --output bench.json
+"""
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from sqlalchemy import event, select, func, delete, text
+from database import engine, session_factory
+from models import User, Shop
+from risk_engine import RiskEngine
+from activity_tracker import ActivityTracker
+
+# Called as fn(user_id, db_session)
+METHODS = {
+    'calculate_risk_score': RiskEngine.calculate_risk_score,
+    'detect_bulk_buying_pattern': RiskEngine.detect_bulk_buying_pattern,
+    'detect_time_pattern': RiskEngine.detect_time_pattern,
+    'check_daily_limit': lambda user_id, db: RiskEngine.check_daily_limit(user_id, 2.0, db),
+    'update_daily_limit': lambda user_id, db: RiskEngine.update_daily_limit(user_id, 2.0, db),
+    'run_pattern_detection': RiskEngine.run_pattern_detection,
+}
+
+
+class StatementCounter:
+    """Counts statements sent through the engine; reset `count` between measurements"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def close(self):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+class RiskEngineBenchmark:
+    """Seeds fixed-size histories and times RiskEngine methods against them"""
+
+    HISTORY_DAYS = 60
+
+    def __init__(self, sizes, repeat=5, warmup=1):
+        self.sizes = sizes
+        self.repeat = repeat
+        self.warmup = warmup
+
+    @staticmethod
+    def aadhaar_for(size):
+        # Reserved 12-digit range so benchmark users are easy to find and remove
+        return f"999{size:09d}"
+
+    def seed_user(self, size, db):
+        """Create a benchmark user whose history has exactly `size` transactions"""
+        shop_id = db.execute(select(func.min(Shop.shop_id))).scalar()
+        if shop_id is None:
+            raise RuntimeError('No shops found; seed the database first')
+
+        self.drop_user(size, db)
+        user = User(aadhaar_mock=self.aadhaar_for(size), name=f"Benchmark {size}", age=35)
+        db.add(user)
+        db.flush()
+
+        # Deterministic spread over every hour of the last HISTORY_DAYS days,
+        # with every fourth purchase above the bulk threshold
+        db.execute(text("""
+            INSERT INTO transactions (
+                user_id, shop_id, transaction_date, alcohol_type, brand,
+                quantity_ml, units, abv_percentage, amount_paid, payment_method
+            )
+            SELECT :user_id, :shop_id,
+                   date_trunc('second', now()::timestamp)
+                       - make_interval(secs => (i * 7919) % (:days * 86400)),
+                   'Whiskey', 'Royal Stag', q, q * 42.8 / 1000, 42.8, q * 1.2, 'Cash'
+            FROM generate_series(1, :size) AS i,
+                 LATERAL (SELECT (ARRAY[180, 375, 750, 1500])[1 + i % 4] AS q) AS p
+        """), {'user_id': user.user_id, 'shop_id': shop_id, 'size': size, 'days': self.HISTORY_DAYS})
+
+        db.execute(text("""
+            INSERT INTO daily_limits (user_id, date, total_units_today, purchase_count_today)
+            SELECT user_id, transaction_date::date, SUM(units), COUNT(*)
+            FROM transactions WHERE user_id = :user_id
+            GROUP BY user_id, transaction_date::date
+        """), {'user_id': user.user_id})
+
+        db.execute(text("""
+            INSERT INTO incidents (user_id, incident_type, incident_date, severity, reported_by)
+            SELECT :user_id, 'Public Disturbance', CURRENT_DATE - (i * 17 % 365), 'Low', 'Police'
+            FROM generate_series(1, :count) AS i
+        """), {'user_id': user.user_id, 'count': min(20, size // 500 + 1)})
+
+        user_id = user.user_id
+        db.commit()
+        ActivityTracker.rebuild(db, user_id)
+        return user_id
+
+    def drop_user(self, size, db):
+        db.execute(delete(User).where(User.aadhaar_mock == self.aadhaar_for(size)))
+        db.commit()
+
+    def measure(self, fn, user_id, counter):
+        """Time fn over the repeats, then trace one more call for memory"""
+        timings = []
+        statements = None
+        for run in range(self.warmup + self.repeat):
+            db = session_factory()
+            try:
+                counter.count = 0
+                started = time.perf_counter()
+                fn(user_id, db)
+                db.flush()
+                elapsed = time.perf_counter() - started
+                if run >= self.warmup:
+                    timings.append(elapsed)
+                    statements = counter.count
+            finally:
+                db.rollback()
+                db.close()
+
+        db = session_factory()
+        try:
+            tracemalloc.start()
+            fn(user_id, db)
+            db.flush()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            db.rollback()
+            db.close()
+
+        return {
+            'median_ms': round(statistics.median(timings) * 1000, 3),
+            'min_ms': round(min(timings) * 1000, 3),
+            'max_ms': round(max(timings) * 1000, 3),
+            'statements': statements,
+            'peak_memory_kib': round(peak / 1024, 1)
+        }
+
+    def run(self, methods=None, keep=False):
+        methods = methods or list(METHODS)
+        counter = StatementCounter(engine)
+        db = session_factory()
+        results = []
+        try:
+            for size in self.sizes:
+                print(f"   seeding {size:,} transactions...")
+                user_id = self.seed_user(size, db)
+                for name in methods:
+                    result = self.measure(METHODS[name], user_id, counter)
+                    results.append({'method': name, 'history': size, **result})
+        finally:
+            counter.close()
+            if not keep:
+                for size in self.sizes:
+                    self.drop_user(size, db)
+            db.close()
+        return results
+
+
+def print_report(results, sizes):
+    by_key = {(r['method'], r['history']): r for r in results}
+    methods = list(dict.fromkeys(r['method'] for r in results))
+
+    print(f"\n{'method':<28}" + ''.join(f"{f'{s:,} tx':>26}" for s in sizes))
+    print(f"{'':<28}" + ''.join(f"{'ms / stmts / KiB':>26}" for _ in sizes))
+    for method in methods:
+        cells = []
+        for size in sizes:
+            r = by_key.get((method, size))
+            cells.append(f"{r['median_ms']:>10} / {r['statements']:>3} / {r['peak_memory_kib']:>6}" if r else '-')
+        print(f"{method:<28}" + ''.join(f"{c:>26}" for c in cells))
+
+    if len(sizes) > 1:
+        print(f"\nGrowth from {sizes[0]:,} to {sizes[-1]:,} transactions (median time):")
+        for method in methods:
+            first, last = by_key.get((method, sizes[0])), by_key.get((method, sizes[-1]))
+            if first and last and first['median_ms']:
+                print(f"   {method:<28} x{last['median_ms'] / first['median_ms']:.1f}")
+
+
+if __name__ == '__main__':
+    from perf.load_test import LoadTest
+
+    parser = argparse.ArgumentParser(description='Benchmark RiskEngine methods by history size')
+    parser.add_argument('--sizes', default='10,1000,100000')
+    parser.add_argument('--methods', default=','.join(METHODS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help='Keep the benchmark users afterwards')
+    parser.add_argument('--output', help='Write results as JSON')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    methods = args.methods.split(',')
+    unknown = [m for m in methods if m not in METHODS]
+    if unknown:
+        parser.error(f"Unknown method(s): {', '.join(unknown)}")
+
+    print(f"🚀 Benchmarking {len(methods)} methods at {', '.join(f'{s:,}' for s in sizes)} transactions")
+    benchmark = RiskEngineBenchmark(sizes, repeat=args.repeat, warmup=args.warmup)
+    results = benchmark.run(methods, keep=args.keep)
+    print_report(results, sizes)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'finished_at': datetime.utcnow().isoformat(),
+                    'git_commit': LoadTest.git_commit(),
+                    'repeat': args.repeat,
+                    'warmup': args.warmup
+                },
+                'results': results
+            }, f, indent=2)
+        print(f"✅ Results written to {args.output}")
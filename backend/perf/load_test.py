@@ -0,0 +1,427 @@
+"""
+End-to-end load test for the purchase hot path
+
+Drives a weighted mix of Aadhaar lookups, purchase logging, dashboard and
+list reads from concurrent simulated terminals, optionally with Socket.IO
+subscribers attached, against a running server. Reports throughput and
+p50/p95/p99 latency per endpoint plus database commits and statements per
+request, and writes everything to a JSON file that later runs compare to.
+
+Database counters come from pg_stat_database and, when the extension is
+installed, pg_stat_statements, so they include work done off the request
+path by the analysis queue.
+
+Usage (from backend/, with the server running on a seeded database):
+    python -m perf.load_test run --duration 60 --concurrency 32 --output load.json
+    python -m perf.load_test run --mix lookup=60,log=30,dashboard=10 --subscribers 50
+    python -m perf.load_test compare baseline.json load.json --threshold 0.1
+"""
+import argparse
+import http.client
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+from sqlalchemy import create_engine, text
+
+DEFAULT_MIX = 'lookup=45,log=30,dashboard=15,recent=5,risk=5'
+
+
+class Terminal:
+    """One simulated shop terminal with its own keep-alive connection"""
+
+    def __init__(self, base_url, users, shops, seed):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.users = users
+        self.shops = shops
+        self.random = random.Random(seed)
+        self.conn = None
+
+    def request(self, method, path, body=None):
+        """
+        Returns: (status, latency_seconds, statements)
+        statements comes from X-DB-Statements when the server's query budget is on
+        """
+        if self.conn is None:
+            connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.conn = connection_class(self.host, self.port, timeout=30)
+
+        payload = json.dumps(body) if body is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            statements = response.getheader('X-DB-Statements')
+            return (
+                response.status, time.perf_counter() - started,
+                int(statements) if statements is not None else None
+            )
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            return 0, time.perf_counter() - started, None
+
+    def lookup(self):
+        user_id, aadhaar = self.random.choice(self.users)
+        return self.request('GET', f'/api/users/aadhaar/{aadhaar}')
+
+    def log(self):
+        user_id, _ = self.random.choice(self.users)
+        quantity_ml = self.random.choice([180, 180, 375, 650])
+        return self.request('POST', '/api/transactions/log', {
+            'user_id': user_id,
+            'shop_id': self.random.choice(self.shops),
+            'alcohol_type': 'Beer',
+            'brand': 'Kingfisher',
+            'quantity_ml': quantity_ml,
+            'abv_percentage': 5.0,
+            'amount_paid': round(quantity_ml * 0.3, 2),
+            'payment_method': self.random.choice(['Cash', 'UPI', 'Card'])
+        })
+
+    def dashboard(self):
+        return self.request('GET', '/api/analytics/dashboard')
+
+    def recent(self):
+        return self.request('GET', '/api/transactions/recent?limit=20')
+
+    def risk(self):
+        user_id, _ = self.random.choice(self.users)
+        return self.request('GET', f'/api/users/{user_id}/risk')
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+class Subscriber:
+    """Socket.IO dashboard client subscribed to every event"""
+
+    def __init__(self, base_url):
+        import socketio
+        self.base_url = base_url
+        self.client = socketio.Client(reconnection=False)
+        self.frames = 0
+        self.events = 0
+        self.dropped = 0
+        self.client.on('event_batch', self.on_batch)
+
+    def on_batch(self, frame):
+        self.frames += 1
+        self.events += len(frame.get('events', []))
+        self.dropped += sum(frame.get('dropped', {}).values())
+
+    def start(self):
+        self.client.connect(self.base_url, transports=['websocket'])
+        self.client.emit('subscribe', {'all': True})
+
+    def stop(self):
+        self.client.disconnect()
+
+
+class LoadTest:
+    """Runs a timed load mix and summarises latency, throughput and DB cost"""
+
+    OPERATIONS = ('lookup', 'log', 'dashboard', 'recent', 'risk')
+
+    def __init__(self, base_url, database_url, mix, concurrency=16, duration=30,
+                 subscribers=0, seed=42, user_sample=5000):
+        self.base_url = base_url.rstrip('/')
+        self.engine = create_engine(database_url) if database_url else None
+        self.mix = mix
+        self.concurrency = concurrency
+        self.duration = duration
+        self.subscribers = subscribers
+        self.seed = seed
+        self.user_sample = user_sample
+        self.samples = {name: [] for name in mix}
+        self.statuses = {name: {} for name in mix}
+        self.statements = {name: [] for name in mix}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_mix(spec):
+        mix = {}
+        for part in spec.split(','):
+            name, _, weight = part.partition('=')
+            if name not in LoadTest.OPERATIONS:
+                raise ValueError(f"Unknown operation: {name} (expected one of {', '.join(LoadTest.OPERATIONS)})")
+            mix[name] = float(weight or 1)
+        return mix
+
+    def load_fixtures(self):
+        """Unblocked users and shops to drive requests with"""
+        with self.engine.connect() as conn:
+            users = conn.execute(text("""
+                SELECT user_id, aadhaar_mock FROM users
+                WHERE is_blocked = false
+                ORDER BY md5(user_id::text || :seed)
+                LIMIT :limit
+            """), {'seed': str(self.seed), 'limit': self.user_sample}).all()
+            shops = conn.execute(text("SELECT shop_id FROM shops")).scalars().all()
+        if not users or not shops:
+            raise RuntimeError('No users or shops found; seed the database first')
+        return [tuple(u) for u in users], list(shops)
+
+    def db_counters(self):
+        """Cumulative commits, rollbacks and (if available) statements for this database"""
+        if self.engine is None:
+            return None
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT pg_stat_clear_snapshot()"))
+            counters = dict(conn.execute(text("""
+                SELECT xact_commit AS commits, xact_rollback AS rollbacks
+                FROM pg_stat_database WHERE datname = current_database()
+            """)).mappings().one())
+            try:
+                counters['statements'] = conn.execute(text("""
+                    SELECT SUM(calls) FROM pg_stat_statements
+                    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+                """)).scalar()
+            except Exception:
+                conn.rollback()
+                counters['statements'] = None
+        return counters
+
+    def worker(self, index, users, shops, deadline):
+        terminal = Terminal(self.base_url, users, shops, self.seed + index)
+        names = list(self.mix)
+        weights = list(self.mix.values())
+        try:
+            while time.monotonic() < deadline:
+                name = terminal.random.choices(names, weights)[0]
+                status, latency, statements = getattr(terminal, name)()
+                with self._lock:
+                    self.samples[name].append(latency)
+                    if statements is not None:
+                        self.statements[name].append(statements)
+                    self.statuses[name][status] = self.statuses[name].get(status, 0) + 1
+        finally:
+            terminal.close()
+
+    @staticmethod
+    def percentile(ordered, fraction):
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    def summarise(self, name, elapsed):
+        ordered = sorted(self.samples[name])
+        statuses = self.statuses[name]
+        errors = sum(count for status, count in statuses.items() if status == 0 or status >= 500)
+        ms = lambda v: round(v * 1000, 2) if v is not None else None
+        statements = self.statements[name]
+        return {
+            'requests': len(ordered),
+            'errors': errors,
+            'statuses': {str(s): c for s, c in sorted(statuses.items())},
+            'throughput_rps': round(len(ordered) / elapsed, 1),
+            'p50_ms': ms(self.percentile(ordered, 0.50)),
+            'p95_ms': ms(self.percentile(ordered, 0.95)),
+            'p99_ms': ms(self.percentile(ordered, 0.99)),
+            'max_ms': ms(ordered[-1] if ordered else None),
+            'statements_per_request': (
+                round(sum(statements) / len(statements), 2) if statements else None
+            )
+        }
+
+    def run(self):
+        users, shops = self.load_fixtures()
+
+        subscribers = []
+        if self.subscribers:
+            try:
+                for _ in range(self.subscribers):
+                    subscriber = Subscriber(self.base_url)
+                    subscriber.start()
+                    subscribers.append(subscriber)
+            except ImportError:
+                print("⚠️  python-socketio client not installed; running without subscribers")
+
+        # Database counters are cumulative; the run costs the difference
+        before = self.db_counters()
+        started_at = datetime.utcnow()
+        started = time.monotonic()
+        deadline = started + self.duration
+        threads = [
+            threading.Thread(target=self.worker, args=(i, users, shops, deadline), daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        # Background analysis and statistics flushes land shortly after the last response
+        time.sleep(2)
+        after = self.db_counters()
+        for subscriber in subscribers:
+            subscriber.stop()
+
+        endpoints = {name: self.summarise(name, elapsed) for name in self.mix}
+        total = sum(e['requests'] for e in endpoints.values())
+
+        db = None
+        if before and after and total:
+            db = {
+                'commits_per_request': round((after['commits'] - before['commits']) / total, 2),
+                'rollbacks_per_request': round((after['rollbacks'] - before['rollbacks']) / total, 2),
+                'statements_per_request': (
+                    round((after['statements'] - before['statements']) / total, 2)
+                    if after['statements'] is not None and before['statements'] is not None else None
+                )
+            }
+
+        return {
+            'meta': {
+                'started_at': started_at.isoformat(),
+                'git_commit': self.git_commit(),
+                'base_url': self.base_url,
+                'duration_seconds': round(elapsed, 1),
+                'concurrency': self.concurrency,
+                'mix': self.mix,
+                'seed': self.seed
+            },
+            'overall': {
+                'requests': total,
+                'errors': sum(e['errors'] for e in endpoints.values()),
+                'throughput_rps': round(total / elapsed, 1)
+            },
+            'endpoints': endpoints,
+            'db': db,
+            'socketio': {
+                'subscribers': len(subscribers),
+                'frames': sum(s.frames for s in subscribers),
+                'events': sum(s.events for s in subscribers),
+                'dropped': sum(s.dropped for s in subscribers)
+            } if subscribers else None
+        }
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL
+            ).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    @staticmethod
+    def compare(baseline, current, threshold=0.1):
+        """
+        Compare two result files endpoint by endpoint
+        Returns a list of regression messages; latency and DB cost may not
+        grow, and throughput may not shrink, by more than `threshold`
+        """
+        regressions = []
+
+        def check(label, old, new, higher_is_worse=True):
+            if old in (None, 0) or new is None:
+                return
+            change = (new - old) / old
+            worse = change > threshold if higher_is_worse else change < -threshold
+            marker = '❌' if worse else '  '
+            print(f"{marker} {label:<40} {old:>10} -> {new:>10} ({change:+.1%})")
+            if worse:
+                regressions.append(f"{label}: {old} -> {new} ({change:+.1%})")
+
+        for name, new in current['endpoints'].items():
+            old = baseline['endpoints'].get(name)
+            if not old:
+                continue
+            check(f"{name} p50_ms", old['p50_ms'], new['p50_ms'])
+            check(f"{name} p95_ms", old['p95_ms'], new['p95_ms'])
+            check(f"{name} p99_ms", old['p99_ms'], new['p99_ms'])
+            check(f"{name} throughput_rps", old['throughput_rps'], new['throughput_rps'], False)
+            check(f"{name} statements_per_request",
+                  old.get('statements_per_request'), new.get('statements_per_request'))
+
+        check('overall throughput_rps', baseline['overall']['throughput_rps'],
+              current['overall']['throughput_rps'], False)
+        if baseline.get('db') and current.get('db'):
+            for key in ('commits_per_request', 'statements_per_request'):
+                check(f"db {key}", baseline['db'][key], current['db'][key])
+
+        return regressions
+
+
+def print_report(result):
+    print(f"\n{'endpoint':<12}{'requests':>10}{'errors':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, e in result['endpoints'].items():
+        print(f"{name:<12}{e['requests']:>10}{e['errors']:>8}{e['throughput_rps']:>9}"
+              f"{e['p50_ms'] or '-':>9}{e['p95_ms'] or '-':>9}{e['p99_ms'] or '-':>9}")
+    overall = result['overall']
+    print(f"\nTotal {overall['requests']} requests, {overall['errors']} errors, "
+          f"{overall['throughput_rps']} req/s")
+    if result['db']:
+        print(f"DB per request: {result['db']['commits_per_request']} commits, "
+              f"{result['db']['statements_per_request']} statements")
+    if result['socketio']:
+        s = result['socketio']
+        print(f"Socket.IO: {s['subscribers']} subscribers, {s['events']} events in "
+              f"{s['frames']} frames, {s['dropped']} dropped")
+
+
+if __name__ == '__main__':
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Load test the purchase hot path')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Run a load test')
+    run.add_argument('--base-url', default='http://localhost:5001')
+    run.add_argument('--database-url', default=Config.DATABASE_URL)
+    run.add_argument('--duration', type=int, default=30)
+    run.add_argument('--concurrency', type=int, default=16)
+    run.add_argument('--subscribers', type=int, default=0)
+    run.add_argument('--mix', default=DEFAULT_MIX)
+    run.add_argument('--seed', type=int, default=42)
+    run.add_argument('--output', help='Write results as JSON')
+    run.add_argument('--baseline', help='Compare against an earlier result file')
+    run.add_argument('--threshold', type=float, default=0.1)
+
+    compare = commands.add_parser('compare', help='Compare two result files')
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=0.1)
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        test = LoadTest(
+            args.base_url, args.database_url, LoadTest.parse_mix(args.mix),
+            concurrency=args.concurrency, duration=args.duration,
+            subscribers=args.subscribers, seed=args.seed
+        )
+        print(f"🚀 {args.concurrency} terminals for {args.duration}s against {args.base_url}")
+        result = test.run()
+        print_report(result)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(result, f, indent=2)
+            print(f"✅ Results written to {args.output}")
+        baseline_path = args.baseline
+        current = result
+    else:
+        with open(args.current) as f:
+            current = json.load(f)
+        baseline_path = args.baseline
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = LoadTest.compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.threshold:.0%}")
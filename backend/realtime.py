@@ -0,0 +1,253 @@
+import threading
+import uuid
+from collections import deque, Counter
+from message_bus import create_bus
+from config import Config
+
+class ClientQueue:
+    """Bounded outbound queue for one Socket.IO client"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.events = deque()
+        self.dropped = Counter()
+        self.rooms = set()
+        self.event_types = None  # None means every event type
+
+    def push(self, event):
+        """Queue an event, dropping the oldest one when full"""
+        if len(self.events) >= self.maxsize:
+            oldest = self.events.popleft()
+            self.dropped[oldest['type']] += 1
+        self.events.append(event)
+
+    def take(self, count):
+        """Remove and return up to `count` events plus a summary of drops"""
+        batch = [self.events.popleft() for _ in range(min(count, len(self.events)))]
+        dropped = dict(self.dropped)
+        self.dropped.clear()
+        return batch, dropped
+
+
+class EventHub:
+    """
+    Topic-based fan-out for real-time events
+    Clients join rooms by shop, district, user or 'all' and may restrict
+    event types. Events are queued per client and flushed as batched
+    'event_batch' frames, so a slow client only ever loses its own oldest
+    events instead of holding up everyone else
+    Published events travel over a message bus so every worker process
+    delivers them to its own connected clients
+    """
+
+    def __init__(self, batch_size=100, interval=0.25, queue_size=1000):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue_size = queue_size
+        self.socketio = None
+        self.bus = None
+        self.origin = uuid.uuid4().hex
+        self._clients = {}
+        self._rooms = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+
+        # Metrics
+        self.published = 0
+        self.frames_sent = 0
+        self.events_sent = 0
+        self.events_dropped = 0
+
+    def init_app(self, app, socketio, bus=None):
+        self.socketio = socketio
+        self.bus = bus or create_bus()
+        self.bus.subscribe(self._receive)
+        self.bus.start(socketio.start_background_task)
+        app.event_hub = self
+
+    @staticmethod
+    def socketio_options():
+        """
+        SocketIO server options for the configured worker layout
+        Long-polling needs every request of a session on the same worker, so
+        without sticky sessions multiple workers accept websocket only
+        """
+        if Config.WEB_CONCURRENCY > 1 and Config.MESSAGE_BUS == 'local':
+            raise RuntimeError(
+                'WEB_CONCURRENCY > 1 needs a cross-process MESSAGE_BUS such as postgres'
+            )
+        if Config.WEB_CONCURRENCY > 1 and not Config.STICKY_SESSIONS:
+            return {'transports': ['websocket']}
+        return {'transports': ['polling', 'websocket']}
+
+    @staticmethod
+    def rooms_for(shop_id=None, district=None, user_id=None):
+        """Rooms an event is delivered to"""
+        rooms = {'all'}
+        if shop_id is not None:
+            rooms.add(f"shop:{shop_id}")
+        if district:
+            rooms.add(f"district:{district}")
+        if user_id is not None:
+            rooms.add(f"user:{user_id}")
+        return rooms
+
+    @staticmethod
+    def _requested_rooms(data):
+        rooms = set()
+        if data.get('all'):
+            rooms.add('all')
+        rooms.update(f"shop:{s}" for s in data.get('shops', []))
+        rooms.update(f"district:{d}" for d in data.get('districts', []))
+        rooms.update(f"user:{u}" for u in data.get('users', []))
+        return rooms
+
+    def add_client(self, sid):
+        with self._lock:
+            self._clients[sid] = ClientQueue(self.queue_size)
+        self._ensure_flusher()
+
+    def remove_client(self, sid):
+        with self._lock:
+            client = self._clients.pop(sid, None)
+            if client:
+                for room in client.rooms:
+                    members = self._rooms.get(room)
+                    if members:
+                        members.discard(sid)
+                        if not members:
+                            del self._rooms[room]
+
+    def subscribe(self, sid, data):
+        """
+        Join rooms from {'all': bool, 'shops': [...], 'districts': [...],
+        'users': [...]} and optionally limit to {'events': [...]}
+        Returns the client's resulting subscription
+        """
+        rooms = self._requested_rooms(data)
+
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None:
+                return None
+            for room in rooms:
+                self._rooms.setdefault(room, set()).add(sid)
+            client.rooms |= rooms
+            if 'events' in data:
+                client.event_types = set(data['events']) if data['events'] else None
+            return self._describe(client)
+
+    def unsubscribe(self, sid, data):
+        """Leave the rooms named in the same shape as subscribe()"""
+        rooms = self._requested_rooms(data)
+
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None:
+                return None
+            for room in rooms & client.rooms:
+                members = self._rooms.get(room)
+                if members:
+                    members.discard(sid)
+                    if not members:
+                        del self._rooms[room]
+            client.rooms -= rooms
+            return self._describe(client)
+
+    @staticmethod
+    def _describe(client):
+        return {
+            'rooms': sorted(client.rooms),
+            'events': sorted(client.event_types) if client.event_types else None
+        }
+
+    def publish(self, event_type, data, shop_id=None, district=None, user_id=None):
+        """Deliver an event here and hand it to the bus for the other workers"""
+        message = {
+            'origin': self.origin,
+            'event': {'type': event_type, 'data': data},
+            'rooms': sorted(self.rooms_for(shop_id, district, user_id))
+        }
+        with self._lock:
+            self.published += 1
+        self._deliver(message)
+
+        if self.bus is not None:
+            try:
+                self.bus.publish(message)
+            except Exception as e:
+                print(f"Message bus publish error: {e}")
+
+    def _receive(self, message):
+        """Bus callback; this worker already delivered its own messages"""
+        if message.get('origin') != self.origin:
+            self._deliver(message)
+
+    def _deliver(self, message):
+        """Queue an event for every local client subscribed to one of its rooms"""
+        event = message['event']
+        event_type = event['type']
+
+        with self._lock:
+            recipients = set()
+            for room in message['rooms']:
+                recipients |= self._rooms.get(room, set())
+
+            for sid in recipients:
+                client = self._clients[sid]
+                if client.event_types is not None and event_type not in client.event_types:
+                    continue
+                if len(client.events) >= client.maxsize:
+                    self.events_dropped += 1
+                client.push(event)
+
+    def _ensure_flusher(self):
+        if self._flusher is None and self.socketio is not None:
+            with self._lock:
+                if self._flusher is None:
+                    self._flusher = self.socketio.start_background_task(self._flush_loop)
+
+    def _flush_loop(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Websocket flush error: {e}")
+
+    def flush(self):
+        """Send each client at most one batch of queued events"""
+        with self._lock:
+            frames = []
+            for sid, client in self._clients.items():
+                if client.events or client.dropped:
+                    batch, dropped = client.take(self.batch_size)
+                    frames.append((sid, batch, dropped))
+
+        for sid, batch, dropped in frames:
+            frame = {'events': batch}
+            if dropped:
+                frame['dropped'] = dropped
+            self.socketio.emit('event_batch', frame, to=sid)
+            self.frames_sent += 1
+            self.events_sent += len(batch)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'rooms': len(self._rooms),
+                'queued': sum(len(c.events) for c in self._clients.values()),
+                'published': self.published,
+                'frames_sent': self.frames_sent,
+                'events_sent': self.events_sent,
+                'events_dropped': self.events_dropped,
+                'bus': self.bus.metrics() if self.bus else None
+            }
+
+
+event_hub = EventHub(
+    batch_size=Config.SOCKET_BATCH_SIZE,
+    interval=Config.SOCKET_BATCH_INTERVAL_MS / 1000,
+    queue_size=Config.SOCKET_CLIENT_QUEUE_SIZE
+)
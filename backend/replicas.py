@@ -0,0 +1,202 @@
+"""
+Read-replica routing
+
+GET requests are served from a healthy read replica, picked round-robin
+once per request; everything else, views marked @use_primary and reads
+inside a client's read-your-writes window stay on the primary. The
+routing session in database.py asks read_engine() which engine the current
+request reads from, and always sends flushes, INSERT/UPDATE/DELETE
+statements (ORM or text()) and locking reads to the primary.
+
+A background thread checks each replica every REPLICA_CHECK_INTERVAL
+seconds. A replica is taken out of rotation when it cannot be reached, is
+not in recovery, or has fallen more than REPLICA_MAX_LAG_SECONDS behind.
+A disconnect seen by a request takes it out immediately.
+
+Read-your-writes: after a successful write request the client's signed
+session cookie records the time, and its reads go to the primary for
+READ_YOUR_WRITES_SECONDS (0 disables it). Cross-origin frontends must send
+credentials for the cookie to come back, and with replicas configured the
+cookie is made SameSite=None; Secure (READ_YOUR_WRITES_COOKIE_*) so
+browsers send it cross-site; without replicas the session cookie keeps
+Flask's defaults. Clients that drop cookies (third-party cookie blocking,
+non-browser terminals) get no read-your-writes guarantee: their reads may
+briefly miss their own writes.
+
+Code that must reach the primary inside a replica-routed request, beyond
+what the routing session recognises as a write, wraps it in
+`with on_primary():` or passes bind_arguments={'bind': engine}.
+"""
+import contextlib
+import contextvars
+import itertools
+import threading
+import time
+from flask import g, request, session
+from sqlalchemy import event, text
+from config import Config
+
+_read_engine = contextvars.ContextVar('read_engine', default=None)
+
+READ_METHODS = {'GET', 'HEAD'}
+
+# Replay lag in seconds; 0 when everything received has been replayed, since
+# the last replay timestamp stops moving while the primary is idle
+LAG_SQL = """
+    SELECT pg_is_in_recovery() AS in_recovery,
+           CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+           END AS lag
+"""
+
+
+def read_engine():
+    """The replica engine the current request reads from, or None for the primary"""
+    return _read_engine.get()
+
+
+@contextlib.contextmanager
+def on_primary():
+    """Send the session's statements in this block to the primary"""
+    token = _read_engine.set(None)
+    try:
+        yield
+    finally:
+        _read_engine.reset(token)
+
+
+def use_primary(fn):
+    """Keep a GET view on the primary (it writes, or must see the latest data)"""
+    fn.use_primary = True
+    return fn
+
+
+class Replica:
+    """One read replica and its last health check"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.name = engine.url.host or str(engine.url)
+        self.healthy = False
+        self.lag = None
+        self.error = 'not checked yet'
+        self.checked_at = None
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                row = conn.execute(text(LAG_SQL)).one()
+            if not row.in_recovery:
+                self.healthy, self.error = False, 'not in recovery (is this the primary?)'
+            elif row.lag is not None and row.lag > Config.REPLICA_MAX_LAG_SECONDS:
+                self.healthy, self.error = False, f"lagging {float(row.lag):.1f}s"
+            else:
+                self.healthy, self.error = True, None
+            self.lag = float(row.lag) if row.lag is not None else None
+        except Exception as e:
+            self.healthy, self.error = False, str(e)
+        self.checked_at = time.time()
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'healthy': self.healthy,
+            'lag_seconds': round(self.lag, 3) if self.lag is not None else None,
+            'error': self.error,
+            'checked_seconds_ago': round(time.time() - self.checked_at, 1) if self.checked_at else None
+        }
+
+
+class ReplicaSet:
+    """Round-robin over the healthy replicas, with per-request routing hooks"""
+
+    def __init__(self, engines):
+        self.replicas = [Replica(engine) for engine in engines]
+        self._turn = itertools.count()
+        self._thread = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+        for replica in self.replicas:
+            event.listen(replica.engine, 'handle_error', self._disconnect_listener(replica))
+
+    @staticmethod
+    def _disconnect_listener(replica):
+        def handle_error(context):
+            if context.is_disconnect:
+                replica.healthy, replica.error = False, 'disconnected'
+        return handle_error
+
+    def pick(self):
+        """Next healthy replica engine, or None when none is usable"""
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)].engine
+
+    def check_all(self):
+        for replica in self.replicas:
+            replica.check()
+
+    def _run(self):
+        while True:
+            self.check_all()
+            time.sleep(Config.REPLICA_CHECK_INTERVAL)
+
+    @staticmethod
+    def within_write_window():
+        if Config.READ_YOUR_WRITES_SECONDS <= 0:
+            return False
+        last_write = session.get('last_write_at')
+        return last_write is not None and time.time() - last_write < Config.READ_YOUR_WRITES_SECONDS
+
+    def init_app(self, app):
+        """Route each request's reads and start the health checks; no-op without replicas"""
+        app.replica_set = self
+        if not self.replicas:
+            return
+        if Config.READ_YOUR_WRITES_SECONDS > 0:
+            if not app.secret_key:
+                raise RuntimeError('SECRET_KEY must be set to sign the read-your-writes session cookie')
+            app.config.update(
+                SESSION_COOKIE_SAMESITE=Config.READ_YOUR_WRITES_COOKIE_SAMESITE,
+                SESSION_COOKIE_SECURE=Config.READ_YOUR_WRITES_COOKIE_SECURE
+            )
+
+        self._thread = threading.Thread(target=self._run, name='replica-health', daemon=True)
+        self._thread.start()
+
+        @app.before_request
+        def choose_read_engine():
+            view = app.view_functions.get(request.endpoint)
+            replica = None
+            if (request.method in READ_METHODS and not getattr(view, 'use_primary', False)
+                    and not ReplicaSet.within_write_window()):
+                replica = self.pick()
+
+            if replica is None:
+                self.primary_reads += request.method in READ_METHODS
+            else:
+                self.replica_reads += 1
+            g.read_engine_token = _read_engine.set(replica)
+
+        @app.after_request
+        def remember_write(response):
+            if (Config.READ_YOUR_WRITES_SECONDS > 0 and request.method not in READ_METHODS
+                    and request.method != 'OPTIONS' and response.status_code < 400):
+                session['last_write_at'] = time.time()
+            return response
+
+        @app.teardown_request
+        def reset_read_engine(exc):
+            token = g.pop('read_engine_token', None)
+            if token is not None:
+                _read_engine.reset(token)
+
+    def metrics(self):
+        return {
+            'replicas': [r.to_dict() for r in self.replicas],
+            'healthy': sum(r.healthy for r in self.replicas),
+            'replica_reads': self.replica_reads,
+            'primary_reads': self.primary_reads,
+            'read_your_writes_seconds': Config.READ_YOUR_WRITES_SECONDS
+        }
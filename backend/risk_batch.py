@@ -0,0 +1,203 @@
+import time
+import numpy as np
+from sqlalchemy import func, select, case, text
+from models import User, Incident, PatternFlag, DailyLimit, UserActivity
+from activity_tracker import ActivityTracker
+from config import Config
+
+class BatchRiskScorer:
+    """Vectorized risk rescoring for the whole user base"""
+
+    UPDATE_CHUNK_SIZE = 50000
+    LEVELS = np.array(["Green", "Yellow", "Red"])
+
+    @staticmethod
+    def _grouped(stmt, user_ids, db_session, columns):
+        """
+        Run a per-user GROUP BY statement and align its columns with user_ids
+        Users missing from the result get zeros; rows for users not in
+        user_ids (registered after it was read) are dropped
+        """
+        rows = db_session.execute(stmt).all()
+        aligned = {name: np.zeros(len(user_ids)) for name in columns}
+        if not rows:
+            return aligned
+
+        data = np.array(rows, dtype=float)
+        row_ids = data[:, 0].astype(np.int64)
+        positions = np.searchsorted(user_ids, row_ids)
+        # Each query reads its own snapshot, so a row's user may be newer than user_ids
+        known = positions < len(user_ids)
+        known[known] = user_ids[positions[known]] == row_ids[known]
+        positions, data = positions[known], data[known]
+        for i, name in enumerate(columns, start=1):
+            aligned[name][positions] = data[:, i]
+        return aligned
+
+    @staticmethod
+    def load_features(db_session):
+        """
+        Pull the scoring inputs for every user as NumPy columns
+        Returns: (user_ids, features)
+        """
+        user_ids = np.array(
+            db_session.execute(select(User.user_id).order_by(User.user_id)).scalars().all(),
+            dtype=np.int64
+        )
+        features = {}
+
+        features.update(BatchRiskScorer._grouped(
+            select(
+                UserActivity.user_id,
+                func.sum(UserActivity.purchase_count),
+                func.sum(UserActivity.total_units),
+                func.sum(ActivityTracker.hours(0, 10)),
+                func.sum(ActivityTracker.hours(22, 24))
+            ).where(
+                UserActivity.bucket_date >= ActivityTracker.window_start(30)
+            ).group_by(UserActivity.user_id),
+            user_ids, db_session,
+            ['purchase_count', 'total_units', 'early_morning', 'late_night']
+        ))
+
+        features.update(BatchRiskScorer._grouped(
+            select(
+                Incident.user_id,
+                func.count(Incident.incident_id),
+                func.sum(case(
+                    (Incident.severity == 'High', 15),
+                    (Incident.severity == 'Medium', 10),
+                    else_=5
+                ))
+            ).group_by(Incident.user_id),
+            user_ids, db_session,
+            ['incident_count', 'incident_score']
+        ))
+
+        features.update(BatchRiskScorer._grouped(
+            select(
+                PatternFlag.user_id,
+                func.count(PatternFlag.flag_id),
+                func.count().filter(PatternFlag.confidence_score > 0.7)
+            ).where(
+                PatternFlag.reviewed == False
+            ).group_by(PatternFlag.user_id),
+            user_ids, db_session,
+            ['flag_count', 'high_confidence_flags']
+        ))
+
+        features.update(BatchRiskScorer._grouped(
+            select(
+                DailyLimit.user_id,
+                func.count(DailyLimit.limit_id)
+            ).where(
+                DailyLimit.total_units_today > Config.DAILY_UNIT_LIMIT
+            ).group_by(DailyLimit.user_id),
+            user_ids, db_session,
+            ['limit_violations']
+        ))
+
+        return user_ids, features
+
+    @staticmethod
+    def score(features):
+        """
+        Vectorized form of RiskEngine.score_features
+        Returns: (risk_scores, risk_levels)
+        """
+        purchase_count = features['purchase_count']
+        total_units = features['total_units']
+
+        # Factor 1: Purchase Frequency (0-25 points)
+        score = np.select(
+            [purchase_count > Config.HIGH_FREQUENCY_THRESHOLD, purchase_count > 10],
+            [25, 15], default=0
+        )
+
+        # Factor 2: Volume Consumed (0-25 points)
+        score = score + np.select([total_units > 100, total_units > 50], [25, 15], default=0)
+
+        # Factor 3: Time Patterns (0-15 points)
+        score = score + np.where(features['early_morning'] > 5, 10, 0)
+        score = score + np.where(features['late_night'] > 5, 5, 0)
+
+        # Factor 4: Incident History (0-30 points)
+        score = score + np.minimum(features['incident_score'], 30)
+
+        # Factor 5: Pattern Flags (0-20 points)
+        flag_score = features['high_confidence_flags'] * 10 + features['flag_count'] * 3
+        score = score + np.minimum(flag_score, 20)
+
+        # Factor 6: Daily Limit Violations (0-15 points)
+        violations = features['limit_violations']
+        score = score + np.select([violations > 5, violations > 0], [15, 10], default=0)
+
+        # Normalize to 0-100
+        score = np.minimum(score, 100)
+
+        level_index = (
+            (score >= Config.RISK_THRESHOLD_YELLOW).astype(np.int64)
+            + (score >= Config.RISK_THRESHOLD_RED).astype(np.int64)
+        )
+        return score, BatchRiskScorer.LEVELS[level_index]
+
+    @staticmethod
+    def write_back(user_ids, scores, levels, db_session):
+        """
+        Bulk UPDATE users from parallel arrays, skipping unchanged rows
+        Returns the number of users whose score or level changed
+        """
+        updated = 0
+        for start in range(0, len(user_ids), BatchRiskScorer.UPDATE_CHUNK_SIZE):
+            end = start + BatchRiskScorer.UPDATE_CHUNK_SIZE
+            result = db_session.execute(text("""
+                UPDATE users AS u
+                SET risk_score = v.risk_score, risk_level = v.risk_level
+                FROM unnest(
+                    CAST(:user_ids AS integer[]),
+                    CAST(:scores AS double precision[]),
+                    CAST(:levels AS varchar[])
+                ) AS v(user_id, risk_score, risk_level)
+                WHERE u.user_id = v.user_id
+                  AND (u.risk_score IS DISTINCT FROM v.risk_score
+                       OR u.risk_level IS DISTINCT FROM v.risk_level)
+            """), {
+                'user_ids': user_ids[start:end].tolist(),
+                'scores': scores[start:end].astype(float).tolist(),
+                'levels': levels[start:end].tolist()
+            })
+            updated += result.rowcount
+        return updated
+
+    @staticmethod
+    def rescore_all(db_session):
+        """
+        Recalculate risk score and level for every user
+        Returns a summary of the run
+        """
+        started = time.perf_counter()
+
+        user_ids, features = BatchRiskScorer.load_features(db_session)
+        scores, levels = BatchRiskScorer.score(features)
+        updated = BatchRiskScorer.write_back(user_ids, scores, levels, db_session)
+        db_session.commit()
+
+        names, counts = np.unique(levels, return_counts=True)
+        return {
+            'users_scored': int(len(user_ids)),
+            'users_updated': int(updated),
+            'risk_distribution': {str(n): int(c) for n, c in zip(names, counts)},
+            'duration_seconds': round(time.perf_counter() - started, 3)
+        }
+
+
+if __name__ == '__main__':
+    from database import Session
+
+    db = Session()
+    try:
+        summary = BatchRiskScorer.rescore_all(db)
+    finally:
+        db.close()
+    print(f"✅ Rescored {summary['users_scored']} users "
+          f"({summary['users_updated']} changed) in {summary['duration_seconds']}s")
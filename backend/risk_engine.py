@@ -1,32 +1,105 @@
-from datetime import datetime, timedelta
-from sqlalchemy import func
-from models import User, Transaction, Incident, PatternFlag, DailyLimit, Alert
+from datetime import datetime
+from sqlalchemy import func, select, update, case, true, text, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from models import User, Incident, PatternFlag, DailyLimit, Alert, UserActivity
+from activity_tracker import ActivityTracker
+from utils.metrics import track_sql_caller
+from utils.query_budget import budgeted_methods
+from utils.clock import limit_day
 from config import Config
 
+@track_sql_caller
+@budgeted_methods
 class RiskEngine:
-    """Risk scoring and pattern detection engine"""
+    """
+    Risk scoring and pattern detection engine
+    Helpers never commit; the caller owns the transaction
+    """
+    
+    # Statements each helper may issue per call (see utils.query_budget)
+    QUERY_BUDGETS = {
+        '_risk_features': 1,
+        'calculate_risk_score': 2,
+        'detect_bulk_buying_pattern': 2,
+        'detect_time_pattern': 2,
+        'check_daily_limit': 1,
+        'reserve_daily_units': 2,
+        'update_daily_limit': 3,
+        'upsert_alert': 1,
+        'upsert_pattern_flag': 1,
+        'run_pattern_detection': 4
+    }
+    
+    # RETURNING value of an upsert: true when the row was inserted, false
+    # when an existing row was updated
+    INSERTED = literal_column('(xmax = 0)').label('inserted')
     
     @staticmethod
-    def calculate_risk_score(user_id, db_session):
+    def _risk_features(user_id, db_session):
         """
-        Calculate comprehensive risk score for a user
-        Returns: (risk_score, risk_level, contributing_factors)
+        Fetch every risk scoring input for a user in one aggregate statement
+        Returns a row mapping, or None if the user does not exist
         """
-        user = db_session.query(User).filter_by(user_id=user_id).first()
-        if not user:
-            return None, None, []
+        recent = select(
+            func.coalesce(func.sum(UserActivity.purchase_count), 0).label('purchase_count'),
+            func.coalesce(func.sum(UserActivity.total_units), 0).label('total_units'),
+            func.coalesce(func.sum(ActivityTracker.hours(0, 10)), 0).label('early_morning'),
+            func.coalesce(func.sum(ActivityTracker.hours(22, 24)), 0).label('late_night')
+        ).where(
+            UserActivity.user_id == user_id,
+            UserActivity.bucket_date >= ActivityTracker.window_start(30)
+        ).subquery()
+        
+        incidents = select(
+            func.count(Incident.incident_id).label('incident_count'),
+            func.coalesce(func.sum(case(
+                (Incident.severity == 'High', 15),
+                (Incident.severity == 'Medium', 10),
+                else_=5
+            )), 0).label('incident_score')
+        ).where(Incident.user_id == user_id).subquery()
+        
+        flags = select(
+            func.count(PatternFlag.flag_id).label('flag_count'),
+            func.count().filter(PatternFlag.confidence_score > 0.7).label('high_confidence_flags')
+        ).where(
+            PatternFlag.user_id == user_id,
+            PatternFlag.reviewed == False
+        ).subquery()
         
+        violations = select(
+            func.count(DailyLimit.limit_id).label('limit_violations')
+        ).where(
+            DailyLimit.user_id == user_id,
+            DailyLimit.total_units_today > Config.DAILY_UNIT_LIMIT
+        ).subquery()
+        
+        stmt = select(
+            User.risk_level,
+            recent, incidents, flags, violations
+        ).select_from(User).join(
+            recent, true()
+        ).join(
+            incidents, true()
+        ).join(
+            flags, true()
+        ).join(
+            violations, true()
+        ).where(User.user_id == user_id)
+        
+        return db_session.execute(stmt).mappings().first()
+    
+    @staticmethod
+    def score_features(features):
+        """
+        Apply the six scoring factors to pre-aggregated features
+        Returns: (risk_score, risk_level, contributing_factors)
+        """
         score = 0
         factors = []
-        cutoff_date = datetime.now() - timedelta(days=30)
         
         # Factor 1: Purchase Frequency (0-25 points)
-        transactions = db_session.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.transaction_date >= cutoff_date
-        ).all()
-        
-        purchase_count = len(transactions)
+        purchase_count = features['purchase_count']
         if purchase_count > Config.HIGH_FREQUENCY_THRESHOLD:
             score += 25
             factors.append(f"High frequency: {purchase_count} purchases/month")
@@ -35,7 +108,7 @@ class RiskEngine:
             factors.append(f"Elevated frequency: {purchase_count} purchases/month")
         
         # Factor 2: Volume Consumed (0-25 points)
-        total_units = sum([t.units or 0 for t in transactions])
+        total_units = features['total_units']
         if total_units > 100:
             score += 25
             factors.append(f"High volume: {total_units:.1f} units/month")
@@ -44,52 +117,27 @@ class RiskEngine:
             factors.append(f"Elevated volume: {total_units:.1f} units/month")
         
         # Factor 3: Time Patterns (0-15 points)
-        early_morning = [t for t in transactions if t.transaction_date.hour < 10]
-        late_night = [t for t in transactions if t.transaction_date.hour >= 22]
-        
-        if len(early_morning) > 5:
+        if features['early_morning'] > 5:
             score += 10
-            factors.append(f"Early morning purchases: {len(early_morning)}")
-        if len(late_night) > 5:
+            factors.append(f"Early morning purchases: {features['early_morning']}")
+        if features['late_night'] > 5:
             score += 5
-            factors.append(f"Late night purchases: {len(late_night)}")
+            factors.append(f"Late night purchases: {features['late_night']}")
         
         # Factor 4: Incident History (0-30 points)
-        incidents = db_session.query(Incident).filter(
-            Incident.user_id == user_id
-        ).all()
-        
-        incident_score = 0
-        for incident in incidents:
-            if incident.severity == "High":
-                incident_score += 15
-            elif incident.severity == "Medium":
-                incident_score += 10
-            else:
-                incident_score += 5
-        
-        score += min(incident_score, 30)
-        if incidents:
-            factors.append(f"Incident history: {len(incidents)} incidents")
+        score += min(features['incident_score'], 30)
+        if features['incident_count']:
+            factors.append(f"Incident history: {features['incident_count']} incidents")
         
         # Factor 5: Pattern Flags (0-20 points)
-        pattern_flags = db_session.query(PatternFlag).filter(
-            PatternFlag.user_id == user_id,
-            PatternFlag.reviewed == False
-        ).all()
-        
-        if pattern_flags:
-            high_confidence = [f for f in pattern_flags if f.confidence_score > 0.7]
-            flag_score = min(len(high_confidence) * 10 + len(pattern_flags) * 3, 20)
+        flag_count = features['flag_count']
+        if flag_count:
+            flag_score = min(features['high_confidence_flags'] * 10 + flag_count * 3, 20)
             score += flag_score
-            factors.append(f"Pattern flags: {len(pattern_flags)} detected")
+            factors.append(f"Pattern flags: {flag_count} detected")
         
         # Factor 6: Daily Limit Violations (0-15 points)
-        limit_violations = db_session.query(DailyLimit).filter(
-            DailyLimit.user_id == user_id,
-            DailyLimit.total_units_today > Config.DAILY_UNIT_LIMIT
-        ).count()
-        
+        limit_violations = features['limit_violations']
         if limit_violations > 5:
             score += 15
             factors.append(f"Frequent limit violations: {limit_violations}")
@@ -108,13 +156,30 @@ class RiskEngine:
         else:
             risk_level = "Green"
         
+        return score, risk_level, factors
+    
+    @staticmethod
+    def calculate_risk_score(user_id, db_session):
+        """
+        Calculate comprehensive risk score for a user
+        Returns: (risk_score, risk_level, contributing_factors)
+        """
+        features = RiskEngine._risk_features(user_id, db_session)
+        if features is None:
+            return None, None, []
+        
+        score, risk_level, factors = RiskEngine.score_features(features)
+        previous_level = features['risk_level']
+        
         # Update user record
-        user.risk_score = score
-        user.risk_level = risk_level
-        db_session.commit()
+        db_session.execute(
+            update(User)
+            .where(User.user_id == user_id)
+            .values(risk_score=score, risk_level=risk_level)
+        )
         
         # Create alert if risk level changed
-        if user.risk_level != risk_level:
+        if previous_level != risk_level:
             RiskEngine.create_alert(
                 user_id, 
                 "RiskLevelChange",
@@ -127,71 +192,64 @@ class RiskEngine:
     
     @staticmethod
     def detect_bulk_buying_pattern(user_id, db_session):
-        """Detect bulk buying patterns (possible proxy for minors)"""
-        cutoff_date = datetime.now() - timedelta(days=7)
-        
-        transactions = db_session.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.transaction_date >= cutoff_date
-        ).all()
-        
-        high_volume = [t for t in transactions 
-                      if t.quantity_ml and t.quantity_ml > Config.BULK_PURCHASE_THRESHOLD_ML]
+        """
+        Detect bulk buying patterns (possible proxy for minors)
+        Returns: (detected, confidence, new_flag)
+        """
+        window = ActivityTracker.window_totals(
+            user_id, 7, db_session,
+            high_volume_count=UserActivity.bulk_purchase_count,
+            total_volume=UserActivity.bulk_volume_ml
+        )
+        high_volume_count = window['high_volume_count']
         
-        if len(high_volume) >= 3:
-            confidence = min(len(high_volume) / 5, 1.0)
+        if high_volume_count >= 3:
+            confidence = min(high_volume_count / 5, 1.0)
             
-            # Create pattern flag
-            pattern_flag = PatternFlag(
-                user_id=user_id,
-                pattern_type="BulkBuying",
-                confidence_score=confidence,
-                details={
-                    "high_volume_count": len(high_volume),
-                    "total_volume": sum([t.quantity_ml for t in high_volume]),
+            new_flag = RiskEngine.upsert_pattern_flag(
+                user_id, "BulkBuying", 7, confidence,
+                {
+                    "high_volume_count": high_volume_count,
+                    "total_volume": window['total_volume'],
                     "period_days": 7
-                }
+                },
+                db_session
             )
-            db_session.add(pattern_flag)
-            db_session.commit()
             
-            return True, confidence
+            return True, confidence, new_flag
         
-        return False, 0.0
+        return False, 0.0, False
     
     @staticmethod
     def detect_time_pattern(user_id, db_session):
-        """Detect concerning time patterns"""
-        cutoff_date = datetime.now() - timedelta(days=30)
-        
-        transactions = db_session.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.transaction_date >= cutoff_date
-        ).all()
-        
-        morning = [t for t in transactions if 5 <= t.transaction_date.hour < 10]
-        late_night = [t for t in transactions 
-                     if t.transaction_date.hour >= 23 or t.transaction_date.hour < 5]
+        """
+        Detect concerning time patterns
+        Returns: (detected, confidence, new_flag)
+        """
+        window = ActivityTracker.window_totals(
+            user_id, 30, db_session,
+            morning=ActivityTracker.hours(5, 10),
+            late_night=ActivityTracker.hours(23, 24) + ActivityTracker.hours(0, 5)
+        )
+        morning = window['morning']
+        late_night = window['late_night']
         
-        if len(morning) > 7 or len(late_night) > 7:
+        if morning > 7 or late_night > 7:
             confidence = 0.7
             
-            pattern_flag = PatternFlag(
-                user_id=user_id,
-                pattern_type="UnusualTimePattern",
-                confidence_score=confidence,
-                details={
-                    "morning_count": len(morning),
-                    "late_night_count": len(late_night),
+            new_flag = RiskEngine.upsert_pattern_flag(
+                user_id, "UnusualTimePattern", 30, confidence,
+                {
+                    "morning_count": morning,
+                    "late_night_count": late_night,
                     "period_days": 30
-                }
+                },
+                db_session
             )
-            db_session.add(pattern_flag)
-            db_session.commit()
             
-            return True, confidence
+            return True, confidence, new_flag
         
-        return False, 0.0
+        return False, 0.0, False
     
     @staticmethod
     def check_daily_limit(user_id, units, db_session):
@@ -199,24 +257,12 @@ class RiskEngine:
         Check if purchase would exceed daily limit
         Returns: (allowed, current_units, remaining_units)
         """
-        today = datetime.now().date()
+        today = limit_day()
         
-        daily_limit = db_session.query(DailyLimit).filter(
+        current_units = db_session.query(DailyLimit.total_units_today).filter(
             DailyLimit.user_id == user_id,
             DailyLimit.date == today
-        ).first()
-        
-        if not daily_limit:
-            daily_limit = DailyLimit(
-                user_id=user_id,
-                date=today,
-                total_units_today=0,
-                purchase_count_today=0
-            )
-            db_session.add(daily_limit)
-            db_session.commit()
-        
-        current_units = daily_limit.total_units_today
+        ).scalar() or 0
         new_total = current_units + units
         
         if new_total > Config.DAILY_UNIT_LIMIT:
@@ -224,10 +270,49 @@ class RiskEngine:
         
         return True, current_units, Config.DAILY_UNIT_LIMIT - new_total
     
+    @staticmethod
+    def reserve_daily_units(user_id, units, db_session):
+        """
+        Atomically check and consume daily allowance in one statement
+        The conditional upsert locks the user's row for today, so concurrent
+        terminals serving the same person cannot both pass the check
+        Returns: (allowed, current_units, remaining_units)
+        """
+        today = limit_day()
+        limit = Config.DAILY_UNIT_LIMIT
+        
+        if units <= limit:
+            stmt = insert(DailyLimit).values(
+                user_id=user_id,
+                date=today,
+                total_units_today=units,
+                purchase_count_today=1
+            )
+            stmt = stmt.on_conflict_do_update(
+                constraint='unique_user_date',
+                set_={
+                    'total_units_today': DailyLimit.total_units_today + stmt.excluded.total_units_today,
+                    'purchase_count_today': DailyLimit.purchase_count_today + 1
+                },
+                where=DailyLimit.total_units_today + stmt.excluded.total_units_today <= limit
+            ).returning(DailyLimit.total_units_today)
+            
+            new_total = db_session.execute(stmt).scalar()
+            if new_total is not None:
+                return True, new_total - units, limit - new_total
+        
+        # Rejected: report how much of today's allowance is already used
+        current_units = db_session.query(DailyLimit.total_units_today).filter(
+            DailyLimit.user_id == user_id,
+            DailyLimit.date == today
+        ).scalar() or 0
+        
+        return False, current_units, limit - current_units
+    
     @staticmethod
     def update_daily_limit(user_id, units, db_session):
         """Update daily limit after successful purchase"""
-        today = datetime.now().date()
+        today = limit_day()
         
         daily_limit = db_session.query(DailyLimit).filter(
             DailyLimit.user_id == user_id,
@@ -246,15 +331,14 @@ class RiskEngine:
             )
             db_session.add(daily_limit)
         
-        db_session.commit()
-        
-        # Create alert if limit exceeded
+        # Create (or refresh today's) alert if limit exceeded
         if daily_limit.total_units_today > Config.DAILY_UNIT_LIMIT:
-            RiskEngine.create_alert(
+            RiskEngine.upsert_alert(
                 user_id,
                 "DailyLimitExceeded",
                 f"Daily limit exceeded: {daily_limit.total_units_today:.1f} units",
                 "Warning",
+                f"DailyLimitExceeded:{user_id}:{today.isoformat()}",
                 db_session
             )
     
@@ -268,20 +352,74 @@ class RiskEngine:
             severity=severity
         )
         db_session.add(alert)
-        db_session.commit()
         return alert
     
+    @staticmethod
+    def upsert_alert(user_id, alert_type, message, severity, dedup_key, db_session):
+        """
+        Create an alert, or refresh the open alert with the same dedup key
+        Returns True when a new alert was inserted
+        """
+        stmt = insert(Alert).values(
+            user_id=user_id,
+            alert_type=alert_type,
+            message=message,
+            severity=severity,
+            dedup_key=dedup_key,
+            created_at=datetime.utcnow(),
+            acknowledged=False
+        )
+        return db_session.execute(stmt.on_conflict_do_update(
+            index_elements=['dedup_key'],
+            index_where=text('acknowledged = false'),
+            set_={
+                'message': stmt.excluded.message,
+                'severity': stmt.excluded.severity
+            }
+        ).returning(RiskEngine.INSERTED)).scalar()
+    
+    @staticmethod
+    def upsert_pattern_flag(user_id, pattern_type, window_days, confidence, details, db_session):
+        """
+        Create a pattern flag, or update the open flag for the same window in place
+        Returns True when a new flag was inserted
+        """
+        stmt = insert(PatternFlag).values(
+            user_id=user_id,
+            pattern_type=pattern_type,
+            window_days=window_days,
+            detected_date=datetime.utcnow(),
+            confidence_score=confidence,
+            details=details,
+            reviewed=False
+        )
+        return db_session.execute(stmt.on_conflict_do_update(
+            index_elements=['user_id', 'pattern_type', 'window_days'],
+            index_where=text('reviewed = false'),
+            set_={
+                'detected_date': stmt.excluded.detected_date,
+                'confidence_score': stmt.excluded.confidence_score,
+                'details': stmt.excluded.details
+            }
+        ).returning(RiskEngine.INSERTED)).scalar()
+    
     @staticmethod
     def run_pattern_detection(user_id, db_session):
-        """Run all pattern detection algorithms"""
+        """
+        Run all pattern detection algorithms
+        Returns: [(pattern_type, confidence, new_flag)]
+        """
         patterns_detected = []
         
-        bulk, bulk_conf = RiskEngine.detect_bulk_buying_pattern(user_id, db_session)
-        if bulk:
-            patterns_detected.append(("BulkBuying", bulk_conf))
-        
-        time, time_conf = RiskEngine.detect_time_pattern(user_id, db_session)
-        if time:
-            patterns_detected.append(("UnusualTimePattern", time_conf))
+        # Keep pending alerts out of the detector queries; they are inserted
+        # in one batch at the caller's commit
+        with db_session.no_autoflush:
+            bulk, bulk_conf, bulk_new = RiskEngine.detect_bulk_buying_pattern(user_id, db_session)
+            if bulk:
+                patterns_detected.append(("BulkBuying", bulk_conf, bulk_new))
+            
+            time, time_conf, time_new = RiskEngine.detect_time_pattern(user_id, db_session)
+            if time:
+                patterns_detected.append(("UnusualTimePattern", time_conf, time_new))
         
         return patterns_detected
\ No newline at end of file
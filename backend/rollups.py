@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, delete, cast, text, Date, Integer
+from models import PurchaseRollup, Transaction, Shop
+
+class PurchaseRollups:
+    """Hourly purchase rollups per shop and district backing the trend endpoints"""
+
+    # Resolve the shop's district and add a purchase (or a pre-merged group of
+    # purchases) to its hourly bucket in one statement
+    UPSERT_SQL = text("""
+        INSERT INTO purchase_rollups (rollup_date, shop_id, district, hour, purchase_count, total_units)
+        SELECT :rollup_date, s.shop_id, s.district, :hour, :purchase_count, :total_units
+        FROM shops s
+        WHERE s.shop_id = :shop_id
+        ON CONFLICT (rollup_date, shop_id, hour) DO UPDATE SET
+            purchase_count = purchase_rollups.purchase_count + EXCLUDED.purchase_count,
+            total_units = purchase_rollups.total_units + EXCLUDED.total_units
+    """)
+
+    @staticmethod
+    def record_purchase(shop_id, units, purchased_at, db_session):
+        """Add a purchase to its shop's hourly bucket"""
+        db_session.execute(PurchaseRollups.UPSERT_SQL, {
+            'rollup_date': purchased_at.date(),
+            'hour': purchased_at.hour,
+            'shop_id': shop_id,
+            'purchase_count': 1,
+            'total_units': units or 0
+        })
+
+    @staticmethod
+    def record_purchases(purchases, db_session):
+        """
+        Add many (shop_id, units, purchased_at) purchases, merged per shop
+        and hour so each bucket is written once
+        """
+        buckets = {}
+        for shop_id, units, purchased_at in purchases:
+            key = (purchased_at.date(), purchased_at.hour, shop_id)
+            bucket = buckets.setdefault(key, {
+                'rollup_date': key[0],
+                'hour': key[1],
+                'shop_id': shop_id,
+                'purchase_count': 0,
+                'total_units': 0
+            })
+            bucket['purchase_count'] += 1
+            bucket['total_units'] += units or 0
+
+        if buckets:
+            db_session.execute(PurchaseRollups.UPSERT_SQL, list(buckets.values()))
+        return len(buckets)
+
+    @staticmethod
+    def rebuild(db_session, since=None):
+        """
+        Recompute rollups from transactions, from `since` (a date) onwards or
+        for all history
+        Returns the number of buckets written
+        """
+        rollup_date = cast(Transaction.transaction_date, Date)
+        hour = cast(func.extract('hour', Transaction.transaction_date), Integer)
+
+        buckets = select(
+            rollup_date,
+            Transaction.shop_id,
+            Shop.district,
+            hour,
+            func.count(Transaction.transaction_id),
+            func.coalesce(func.sum(Transaction.units), 0)
+        ).join(Shop, Shop.shop_id == Transaction.shop_id).group_by(
+            rollup_date, Transaction.shop_id, Shop.district, hour
+        )
+
+        clear = delete(PurchaseRollup)
+        if since:
+            buckets = buckets.where(Transaction.transaction_date >= since)
+            clear = clear.where(PurchaseRollup.rollup_date >= since)
+
+        db_session.execute(clear)
+        result = db_session.execute(
+            PurchaseRollup.__table__.insert().from_select(
+                ['rollup_date', 'shop_id', 'district', 'hour', 'purchase_count', 'total_units'],
+                buckets
+            )
+        )
+        db_session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def trends(db_session, days, *group_by, **filters):
+        """
+        Daily purchase counts and unit sums over the last `days` days,
+        optionally split by rollup columns and filtered by column value
+        """
+        cutoff_date = (datetime.now() - timedelta(days=days)).date()
+        group_columns = [getattr(PurchaseRollup, name) for name in group_by]
+
+        stmt = select(
+            PurchaseRollup.rollup_date,
+            *group_columns,
+            func.sum(PurchaseRollup.purchase_count).label('purchase_count'),
+            func.sum(PurchaseRollup.total_units).label('total_units')
+        ).where(PurchaseRollup.rollup_date >= cutoff_date)
+
+        for name, value in filters.items():
+            if value is not None:
+                stmt = stmt.where(getattr(PurchaseRollup, name) == value)
+
+        stmt = stmt.group_by(PurchaseRollup.rollup_date, *group_columns).order_by(
+            PurchaseRollup.rollup_date, *group_columns
+        )
+        return db_session.execute(stmt).mappings().all()
+
+
+if __name__ == '__main__':
+    import sys
+    from datetime import date
+    from database import Session
+
+    since = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    db = Session()
+    try:
+        count = PurchaseRollups.rebuild(db, since)
+    finally:
+        db.close()
+    print(f"✅ Rebuilt {count} purchase rollup buckets" + (f" since {since}" if since else ""))
@@ -1,103 +1,103 @@
-from flask import Blueprint, request, jsonify
-from sqlalchemy import func
-from datetime import datetime, timedelta
-from models import User, Transaction, Incident, Alert, PatternFlag
+from flask import Blueprint, request, jsonify, current_app
+from models import User
 from database import Session
+from utils.dashboard_stats import DashboardStats
+from rollups import PurchaseRollups
+from utils.query_budget import query_budget
+from utils.fast_json import FastJSON, USER_FIELDS
+from utils.read_cache import cached_read
 
 analytics_bp = Blueprint('analytics', __name__)
 
 @analytics_bp.route('/dashboard', methods=['GET'])
+@query_budget(1)
 def get_dashboard_stats():
     """Get overall system statistics"""
     try:
         db = Session()
+        stats = DashboardStats.get(db)
+        db.close()
         
-        # User statistics
-        total_users = db.query(User).count()
-        blocked_users = db.query(User).filter_by(is_blocked=True).count()
+        return jsonify(stats), 200
         
-        risk_distribution = db.query(
-            User.risk_level,
-            func.count(User.user_id)
-        ).group_by(User.risk_level).all()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/trends/purchases', methods=['GET'])
+def get_purchase_trends():
+    """Get purchase trends over time"""
+    try:
+        db = Session()
         
-        # Transaction statistics
-        total_transactions = db.query(Transaction).count()
+        days = request.args.get('days', 30, type=int)
         
-        # Recent transactions (last 30 days)
-        cutoff_date = datetime.now() - timedelta(days=30)
-        recent_transactions = db.query(Transaction).filter(
-            Transaction.transaction_date >= cutoff_date
-        ).count()
+        # Daily purchase counts from the hourly rollups
+        daily_stats = PurchaseRollups.trends(db, days)
         
-        # Total units consumed
-        total_units = db.query(func.sum(Transaction.units)).scalar() or 0
+        result = [{
+            'date': str(stat['rollup_date']),
+            'purchase_count': stat['purchase_count'],
+            'total_units': float(stat['total_units'] or 0)
+        } for stat in daily_stats]
         
-        # Incident statistics
-        total_incidents = db.query(Incident).count()
-        recent_incidents = db.query(Incident).filter(
-            Incident.incident_date >= cutoff_date.date()
-        ).count()
+        db.close()
         
-        # Active alerts
-        active_alerts = db.query(Alert).filter_by(acknowledged=False).count()
+        return jsonify({
+            'period_days': days,
+            'trends': result
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/trends/shops', methods=['GET'])
+def get_shop_trends():
+    """Get daily purchase trends per shop"""
+    try:
+        db = Session()
         
-        # Pattern flags
-        active_patterns = db.query(PatternFlag).filter_by(reviewed=False).count()
+        days = request.args.get('days', 30, type=int)
+        shop_id = request.args.get('shop_id', type=int)
+        
+        daily_stats = PurchaseRollups.trends(db, days, 'shop_id', 'district', shop_id=shop_id)
+        
+        result = [{
+            'date': str(stat['rollup_date']),
+            'shop_id': stat['shop_id'],
+            'district': stat['district'],
+            'purchase_count': stat['purchase_count'],
+            'total_units': float(stat['total_units'] or 0)
+        } for stat in daily_stats]
         
         db.close()
         
         return jsonify({
-            'users': {
-                'total': total_users,
-                'blocked': blocked_users,
-                'risk_distribution': dict(risk_distribution)
-            },
-            'transactions': {
-                'total': total_transactions,
-                'last_30_days': recent_transactions,
-                'total_units_consumed': float(total_units)
-            },
-            'incidents': {
-                'total': total_incidents,
-                'last_30_days': recent_incidents
-            },
-            'alerts': {
-                'active': active_alerts
-            },
-            'patterns': {
-                'active_flags': active_patterns
-            }
+            'period_days': days,
+            'trends': result
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@analytics_bp.route('/trends/purchases', methods=['GET'])
-def get_purchase_trends():
-    """Get purchase trends over time"""
+@analytics_bp.route('/trends/districts', methods=['GET'])
+def get_district_trends():
+    """Get daily purchase trends per district"""
     try:
         db = Session()
         
         days = request.args.get('days', 30, type=int)
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        # Daily purchase counts
-        daily_stats = db.query(
-            func.date(Transaction.transaction_date).label('date'),
-            func.count(Transaction.transaction_id).label('count'),
-            func.sum(Transaction.units).label('total_units')
-        ).filter(
-            Transaction.transaction_date >= cutoff_date
-        ).group_by(
-            func.date(Transaction.transaction_date)
-        ).order_by('date').all()
+        district = request.args.get('district')
+        
+        daily_stats = PurchaseRollups.trends(db, days, 'district', district=district)
         
         result = [{
-            'date': str(stat.date),
-            'purchase_count': stat.count,
-            'total_units': float(stat.total_units or 0)
+            'date': str(stat['rollup_date']),
+            'district': stat['district'],
+            'purchase_count': stat['purchase_count'],
+            'total_units': float(stat['total_units'] or 0)
         } for stat in daily_stats]
         
         db.close()
@@ -112,20 +112,47 @@ def get_purchase_trends():
 
 
 @analytics_bp.route('/high-risk-users', methods=['GET'])
+@cached_read('users')
 def get_high_risk_users():
     """Get list of high-risk users"""
     try:
         db = Session()
         
-        high_risk_users = db.query(User).filter_by(risk_level='Red').all()
-        result = [user.to_dict() for user in high_risk_users]
+        rows = db.query(*USER_FIELDS.columns).filter(User.risk_level == 'Red').all()
         
         db.close()
         
-        return jsonify({
-            'count': len(result),
-            'users': result
-        }), 200
+        return FastJSON.response({'count': len(rows)}, 'users', rows, USER_FIELDS), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/queue', methods=['GET'])
+def get_analysis_queue_metrics():
+    """Get post-purchase analysis queue depth and lag"""
+    try:
+        return jsonify(current_app.analysis_queue.metrics()), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/realtime', methods=['GET'])
+def get_realtime_metrics():
+    """Get real-time fan-out client, queue and drop counters"""
+    try:
+        return jsonify(current_app.event_hub.metrics()), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+
+@analytics_bp.route('/replicas', methods=['GET'])
+def get_replica_status():
+    """Get read-replica health, lag and read routing counters"""
+    try:
+        return jsonify(current_app.replica_set.metrics()), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,241 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from sqlalchemy import select
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+import csv
+import io
+import json
+from models import Transaction, Shop, Incident
+from database import session_factory
+from config import Config
+
+exports_bp = Blueprint('exports', __name__)
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# (field, column, parquet type name)
+TRANSACTION_FIELDS = [
+    ('transaction_id', Transaction.transaction_id, 'int64'),
+    ('user_id', Transaction.user_id, 'int64'),
+    ('shop_id', Transaction.shop_id, 'int64'),
+    ('district', Shop.district, 'string'),
+    ('transaction_date', Transaction.transaction_date, 'timestamp'),
+    ('alcohol_type', Transaction.alcohol_type, 'string'),
+    ('brand', Transaction.brand, 'string'),
+    ('quantity_ml', Transaction.quantity_ml, 'int64'),
+    ('units', Transaction.units, 'float64'),
+    ('abv_percentage', Transaction.abv_percentage, 'float64'),
+    ('amount_paid', Transaction.amount_paid, 'float64'),
+    ('payment_method', Transaction.payment_method, 'string'),
+]
+
+INCIDENT_FIELDS = [
+    ('incident_id', Incident.incident_id, 'int64'),
+    ('user_id', Incident.user_id, 'int64'),
+    ('incident_type', Incident.incident_type, 'string'),
+    ('incident_date', Incident.incident_date, 'date'),
+    ('location', Incident.location, 'string'),
+    ('police_report_number', Incident.police_report_number, 'string'),
+    ('severity', Incident.severity, 'string'),
+    ('reported_by', Incident.reported_by, 'string'),
+    ('created_at', Incident.created_at, 'timestamp'),
+]
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parse_range():
+    """
+    Parse ?start_date= and ?end_date= (ISO dates or datetimes)
+    A date-only end_date includes that whole day
+    Returns: (start, end_exclusive)
+    """
+    start = request.args.get('start_date')
+    end = request.args.get('end_date')
+
+    start = datetime.fromisoformat(start) if start else None
+    if end:
+        end_date = datetime.fromisoformat(end)
+        end = end_date + timedelta(days=1) if len(request.args['end_date']) == 10 else end_date
+    return start, end
+
+
+def _stream_partitions(stmt):
+    """
+    Yield result rows in chunks from a server-side cursor
+    Uses its own session so the stream can outlive the request's scoped session
+    """
+    db = session_factory()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=Config.EXPORT_CHUNK_ROWS))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _plain(value):
+    """
+    Convert database values to JSON/CSV friendly values, as in to_dict()
+    NULL stays None and a zero Decimal stays 0.0
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _csv_body(fields, partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _, _ in fields])
+    yield buffer.getvalue()
+
+    for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([[_plain(v) for v in row] for row in rows])
+        yield buffer.getvalue()
+
+
+def _ndjson_body(fields, partitions):
+    names = [name for name, _, _ in fields]
+    for rows in partitions:
+        yield ''.join(
+            json.dumps(dict(zip(names, [_plain(v) for v in row]))) + '\n'
+            for row in rows
+        )
+
+
+def _parquet_body(fields, partitions, pa, pq):
+    types = {
+        'int64': pa.int64(),
+        'float64': pa.float64(),
+        'string': pa.string(),
+        'date': pa.date32(),
+        'timestamp': pa.timestamp('us')
+    }
+    schema = pa.schema([(name, types[kind]) for name, _, kind in fields])
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in partitions:
+            columns = list(zip(*rows))
+            arrays = [
+                pa.array([float(v) if isinstance(v, Decimal) else v for v in column], type=field.type)
+                for column, field in zip(columns, schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _export(name, fields, stmt):
+    """Build a streaming response for the requested export format"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format: {export_format}"}), 400
+
+    partitions = _stream_partitions(stmt)
+
+    if export_format == 'csv':
+        body = _csv_body(fields, partitions)
+    elif export_format == 'ndjson':
+        body = _ndjson_body(fields, partitions)
+    else:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            return jsonify({'error': 'Parquet export requires pyarrow'}), 501
+        body = _parquet_body(fields, partitions, pa, pq)
+
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename={name}.{export_format}'}
+    )
+
+
+@exports_bp.route('/transactions', methods=['GET'])
+def export_transactions():
+    """Stream transactions filtered by date range, shop and district"""
+    try:
+        start, end = _parse_range()
+        shop_id = request.args.get('shop_id', type=int)
+        district = request.args.get('district')
+
+        stmt = select(*[column for _, column, _ in TRANSACTION_FIELDS]).select_from(
+            Transaction
+        ).outerjoin(Shop, Shop.shop_id == Transaction.shop_id)
+
+        if start:
+            stmt = stmt.where(Transaction.transaction_date >= start)
+        if end:
+            stmt = stmt.where(Transaction.transaction_date < end)
+        if shop_id:
+            stmt = stmt.where(Transaction.shop_id == shop_id)
+        if district:
+            stmt = stmt.where(Shop.district == district)
+
+        return _export('transactions', TRANSACTION_FIELDS, stmt.order_by(Transaction.transaction_id))
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@exports_bp.route('/incidents', methods=['GET'])
+def export_incidents():
+    """Stream incidents filtered by incident date range"""
+    try:
+        start, end = _parse_range()
+
+        stmt = select(*[column for _, column, _ in INCIDENT_FIELDS])
+
+        if start:
+            stmt = stmt.where(Incident.incident_date >= start)
+        if end:
+            stmt = stmt.where(Incident.incident_date < end)
+
+        return _export('incidents', INCIDENT_FIELDS, stmt.order_by(Incident.incident_id))
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
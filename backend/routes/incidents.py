@@ -1,6 +1,10 @@
 from flask import Blueprint, request, jsonify
 from models import Incident, User
 from database import Session
+from utils.pagination import Paginator, InvalidCursor
+from utils.dashboard_stats import DashboardStats
+from utils.fast_json import FastJSON, INCIDENT_FIELDS
+from utils.read_cache import TableVersions, cached_read
 
 incidents_bp = Blueprint('incidents', __name__)
 
@@ -36,7 +40,9 @@ def report_incident():
         )
         
         db.add(incident)
+        TableVersions.bump(db, 'incidents')
         db.commit()
+        DashboardStats.invalidate()
         
         result = incident.to_dict()
         db.close()
@@ -72,57 +78,65 @@ def get_incident(incident_id):
 
 @incidents_bp.route('/user/<int:user_id>', methods=['GET'])
 def get_user_incidents(user_id):
-    """Get all incidents for a user"""
+    """Get a page of incidents for a user, newest first"""
     try:
         db = Session()
         
-        user = db.query(User).filter_by(user_id=user_id).first()
+        user = db.query(User.user_id).filter(User.user_id == user_id).first()
         if not user:
             db.close()
             return jsonify({'error': 'User not found'}), 404
         
-        incidents = db.query(Incident).filter_by(user_id=user_id).order_by(
-            Incident.incident_date.desc()
-        ).all()
+        rows, next_cursor = Paginator.paginate(
+            db.query(*INCIDENT_FIELDS.columns).filter(Incident.user_id == user_id),
+            [Incident.incident_date, Incident.incident_id], descending=True
+        )
         
-        result = [i.to_dict() for i in incidents]
         db.close()
         
-        return jsonify({
+        return FastJSON.response({
             'user_id': user_id,
-            'count': len(result),
-            'incidents': result
-        }), 200
+            'count': len(rows),
+            'next_cursor': next_cursor
+        }, 'incidents', rows, INCIDENT_FIELDS), 200
         
+    except InvalidCursor as e:
+        Session.remove()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @incidents_bp.route('/all', methods=['GET'])
+@cached_read('incidents')
 def get_all_incidents():
-    """Get all incidents with optional filtering"""
+    """Get a page of incidents with optional filtering, newest first"""
     try:
         db = Session()
         
         severity = request.args.get('severity')
         incident_type = request.args.get('incident_type')
         
-        query = db.query(Incident)
+        query = db.query(*INCIDENT_FIELDS.columns)
         
         if severity:
-            query = query.filter_by(severity=severity)
+            query = query.filter(Incident.severity == severity)
         if incident_type:
-            query = query.filter_by(incident_type=incident_type)
+            query = query.filter(Incident.incident_type == incident_type)
         
-        incidents = query.order_by(Incident.incident_date.desc()).all()
-        result = [i.to_dict() for i in incidents]
+        rows, next_cursor = Paginator.paginate(
+            query, [Incident.incident_date, Incident.incident_id], descending=True
+        )
         
         db.close()
         
-        return jsonify({
-            'count': len(result),
-            'incidents': result
-        }), 200
+        return FastJSON.response({
+            'count': len(rows),
+            'next_cursor': next_cursor
+        }, 'incidents', rows, INCIDENT_FIELDS), 200
         
+    except InvalidCursor as e:
+        Session.remove()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
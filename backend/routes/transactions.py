@@ -4,26 +4,22 @@ from models import Transaction, User
 from database import Session
 from utils.validators import Validator
 from risk_engine import RiskEngine
+from activity_tracker import ActivityTracker
+from rollups import PurchaseRollups
+from bulk_ingest import BulkIngestor
+from utils.pagination import Paginator, InvalidCursor
+from config import Config
+from utils.dashboard_stats import DashboardStats
+from utils.query_budget import query_budget
+from utils.fast_json import FastJSON, TRANSACTION_FIELDS
+from utils.read_cache import TableVersions, cached_read
 from flask import current_app
 
 transactions_bp = Blueprint('transactions', __name__)
 
 @transactions_bp.route('/log', methods=['POST'])
+@query_budget(9)
 def log_purchase():
-    try:
-        from flask import current_app
-        current_app.broadcast_transaction({
-            'transaction': result,
-            'user': {
-                'user_id': user.user_id,
-                'name': user.name,
-                'risk_level': user.risk_level
-            },
-            'patterns': [{'type': p[0], 'confidence': p[1]} for p in patterns]
-        })
-    except Exception as e:
-        print(f"Websocket broadcast error: {e}")
-    
     """Log a new alcohol purchase"""
     try:
         data = request.get_json()
@@ -61,10 +57,11 @@ def log_purchase():
             db.close()
             return jsonify({'error': error}), 400
         
-        # Check daily limit
-        allowed, current, remaining = RiskEngine.check_daily_limit(user.user_id, units, db)
+        # Reserve units against today's limit
+        allowed, current, remaining = RiskEngine.reserve_daily_units(user.user_id, units, db)
         
         if not allowed:
+            db.rollback()
             db.close()
             return jsonify({
                 'error': 'Daily limit exceeded',
@@ -77,6 +74,7 @@ def log_purchase():
         transaction = Transaction(
             user_id=data['user_id'],
             shop_id=data.get('shop_id'),
+            transaction_date=datetime.utcnow(),
             alcohol_type=data.get('alcohol_type'),
             brand=data.get('brand'),
             quantity_ml=data.get('quantity_ml'),
@@ -95,32 +93,88 @@ def log_purchase():
         user.total_units_consumed += units
         user.last_purchase_date = date.today()
         
-        # Update daily limit
-        RiskEngine.update_daily_limit(user.user_id, units, db)
+        # Fold the purchase into the rolling activity buckets
+        ActivityTracker.record_purchase(
+            user.user_id, units, transaction.quantity_ml, transaction.transaction_date, db
+        )
         
-        # Recalculate risk score
-        RiskEngine.calculate_risk_score(user.user_id, db)
+        # Count it in the shop/district trend rollups
+        PurchaseRollups.record_purchase(transaction.shop_id, units, transaction.transaction_date, db)
         
-        # Run pattern detection
-        patterns = RiskEngine.run_pattern_detection(user.user_id, db)
+        # Let cached list reads see the purchase
+        TableVersions.bump(db, 'users', 'transactions')
         
+        # Single commit for the whole purchase
+        user_id = user.user_id
         db.commit()
         
         result = transaction.to_dict()
         db.close()
+        DashboardStats.record_purchase(units)
+        
+        # Score the user and run pattern detection off the request path
+        queued = current_app.analysis_queue.submit(user_id, result['transaction_id'])
         
         return jsonify({
             'message': 'Purchase logged successfully',
             'transaction': result,
-            'patterns_detected': [{'type': p[0], 'confidence': p[1]} for p in patterns],
-            'remaining_units_today': remaining - units
+            'analysis': 'queued' if queued else 'completed',
+            'remaining_units_today': remaining
         }), 201
         
     except Exception as e:
+        # Discard the partial purchase, including the unit reservation
+        Session.remove()
+        return jsonify({'error': str(e)}), 500
+
+
+@transactions_bp.route('/bulk', methods=['POST'])
+def log_purchases_bulk():
+    """
+    Log a batch of purchases replayed by an offline shop
+    Rows carry a shop-side client_ref; replays of an already-synced row are
+    reported as duplicates instead of being logged twice
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('transactions'), list):
+            return jsonify({'error': 'A transactions list is required'}), 400
+        
+        rows = data['transactions']
+        if len(rows) > Config.BULK_INGEST_MAX_ROWS:
+            return jsonify({
+                'error': f"At most {Config.BULK_INGEST_MAX_ROWS} transactions per request"
+            }), 400
+        
+        db = Session()
+        summary, latest = BulkIngestor.ingest(rows, data.get('shop_id'), db)
+        if summary['accepted']:
+            TableVersions.bump(db, 'users', 'transactions')
+        
+        # Single commit for the whole batch
+        db.commit()
+        db.close()
+        
+        if summary['accepted']:
+            DashboardStats.invalidate()
+        
+        # Score each affected user once, against their newest purchase
+        queued = 0
+        for user_id, transaction_id in latest.items():
+            queued += current_app.analysis_queue.submit(user_id, transaction_id)
+        
+        summary['analysis'] = {'users': len(latest), 'queued': queued}
+        return jsonify(summary), 200
+        
+    except Exception as e:
+        # Discard the partial batch, including its unit reservations
+        Session.remove()
         return jsonify({'error': str(e)}), 500
 
 
 @transactions_bp.route('/<int:transaction_id>', methods=['GET'])
+@query_budget(1)
 def get_transaction(transaction_id):
     """Get transaction by ID"""
     try:
@@ -141,13 +195,14 @@ def get_transaction(transaction_id):
 
 
 @transactions_bp.route('/user/<int:user_id>', methods=['GET'])
+@query_budget(2)
 def get_user_transactions(user_id):
-    """Get all transactions for a user"""
+    """Get a page of transactions for a user, newest first"""
     try:
         db = Session()
         
         # Check if user exists
-        user = db.query(User).filter_by(user_id=user_id).first()
+        user = db.query(User.user_id).filter(User.user_id == user_id).first()
         if not user:
             db.close()
             return jsonify({'error': 'User not found'}), 404
@@ -156,47 +211,49 @@ def get_user_transactions(user_id):
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        query = db.query(Transaction).filter_by(user_id=user_id)
+        query = db.query(*TRANSACTION_FIELDS.columns).filter(Transaction.user_id == user_id)
         
         if start_date:
             query = query.filter(Transaction.transaction_date >= start_date)
         if end_date:
             query = query.filter(Transaction.transaction_date <= end_date)
         
-        transactions = query.order_by(Transaction.transaction_date.desc()).all()
-        result = [t.to_dict() for t in transactions]
+        rows, next_cursor = Paginator.paginate(
+            query, [Transaction.transaction_date, Transaction.transaction_id], descending=True
+        )
         
         db.close()
         
-        return jsonify({
+        return FastJSON.response({
             'user_id': user_id,
-            'count': len(result),
-            'transactions': result
-        }), 200
+            'count': len(rows),
+            'next_cursor': next_cursor
+        }, 'transactions', rows, TRANSACTION_FIELDS), 200
         
+    except InvalidCursor as e:
+        Session.remove()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @transactions_bp.route('/recent', methods=['GET'])
+@query_budget(2)
+@cached_read('transactions')
 def get_recent_transactions():
     """Get recent transactions across all users"""
     try:
         db = Session()
         
-        limit = request.args.get('limit', 50, type=int)
+        limit = min(request.args.get('limit', 50, type=int), Config.PAGE_SIZE_MAX)
         
-        transactions = db.query(Transaction).order_by(
+        rows = db.query(*TRANSACTION_FIELDS.columns).order_by(
             Transaction.transaction_date.desc()
         ).limit(limit).all()
         
-        result = [t.to_dict() for t in transactions]
         db.close()
         
-        return jsonify({
-            'count': len(result),
-            'transactions': result
-        }), 200
+        return FastJSON.response({'count': len(rows)}, 'transactions', rows, TRANSACTION_FIELDS), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -1,8 +1,16 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import func
 from models import User
 from database import Session
 from utils.validators import Validator
 from risk_engine import RiskEngine
+from risk_batch import BatchRiskScorer
+from utils.pagination import Paginator, InvalidCursor
+from utils.dashboard_stats import DashboardStats
+from utils.query_budget import query_budget
+from utils.fast_json import FastJSON, USER_FIELDS
+from utils.read_cache import TableVersions, cached_read
+from replicas import use_primary
 
 users_bp = Blueprint('users', __name__)
 
@@ -50,7 +58,9 @@ def register_user():
         )
         
         db.add(user)
+        TableVersions.bump(db, 'users')
         db.commit()
+        DashboardStats.invalidate()
         
         result = user.to_dict()
         db.close()
@@ -65,6 +75,7 @@ def register_user():
 
 
 @users_bp.route('/<int:user_id>', methods=['GET'])
+@query_budget(1)
 def get_user(user_id):
     """Get user by ID"""
     try:
@@ -84,51 +95,96 @@ def get_user(user_id):
         return jsonify({'error': str(e)}), 500
 
 
+@users_bp.route('/aadhaar/<aadhaar>', methods=['GET'])
+@query_budget(1)
+@use_primary
+def get_user_by_aadhaar(aadhaar):
+    """Look up a user by Aadhaar for terminal verification"""
+    try:
+        valid, error = Validator.validate_aadhaar(aadhaar)
+        if not valid:
+            return jsonify({'error': error}), 400
+        
+        db = Session()
+        
+        # One lookup on the unique aadhaar_mock index; risk level and blocked
+        # status must be current, so nothing here is cached
+        user = db.query(User).filter_by(aadhaar_mock=aadhaar).first()
+        
+        if not user:
+            db.close()
+            return jsonify({'error': 'User not found'}), 404
+        
+        result = user.to_dict()
+        db.close()
+        
+        return jsonify(result), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @users_bp.route('/', methods=['GET'])
+@query_budget(2)
+@cached_read('users')
 def get_all_users():
-    """Get all users with optional filtering"""
+    """
+    Get a page of users with optional filtering
+    ?search= matches an Aadhaar prefix (digits) or a name prefix
+    """
     try:
         db = Session()
         
         # Optional filters
         risk_level = request.args.get('risk_level')
         is_blocked = request.args.get('is_blocked')
+        search = request.args.get('search', '').strip()
         
-        query = db.query(User)
+        query = db.query(*USER_FIELDS.columns)
         
         if risk_level:
-            query = query.filter_by(risk_level=risk_level)
+            query = query.filter(User.risk_level == risk_level)
+        
+        if search.isdigit():
+            query = query.filter(User.aadhaar_mock.startswith(search))
+        elif search:
+            query = query.filter(func.lower(User.name).startswith(search.lower(), autoescape=True))
         
         if is_blocked is not None:
-            query = query.filter_by(is_blocked=is_blocked.lower() == 'true')
+            query = query.filter(User.is_blocked == (is_blocked.lower() == 'true'))
         
-        users = query.all()
-        result = [user.to_dict() for user in users]
+        rows, next_cursor = Paginator.paginate(query, [User.user_id])
         
         db.close()
         
-        return jsonify({
-            'count': len(result),
-            'users': result
-        }), 200
+        return FastJSON.response({
+            'count': len(rows),
+            'next_cursor': next_cursor
+        }, 'users', rows, USER_FIELDS), 200
         
+    except InvalidCursor as e:
+        Session.remove()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @users_bp.route('/<int:user_id>/risk', methods=['GET'])
+@query_budget(4)
+@use_primary
 def get_user_risk(user_id):
     """Calculate and return user's risk score"""
     try:
         db = Session()
-        user = db.query(User).filter_by(user_id=user_id).first()
         
-        if not user:
+        # Calculate risk score; the feature query also tells us if the user exists
+        score, level, factors = RiskEngine.calculate_risk_score(user_id, db)
+        if level is None:
             db.close()
             return jsonify({'error': 'User not found'}), 404
         
-        # Calculate risk score
-        score, level, factors = RiskEngine.calculate_risk_score(user_id, db)
+        TableVersions.bump(db, 'users')
+        db.commit()
         
         db.close()
         
@@ -143,6 +199,26 @@ def get_user_risk(user_id):
         return jsonify({'error': str(e)}), 500
 
 
+@users_bp.route('/rescore', methods=['POST'])
+def rescore_all_users():
+    """Recalculate risk scores for every user in one batch"""
+    try:
+        db = Session()
+        summary = BatchRiskScorer.rescore_all(db)
+        TableVersions.bump(db, 'users')
+        db.commit()
+        db.close()
+        DashboardStats.invalidate()
+        
+        return jsonify({
+            'message': 'Risk scores recalculated successfully',
+            **summary
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @users_bp.route('/<int:user_id>/block', methods=['POST'])
 def block_user(user_id):
     """Block a user"""
@@ -155,7 +231,9 @@ def block_user(user_id):
             return jsonify({'error': 'User not found'}), 404
         
         user.is_blocked = True
+        TableVersions.bump(db, 'users')
         db.commit()
+        DashboardStats.invalidate()
         
         result = user.to_dict()
         db.close()
@@ -181,7 +259,9 @@ def unblock_user(user_id):
             return jsonify({'error': 'User not found'}), 404
         
         user.is_blocked = False
+        TableVersions.bump(db, 'users')
         db.commit()
+        DashboardStats.invalidate()
         
         result = user.to_dict()
         db.close()
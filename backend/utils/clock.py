@@ -0,0 +1,25 @@
+"""
+Local calendar days for UTC purchase times
+
+transaction_date is stored as naive UTC. Daily limits, activity buckets and
+their hour-of-day histograms count in the server's local time, so a
+purchase just after local midnight lands on the new day everywhere.
+"""
+from datetime import datetime, timezone
+
+
+def local_time(purchased_at=None):
+    """Naive server-local time of a naive UTC timestamp; None means now"""
+    if purchased_at is None:
+        return datetime.now()
+    return purchased_at.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+
+def limit_day(purchased_at=None):
+    """The daily_limits date a purchase counts against: its local calendar day"""
+    return local_time(purchased_at).date()
+
+
+def utc_offset():
+    """Current local offset from UTC, for shifting transaction_date in SQL"""
+    return datetime.now().astimezone().utcoffset()
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+import copy
+from sqlalchemy import func, select, true
+from models import User, PurchaseRollup, Incident, Alert, PatternFlag
+from utils.cache import TTLCache
+from config import Config
+
+class DashboardStats:
+    """Dashboard statistics computed in one statement and cached briefly"""
+
+    KEY = 'dashboard'
+    _cache = TTLCache(maxsize=1, ttl=Config.DASHBOARD_CACHE_TTL)
+
+    @staticmethod
+    def query(db_session):
+        """Compute every dashboard figure in a single round-trip"""
+        cutoff_date = datetime.now() - timedelta(days=30)
+
+        users = select(
+            func.count().label('total_users'),
+            func.count().filter(User.is_blocked == True).label('blocked_users')
+        ).select_from(User).subquery()
+
+        levels = select(
+            User.risk_level, func.count().label('user_count')
+        ).where(User.risk_level.isnot(None)).group_by(User.risk_level).subquery()
+        risk = select(
+            func.json_object_agg(levels.c.risk_level, levels.c.user_count).label('risk_distribution')
+        ).subquery()
+
+        # Purchase totals come from the hourly rollups, which stay small as
+        # transaction history grows
+        transactions = select(
+            func.coalesce(func.sum(PurchaseRollup.purchase_count), 0).label('total_transactions'),
+            func.coalesce(
+                func.sum(PurchaseRollup.purchase_count).filter(PurchaseRollup.rollup_date >= cutoff_date.date()), 0
+            ).label('recent_transactions'),
+            func.coalesce(func.sum(PurchaseRollup.total_units), 0).label('total_units')
+        ).select_from(PurchaseRollup).subquery()
+
+        incidents = select(
+            func.count().label('total_incidents'),
+            func.count().filter(Incident.incident_date >= cutoff_date.date()).label('recent_incidents')
+        ).select_from(Incident).subquery()
+
+        alerts = select(
+            func.count().label('active_alerts')
+        ).select_from(Alert).where(Alert.acknowledged == False).subquery()
+
+        flags = select(
+            func.count().label('active_patterns')
+        ).select_from(PatternFlag).where(PatternFlag.reviewed == False).subquery()
+
+        stmt = select(users, risk, transactions, incidents, alerts, flags).select_from(
+            users
+        ).join(risk, true()).join(transactions, true()).join(
+            incidents, true()
+        ).join(alerts, true()).join(flags, true())
+
+        row = db_session.execute(stmt).mappings().one()
+
+        return {
+            'users': {
+                'total': row['total_users'],
+                'blocked': row['blocked_users'],
+                'risk_distribution': row['risk_distribution'] or {}
+            },
+            'transactions': {
+                'total': int(row['total_transactions']),
+                'last_30_days': int(row['recent_transactions']),
+                'total_units_consumed': float(row['total_units'])
+            },
+            'incidents': {
+                'total': row['total_incidents'],
+                'last_30_days': row['recent_incidents']
+            },
+            'alerts': {
+                'active': row['active_alerts']
+            },
+            'patterns': {
+                'active_flags': row['active_patterns']
+            }
+        }
+
+    @staticmethod
+    def get(db_session):
+        """Cached statistics, recomputed at most once per TTL"""
+        stats = DashboardStats._cache.get(DashboardStats.KEY)
+        if stats is None:
+            stats = DashboardStats.query(db_session)
+            DashboardStats._cache.set(DashboardStats.KEY, stats)
+        # Copy so in-place adjustments cannot race the caller's serialization
+        return copy.deepcopy(stats)
+
+    @staticmethod
+    def record_purchase(units):
+        """Fold a committed purchase into the cached figures"""
+        def apply(stats):
+            stats['transactions']['total'] += 1
+            stats['transactions']['last_30_days'] += 1
+            stats['transactions']['total_units_consumed'] += units
+
+        DashboardStats._cache.update(DashboardStats.KEY, apply)
+
+    @staticmethod
+    def invalidate():
+        """Drop the cached figures after a write they cannot be adjusted for"""
+        DashboardStats._cache.pop(DashboardStats.KEY)
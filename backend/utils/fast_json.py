@@ -0,0 +1,213 @@
+"""
+Column-select JSON for list endpoints
+
+List routes select plain column tuples instead of ORM objects and encode
+them here, JSON_CHUNK_ROWS rows at a time, with orjson when it is
+installed. The body is byte for byte what jsonify() of the to_dict()
+output would return:
+
+    - keys sorted, compact separators, trailing newline (Flask's defaults
+      outside debug; in debug the converted rows go through jsonify)
+    - Decimal as float (zero stays 0.0) and NULL as null, as in to_dict
+    - datetimes and dates as isoformat()
+    - non-ASCII escaped as \\uXXXX; orjson writes raw UTF-8, so such chunks
+      are re-encoded with the json module, as are chunks holding floats the
+      two format differently (exponents, NaN)
+
+Usage (from backend/, compares both paths against the configured database):
+    python -m utils.fast_json
+"""
+import json
+from datetime import datetime, date
+from decimal import Decimal
+from flask import Response, current_app, jsonify
+from models import User, Transaction, Incident
+from config import Config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class RowFields:
+    """The to_dict fields of a model as selectable columns"""
+
+    def __init__(self, fields):
+        self.keys = [key for key, _ in fields]
+        self.columns = [column for _, column in fields]
+        types = {key: column.type.python_type for key, column in fields}
+        self.float_keys = [key for key, t in types.items() if t is float]
+        self.converted_keys = [key for key, t in types.items() if t in (Decimal, datetime, date)]
+
+    def records(self, rows):
+        """Rows as dicts, leaving Decimal and datetime values to the encoder"""
+        keys = self.keys
+        return [dict(zip(keys, row)) for row in rows]
+
+    def to_dicts(self, rows):
+        """Rows as dicts with every value converted as to_dict converts it"""
+        records = self.records(rows)
+        for record in records:
+            for key in self.converted_keys:
+                record[key] = _default(record[key]) if record[key] is not None else None
+        return records
+
+
+USER_FIELDS = RowFields([
+    ('user_id', User.user_id),
+    ('aadhaar_mock', User.aadhaar_mock),
+    ('name', User.name),
+    ('age', User.age),
+    ('address', User.address),
+    ('phone', User.phone),
+    ('registration_date', User.registration_date),
+    ('risk_score', User.risk_score),
+    ('risk_level', User.risk_level),
+    ('is_blocked', User.is_blocked),
+    ('total_purchases', User.total_purchases),
+    ('total_units_consumed', User.total_units_consumed),
+])
+
+TRANSACTION_FIELDS = RowFields([
+    ('transaction_id', Transaction.transaction_id),
+    ('user_id', Transaction.user_id),
+    ('shop_id', Transaction.shop_id),
+    ('transaction_date', Transaction.transaction_date),
+    ('alcohol_type', Transaction.alcohol_type),
+    ('brand', Transaction.brand),
+    ('quantity_ml', Transaction.quantity_ml),
+    ('units', Transaction.units),
+    ('abv_percentage', Transaction.abv_percentage),
+    ('amount_paid', Transaction.amount_paid),
+    ('payment_method', Transaction.payment_method),
+])
+
+INCIDENT_FIELDS = RowFields([
+    ('incident_id', Incident.incident_id),
+    ('user_id', Incident.user_id),
+    ('incident_type', Incident.incident_type),
+    ('incident_date', Incident.incident_date),
+    ('location', Incident.location),
+    ('police_report_number', Incident.police_report_number),
+    ('severity', Incident.severity),
+    ('reported_by', Incident.reported_by),
+    ('created_at', Incident.created_at),
+])
+
+
+def _default(value):
+    """Encode the column types to_dict converts, the way to_dict converts them"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSON:
+    """Encodes column-select rows the way jsonify encodes their to_dict()"""
+
+    @staticmethod
+    def compact():
+        """Whether jsonify is writing compact, sorted, ASCII-only JSON"""
+        provider = current_app.json
+        compact = getattr(provider, 'compact', None)
+        return (
+            (compact is True or (compact is None and not current_app.debug))
+            and getattr(provider, 'sort_keys', True)
+            and getattr(provider, 'ensure_ascii', True)
+        )
+
+    @staticmethod
+    def encode_std(value):
+        return json.dumps(
+            value, default=_default, ensure_ascii=True, sort_keys=True, separators=(',', ':')
+        ).encode()
+
+    @staticmethod
+    def orjson_safe(records, float_keys):
+        """
+        Whether orjson writes every float the way the json module does
+        Both print plain decimals between 1e-4 and 1e16; outside that (and for
+        NaN/inf) their exponent and special-value spellings differ
+        """
+        for record in records:
+            for key in float_keys:
+                value = record[key]
+                if value is not None and value != 0 and not 1e-4 <= abs(value) < 1e16:
+                    return False
+        return True
+
+    @staticmethod
+    def encode_records(records, fields):
+        """Encode records as a JSON array"""
+        if orjson is not None and FastJSON.orjson_safe(records, fields.float_keys):
+            encoded = orjson.dumps(records, default=_default, option=orjson.OPT_SORT_KEYS)
+            if encoded.isascii():
+                return encoded
+        return FastJSON.encode_std(records)
+
+    @staticmethod
+    def response(envelope, key, rows, fields):
+        """
+        Response for envelope plus envelope[key] = the rows' to_dict() output
+        rows are column tuples selected with fields.columns; the array is
+        encoded and streamed JSON_CHUNK_ROWS rows at a time
+        """
+        if not FastJSON.compact():
+            return jsonify({**envelope, key: fields.to_dicts(rows)})
+
+        marker = f'"{key}":[]'.encode()
+        head, tail = FastJSON.encode_std({**envelope, key: []}).split(marker, 1)
+        size = Config.JSON_CHUNK_ROWS
+
+        def generate():
+            yield head + marker[:-1]
+            for start in range(0, len(rows), size):
+                chunk = FastJSON.encode_records(fields.records(rows[start:start + size]), fields)
+                yield (b',' if start else b'') + chunk[1:-1]
+            yield b']' + tail + b'\n'
+
+        return Response(generate(), mimetype=current_app.json.mimetype)
+
+
+if __name__ == '__main__':
+    import argparse
+    from flask import Flask
+    from database import session_factory
+
+    parser = argparse.ArgumentParser(description='Compare the column-select JSON path with to_dict + jsonify')
+    parser.add_argument('--limit', type=int, default=2000, help='Rows compared per model')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    checks = [(User, USER_FIELDS), (Transaction, TRANSACTION_FIELDS), (Incident, INCIDENT_FIELDS)]
+    print(f"🚀 Comparing encoders ({'orjson' if orjson else 'json fallback'})")
+
+    db = session_factory()
+    failed = False
+    try:
+        for model, fields in checks:
+            objects = db.query(model).order_by(fields.columns[0]).limit(args.limit).all()
+            rows = db.query(*fields.columns).order_by(fields.columns[0]).limit(args.limit).all()
+
+            for debug in (False, True):
+                app.debug = debug
+                with app.test_request_context():
+                    expected = jsonify({'count': len(objects), 'rows': [o.to_dict() for o in objects]}).get_data()
+                    actual = FastJSON.response({'count': len(rows)}, 'rows', rows, fields).get_data()
+
+                mode = 'debug' if debug else 'compact'
+                if expected == actual:
+                    print(f"✅ {model.__tablename__} ({mode}): {len(rows)} rows identical")
+                else:
+                    failed = True
+                    at = next((i for i, (a, b) in enumerate(zip(expected, actual)) if a != b),
+                              min(len(expected), len(actual)))
+                    print(f"❌ {model.__tablename__} ({mode}): bodies differ at byte {at}: "
+                          f"{expected[at - 40:at + 40]!r} vs {actual[at - 40:at + 40]!r}")
+    finally:
+        db.close()
+
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,186 @@
+"""
+Prometheus metrics for requests, SQL, the connection pool and Socket.IO
+
+Request latency is recorded per route template, SQL statements per
+caller: the innermost RiskEngine method on the stack, otherwise the Flask
+endpoint, otherwise 'background'. Pool and Socket.IO figures are read at
+scrape time from the live objects.
+
+Under several gunicorn workers each worker keeps its own registry; scrape
+every worker or set PROMETHEUS_MULTIPROC_DIR per prometheus_client docs.
+"""
+import contextvars
+import functools
+import time
+from flask import Response, g, request
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+)
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+registry = CollectorRegistry()
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency',
+    ['method', 'route', 'status'], registry=registry,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+SQL_STATEMENTS = Counter(
+    'db_statements_total', 'SQL statements executed',
+    ['caller', 'operation'], registry=registry
+)
+SQL_DURATION = Histogram(
+    'db_statement_duration_seconds', 'SQL statement execution time',
+    ['caller', 'operation'], registry=registry,
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection',
+    registry=registry,
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+
+# Who is issuing SQL right now; set per request and per RiskEngine call
+sql_caller = contextvars.ContextVar('sql_caller', default='background')
+
+SQL_OPERATIONS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'BEGIN', 'COMMIT', 'ROLLBACK'}
+
+
+def track_sql_caller(cls):
+    """Class decorator tagging SQL issued inside each static method with Class.method"""
+    for name, member in list(vars(cls).items()):
+        if isinstance(member, staticmethod) and not name.startswith('__'):
+            setattr(cls, name, staticmethod(_tagged(f"{cls.__name__}.{name}", member.__func__)))
+    return cls
+
+
+def _tagged(label, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = sql_caller.set(label)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            sql_caller.reset(token)
+    return wrapper
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait and knows its capacity"""
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, **kw):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+        self.capacity = pool_size + max_overflow if max_overflow >= 0 else None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+
+class PoolCollector:
+    """Pool occupancy read at scrape time"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def collect(self):
+        pool = self.engine.pool
+        checked_out = pool.checkedout() if hasattr(pool, 'checkedout') else 0
+        idle = pool.checkedin() if hasattr(pool, 'checkedin') else 0
+        capacity = getattr(pool, 'capacity', None)
+
+        yield GaugeMetricFamily('db_pool_checked_out', 'Connections in use', value=checked_out)
+        yield GaugeMetricFamily('db_pool_idle', 'Idle pooled connections', value=idle)
+        if capacity:
+            yield GaugeMetricFamily('db_pool_capacity', 'pool_size + max_overflow', value=capacity)
+            yield GaugeMetricFamily(
+                'db_pool_saturation', 'Share of pool capacity in use', value=checked_out / capacity
+            )
+
+
+class EventHubCollector:
+    """Socket.IO client and emit counters read from the EventHub at scrape time"""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def collect(self):
+        stats = self.hub.metrics()
+        yield GaugeMetricFamily('socketio_connected_clients', 'Connected Socket.IO clients', value=stats['clients'])
+        yield GaugeMetricFamily('socketio_rooms', 'Socket.IO rooms with subscribers', value=stats['rooms'])
+        yield GaugeMetricFamily('socketio_queued_events', 'Events waiting in client queues', value=stats['queued'])
+        yield CounterMetricFamily('socketio_events_published', 'Events published to the hub', value=stats['published'])
+        yield CounterMetricFamily('socketio_frames_emitted', 'event_batch frames emitted', value=stats['frames_sent'])
+        yield CounterMetricFamily('socketio_events_emitted', 'Events delivered in frames', value=stats['events_sent'])
+        yield CounterMetricFamily('socketio_events_dropped', 'Events dropped from full client queues',
+                                  value=stats['events_dropped'])
+
+
+class Metrics:
+    """Wires the collectors into the app, the engine and the event hub"""
+
+    @staticmethod
+    def instrument_engine(engine, pool=True):
+        """Count and time every statement, tagged with the current caller"""
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info['query_started'].pop()
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+            if operation not in SQL_OPERATIONS:
+                operation = 'OTHER'
+            caller = sql_caller.get()
+            SQL_STATEMENTS.labels(caller, operation).inc()
+            SQL_DURATION.labels(caller, operation).observe(elapsed)
+
+        @event.listens_for(engine, 'handle_error')
+        def handle_error(context):
+            started = context.connection.info.get('query_started') if context.connection else None
+            if started:
+                started.pop()
+
+        if pool:
+            registry.register(PoolCollector(engine))
+
+    @staticmethod
+    def init_app(app, engine, hub=None, replicas=()):
+        """Pool figures cover the primary; replica statements are counted with the rest"""
+        Metrics.instrument_engine(engine)
+        for replica in replicas:
+            Metrics.instrument_engine(replica, pool=False)
+        if hub is not None:
+            registry.register(EventHubCollector(hub))
+
+        @app.before_request
+        def start_timer():
+            g.metrics_started = time.perf_counter()
+            g.metrics_caller = sql_caller.set(request.endpoint or 'unmatched')
+
+        @app.after_request
+        def record_latency(response):
+            started = g.pop('metrics_started', None)
+            if started is not None:
+                route = request.url_rule.rule if request.url_rule else 'unmatched'
+                REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(
+                    time.perf_counter() - started
+                )
+            return response
+
+        @app.teardown_request
+        def reset_caller(exc):
+            token = g.pop('metrics_caller', None)
+            if token is not None:
+                sql_caller.reset(token)
+
+        @app.route('/metrics')
+        def metrics():
+            """Prometheus scrape endpoint"""
+            return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from faker import Faker
 from models import User, Shop, Transaction, Incident
 from database import Session
+from utils.read_cache import TableVersions
 
 fake = Faker('en_IN')
 
@@ -153,4 +154,10 @@ class MockDataGenerator:
         # Generate incidents
         MockDataGenerator.generate_incidents(user_ids, 20)
         
+        # Let cached list responses pick up the new rows
+        db = Session()
+        TableVersions.bump(db, 'users', 'transactions', 'incidents')
+        db.commit()
+        db.close()
+        
         print("✅ Mock data generation complete!")
\ No newline at end of file
@@ -0,0 +1,106 @@
+import base64
+import json
+from datetime import datetime, date
+from flask import request
+from sqlalchemy import and_, or_, tuple_
+from config import Config
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+class Paginator:
+    """Keyset (cursor) pagination over a fixed, unique sort key"""
+
+    @staticmethod
+    def page_size():
+        """Requested page size, clamped to the configured bounds"""
+        limit = request.args.get('limit', Config.PAGE_SIZE_DEFAULT, type=int)
+        return max(1, min(limit, Config.PAGE_SIZE_MAX))
+
+    @staticmethod
+    def encode_cursor(values):
+        """Opaque cursor for the sort key of the last row on a page"""
+        plain = [v.isoformat() if isinstance(v, (datetime, date)) else v for v in values]
+        return base64.urlsafe_b64encode(json.dumps(plain).encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor, columns):
+        """Decode a cursor back into typed values for the given key columns"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            plain = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(plain, list) or len(plain) != len(columns):
+                raise ValueError
+
+            values = []
+            for column, value in zip(columns, plain):
+                if value is None:
+                    values.append(None)
+                    continue
+                python_type = column.type.python_type
+                if python_type is datetime:
+                    value = datetime.fromisoformat(value)
+                elif python_type is date:
+                    value = date.fromisoformat(value)
+                else:
+                    value = python_type(value)
+                values.append(value)
+            return values
+        except (ValueError, TypeError):
+            raise InvalidCursor('Invalid pagination cursor')
+
+    @staticmethod
+    def nullable(column):
+        return getattr(getattr(column, 'expression', column), 'nullable', True)
+
+    @staticmethod
+    def after(columns, values, descending):
+        """
+        Filter for the rows past a cursor in sort order. Postgres sorts NULL
+        last ascending and first descending; a plain row comparison handles
+        every case except a NULL in the cursor, or NULL rows still to come
+        in an ascending sort, which get the expanded form
+        """
+        if None not in values and (descending or not any(Paginator.nullable(c) for c in columns)):
+            key, cursor = tuple_(*columns), tuple_(*values)
+            return key < cursor if descending else key > cursor
+
+        clauses = []
+        for i, (column, value) in enumerate(zip(columns, values)):
+            equal = [c.is_(None) if v is None else c == v for c, v in zip(columns[:i], values[:i])]
+            if value is None:
+                if not descending:
+                    continue
+                past = column.isnot(None)
+            elif descending:
+                past = column < value
+            elif Paginator.nullable(column):
+                past = or_(column > value, column.is_(None))
+            else:
+                past = column > value
+            clauses.append(and_(*equal, past))
+        return or_(*clauses)
+
+    @staticmethod
+    def paginate(query, columns, descending=False):
+        """
+        Fetch one page of query ordered by columns, resuming after ?cursor=
+        The last column must make the key unique (normally the primary key)
+        Returns: (rows, next_cursor)
+        """
+        limit = Paginator.page_size()
+        cursor = request.args.get('cursor')
+
+        if cursor:
+            query = query.filter(Paginator.after(columns, Paginator.decode_cursor(cursor, columns), descending))
+
+        order = [c.desc() if descending else c.asc() for c in columns]
+        rows = query.order_by(*order).limit(limit + 1).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = Paginator.encode_cursor([getattr(rows[-1], c.key) for c in columns])
+
+        return rows, next_cursor
@@ -0,0 +1,185 @@
+"""
+Query budgets: statement counts per request and per RiskEngine call
+
+Every statement sent through the engine is counted against each open
+scope: the current request and any budgeted method calls in progress.
+When a scope closes it is checked against its declared budget and for
+repeats, either the same SQL text run many times (the N+1 shape) or the
+same SQL with the same parameters run more than once (a redundant query).
+
+QUERY_BUDGET chooses what a breach does: 'off', 'warn' (print) or 'raise'
+(QueryBudgetExceeded). Unless off, responses carry X-DB-Statements and
+X-DB-Repeated-Statements headers.
+"""
+import contextlib
+import contextvars
+import functools
+from collections import Counter
+from flask import g, jsonify, request
+from sqlalchemy import event
+from config import Config
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in 'raise' mode when a scope breaks its budget"""
+
+
+_scopes = contextvars.ContextVar('query_budget_scopes', default=())
+
+
+class QueryScope:
+    """Statements observed while one request or method call was running"""
+
+    def __init__(self, label, budget=None):
+        self.label = label
+        self.budget = budget
+        self.count = 0
+        self.texts = Counter()
+        self.identical = Counter()
+
+    def record(self, statement, parameters, executemany):
+        self.count += 1
+        self.texts[statement] += 1
+        if not executemany:
+            self.identical[(statement, repr(parameters))] += 1
+
+    @property
+    def repeated(self):
+        """Executions that repeated an earlier statement with the same parameters"""
+        return sum(n - 1 for n in self.identical.values() if n > 1)
+
+    def problems(self):
+        problems = []
+        if self.budget is not None and self.count > self.budget:
+            problems.append(f"{self.count} statements (budget {self.budget})")
+
+        for statement, n in self.texts.items():
+            if n >= Config.QUERY_REPEAT_THRESHOLD:
+                problems.append(f"same statement {n} times: {QueryScope.shorten(statement)}")
+        for (statement, _), n in self.identical.items():
+            if n > 1 and self.texts[statement] < Config.QUERY_REPEAT_THRESHOLD:
+                problems.append(f"identical statement {n} times: {QueryScope.shorten(statement)}")
+        return problems
+
+    @staticmethod
+    def shorten(statement):
+        return ' '.join(statement.split())[:160]
+
+
+class QueryBudget:
+    """Engine hook, request hooks and decorators for declaring budgets"""
+
+    @staticmethod
+    def enabled():
+        return Config.QUERY_BUDGET != 'off'
+
+    @staticmethod
+    def open(label, budget=None):
+        scope = QueryScope(label, budget)
+        token = _scopes.set(_scopes.get() + (scope,))
+        return scope, token
+
+    @staticmethod
+    def close(scope, token):
+        """Stop counting into scope and enforce its budget"""
+        _scopes.reset(token)
+        problems = scope.problems()
+        if not problems:
+            return
+
+        message = f"Query budget: {scope.label}: " + '; '.join(problems)
+        if Config.QUERY_BUDGET == 'raise':
+            raise QueryBudgetExceeded(message)
+        print(f"⚠️  {message}")
+
+    @staticmethod
+    @contextlib.contextmanager
+    def detached():
+        """Run work that has its own budget (e.g. inline analysis) outside the open scopes"""
+        token = _scopes.set(())
+        try:
+            yield
+        finally:
+            _scopes.reset(token)
+
+    @staticmethod
+    def instrument_engine(engine):
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            for scope in _scopes.get():
+                scope.record(statement, parameters, executemany)
+
+    @staticmethod
+    def init_app(app, engine, replicas=()):
+        """Count statements per request against budgets declared with @query_budget"""
+        if not QueryBudget.enabled():
+            return
+        for instrumented in (engine, *replicas):
+            QueryBudget.instrument_engine(instrumented)
+
+        @app.before_request
+        def open_request_scope():
+            view = app.view_functions.get(request.endpoint)
+            g.query_scope = QueryBudget.open(
+                f"{request.method} {request.path}", getattr(view, 'query_budget', None)
+            )
+
+        @app.after_request
+        def close_request_scope(response):
+            opened = g.pop('query_scope', None)
+            if opened is None:
+                return response
+
+            scope, token = opened
+            try:
+                QueryBudget.close(scope, token)
+            except QueryBudgetExceeded as e:
+                response = jsonify({'error': str(e)})
+                response.status_code = 500
+            response.headers['X-DB-Statements'] = str(scope.count)
+            response.headers['X-DB-Repeated-Statements'] = str(scope.repeated)
+            return response
+
+        @app.teardown_request
+        def discard_request_scope(exc):
+            opened = g.pop('query_scope', None)
+            if opened is not None:
+                _scopes.reset(opened[1])
+
+
+def query_budget(limit):
+    """Declare the statement budget of a view function"""
+    def decorator(fn):
+        fn.query_budget = limit
+        return fn
+    return decorator
+
+
+def budgeted_methods(cls):
+    """
+    Class decorator counting statements per call of each static method and
+    checking them against the class's QUERY_BUDGETS {method name: limit}
+    """
+    if not QueryBudget.enabled():
+        return cls
+
+    budgets = getattr(cls, 'QUERY_BUDGETS', {})
+    for name, member in list(vars(cls).items()):
+        if isinstance(member, staticmethod) and not name.startswith('__'):
+            setattr(cls, name, staticmethod(
+                _budgeted(f"{cls.__name__}.{name}", budgets.get(name), member.__func__)
+            ))
+    return cls
+
+
+def _budgeted(label, budget, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        scope, token = QueryBudget.open(label, budget)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            _scopes.reset(token)
+            raise
+        QueryBudget.close(scope, token)
+        return result
+    return wrapper
@@ -0,0 +1,173 @@
+"""
+Query plan regression check
+
+Captures every statement issued by the RiskEngine helpers and the read
+routes against a seeded local database, runs EXPLAIN on each with
+sequential scans disabled and fails if any plan still scans a table
+without using an index for its predicates.
+
+Usage (from backend/, after seeding with utils.synthetic_data or MockDataGenerator):
+    python -m utils.query_plans
+"""
+import json
+import sys
+from sqlalchemy import event, select, func
+
+class QueryPlanChecker:
+    """Runs EXPLAIN over captured statements and reports full table scans"""
+
+    # Tiny reference tables where a full scan is the right plan
+    ALLOW_FULL_SCAN = {'shops', 'schema_migrations'}
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.captured = []
+
+    def capture(self, label, fn):
+        """Run fn and record the SQL it executes under the given label"""
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if executemany or not statement.lstrip().upper().startswith(
+                    ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')):
+                return
+            self.captured.append((label, statement, parameters))
+
+        event.listen(self.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            fn()
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', before_cursor_execute)
+
+    @staticmethod
+    def offending_nodes(plan):
+        """
+        Walk an EXPLAIN (FORMAT JSON) plan tree and return scans that read a
+        whole relation to evaluate a predicate: sequential scans, and index
+        scans used only for ordering with the predicate left as a Filter
+        """
+        offending = []
+        stack = [plan]
+        while stack:
+            node = stack.pop()
+            relation = node.get('Relation Name')
+            node_type = node.get('Node Type')
+
+            if relation and relation not in QueryPlanChecker.ALLOW_FULL_SCAN:
+                if node_type == 'Seq Scan':
+                    offending.append(f"Seq Scan on {relation}")
+                elif (node_type in ('Index Scan', 'Index Only Scan')
+                      and 'Index Cond' not in node and 'Filter' in node):
+                    offending.append(
+                        f"{node_type} on {relation} without index condition "
+                        f"(Filter: {node['Filter']})"
+                    )
+
+            stack.extend(node.get('Plans', []))
+        return offending
+
+    def check(self):
+        """
+        EXPLAIN every captured statement
+        Returns a list of (label, statement, offending_nodes) failures
+        """
+        failures = []
+        seen = set()
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute("SET enable_seqscan = off")
+            for label, statement, parameters in self.captured:
+                key = (label, statement)
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+
+                offending = self.offending_nodes(plan[0]['Plan'])
+                if offending:
+                    failures.append((label, statement, offending))
+            raw.rollback()
+        finally:
+            raw.close()
+        return failures
+
+
+def run_checks():
+    """Exercise the engine and read routes, then check their plans"""
+    from app import app
+    from database import engine, Session
+    from models import User, Transaction, Incident
+    from risk_engine import RiskEngine
+    from activity_tracker import ActivityTracker
+    from datetime import datetime
+
+    checker = QueryPlanChecker(engine)
+
+    db = Session()
+    user_id = db.execute(
+        select(Transaction.user_id)
+        .group_by(Transaction.user_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    ).scalar()
+    if user_id is None:
+        print("❌ No transactions found; seed the database first")
+        sys.exit(2)
+
+    aadhaar = db.execute(select(User.aadhaar_mock).where(User.user_id == user_id)).scalar()
+    transaction_id = db.execute(select(func.max(Transaction.transaction_id))).scalar()
+    incident_id = db.execute(select(func.max(Incident.incident_id))).scalar() or 1
+
+    # Engine helpers run in one transaction that is rolled back afterwards
+    engine_calls = {
+        'RiskEngine.calculate_risk_score': lambda: RiskEngine.calculate_risk_score(user_id, db),
+        'RiskEngine.detect_bulk_buying_pattern': lambda: RiskEngine.detect_bulk_buying_pattern(user_id, db),
+        'RiskEngine.detect_time_pattern': lambda: RiskEngine.detect_time_pattern(user_id, db),
+        'RiskEngine.check_daily_limit': lambda: RiskEngine.check_daily_limit(user_id, 1.0, db),
+        'RiskEngine.reserve_daily_units': lambda: RiskEngine.reserve_daily_units(user_id, 1.0, db),
+        'RiskEngine.update_daily_limit': lambda: (RiskEngine.update_daily_limit(user_id, 1.0, db), db.flush()),
+        'ActivityTracker.record_purchase': lambda: ActivityTracker.record_purchase(
+            user_id, 1.0, 750, datetime.utcnow(), db),
+    }
+    for label, call in engine_calls.items():
+        checker.capture(label, call)
+    db.rollback()
+    Session.remove()
+
+    routes = [
+        '/api/users/',
+        f'/api/users/{user_id}',
+        f'/api/users/aadhaar/{aadhaar}',
+        '/api/users/?risk_level=Red',
+        f'/api/transactions/{transaction_id}',
+        f'/api/transactions/user/{user_id}',
+        '/api/transactions/recent',
+        '/api/incidents/all',
+        f'/api/incidents/{incident_id}',
+        f'/api/incidents/user/{user_id}',
+        '/api/analytics/dashboard',
+        '/api/analytics/trends/purchases',
+        '/api/analytics/high-risk-users',
+    ]
+    client = app.test_client()
+    for route in routes:
+        checker.capture(f"GET {route}", lambda: client.get(route))
+
+    failures = checker.check()
+    print(f"Checked {len(checker.captured)} statements")
+    for label, statement, offending in failures:
+        print(f"\n❌ {label}")
+        for node in offending:
+            print(f"   {node}")
+        print("   " + " ".join(statement.split()))
+
+    if failures:
+        sys.exit(1)
+    print("✅ No sequential scans on indexed predicates")
+
+
+if __name__ == '__main__':
+    run_checks()
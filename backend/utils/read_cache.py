@@ -0,0 +1,141 @@
+"""
+Conditional GETs and a response cache for registry list endpoints
+
+Writes bump a per-table version in table_versions inside their own
+transaction, so a version can never be lost or become visible apart from
+the rows it covers. Each table's counter is split over
+READ_VERSION_STRIPES rows and a write bumps one at random, so concurrent
+purchases rarely wait on the same row; readers sum the stripes. Views
+decorated with @cached_read('users', ...) read those versions first (one
+index scan), answer If-None-Match and If-Modified-Since with 304 when
+nothing changed, and otherwise serve the body cached for the same path and
+query parameters, running the view only when the versions have moved.
+
+Cached views stay on the primary: a lagging replica would report old
+versions, and a body read from one could be older than the versions it is
+cached under. Cache hits only cost the version lookup.
+
+The versions live in the database so every worker agrees on them; the
+cached bodies are per worker.
+"""
+import functools
+import hashlib
+import random
+from flask import Response, jsonify, make_response, request
+from sqlalchemy import text
+from database import engine, Session
+from replicas import use_primary
+from utils.cache import TTLCache
+from config import Config
+
+# Rows are inserted in sorted order so concurrent bumps of one stripe lock
+# them in the same order. clock_timestamp() rather than now(): a long
+# transaction must not stamp a change earlier than ones already visible
+BUMP_SQL = """
+    INSERT INTO table_versions (table_name, stripe, version, changed_at)
+    SELECT t, :stripe, 1, clock_timestamp() FROM unnest(CAST(:tables AS varchar[])) AS t
+    ON CONFLICT (table_name, stripe) DO UPDATE SET
+        version = table_versions.version + 1,
+        changed_at = EXCLUDED.changed_at
+"""
+
+
+class TableVersions:
+    """Change counters for the tables behind cached reads"""
+
+    @staticmethod
+    def current(db_session, tables):
+        """
+        Current version of each table, always read from the primary
+        Returns: {table: (version, changed_at)}
+        """
+        rows = db_session.execute(text("""
+            SELECT table_name, SUM(version) AS version, MAX(changed_at) AS changed_at
+            FROM table_versions
+            WHERE table_name = ANY(CAST(:tables AS varchar[]))
+            GROUP BY table_name
+        """), {'tables': list(tables)}, bind_arguments={'bind': engine})
+        return {row.table_name: (row.version, row.changed_at) for row in rows}
+
+    @staticmethod
+    def bump(db_session, *tables):
+        """
+        Mark tables as changed in the caller's transaction; call once per
+        transaction, before its commit
+        """
+        db_session.execute(text(BUMP_SQL), {
+            'stripe': random.randrange(Config.READ_VERSION_STRIPES),
+            'tables': sorted(set(tables))
+        })
+
+
+class ReadCache:
+    """Rendered bodies keyed by path and query parameters, tagged with their ETag"""
+
+    _cache = TTLCache(maxsize=Config.READ_CACHE_SIZE, ttl=Config.READ_CACHE_TTL)
+
+    @staticmethod
+    def key():
+        return (request.path, tuple(sorted(request.args.items(multi=True))))
+
+    @staticmethod
+    def validators(versions, tables):
+        """
+        ETag and Last-Modified for the given table versions
+        Returns: (etag, last_modified or None)
+        """
+        state = [(table, *versions.get(table, (0, None))) for table in sorted(tables)]
+        etag = hashlib.blake2b(repr(state).encode(), digest_size=12).hexdigest()
+        changed = [changed_at for _, _, changed_at in state if changed_at is not None]
+        return etag, max(changed) if changed else None
+
+    @staticmethod
+    def not_modified(etag, last_modified):
+        """If-None-Match wins over If-Modified-Since when both are sent"""
+        if request.if_none_match:
+            return request.if_none_match.contains(etag)
+        if last_modified is not None and request.if_modified_since is not None:
+            return last_modified.replace(microsecond=0) <= request.if_modified_since
+        return False
+
+    @staticmethod
+    def stats():
+        return ReadCache._cache.stats()
+
+
+def cached_read(*tables):
+    """Serve a GET view conditionally on the versions of the tables it reads"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                db = Session()
+                versions = TableVersions.current(db, tables)
+            except Exception as e:
+                Session.remove()
+                return jsonify({'error': str(e)}), 500
+
+            etag, last_modified = ReadCache.validators(versions, tables)
+            if ReadCache.not_modified(etag, last_modified):
+                db.close()
+                response = Response(status=304)
+            else:
+                key = ReadCache.key()
+                cached = ReadCache._cache.get(key)
+                if cached is not None and cached[0] == etag:
+                    db.close()
+                    response = Response(cached[1], mimetype=cached[2])
+                else:
+                    # Versions were read first, so the body is at least as new as the ETag
+                    response = make_response(fn(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    ReadCache._cache.set(key, (etag, response.get_data(), response.mimetype))
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return use_primary(wrapper)
+    return decorator
@@ -0,0 +1,509 @@
+"""
+Seeded synthetic data generator for benchmark databases
+
+Generates users, shops, transactions and incidents with numpy and streams
+them into Postgres with COPY in fixed-size chunks, so millions of users and
+hundreds of millions of transactions load without building ORM objects.
+Every chunk draws from its own seed derived from (seed, table, chunk), so
+the same seed, scale and end date always produce the same rows.
+
+Distributions:
+    - purchase frequency per user is heavy-tailed (lognormal)
+    - shops and users are skewed towards the large districts
+    - most purchases happen at the user's home shop
+    - purchases peak in the evening, with a thin late-night tail
+    - a small share of users are bulk buyers of large quantities
+    - incidents concentrate on heavy users, and offenders repeat
+    - no user exceeds DAILY_UNIT_LIMIT on a day: purchases are admitted in
+      time order per (user, limit day) as bulk ingest does, and the rest
+      are dropped, since /log and /bulk would refuse them
+
+Scale factor 1 is 10,000 users, 50 shops, 1,000,000 drawn transactions
+(somewhat fewer after the daily limit) and about 2,000 incidents;
+everything scales linearly.
+
+Usage (from backend/):
+    python -m utils.synthetic_data --scale 1 --seed 42 --reset
+    python -m utils.synthetic_data --scale 100 --end-date 2026-01-31 --reset
+"""
+import argparse
+import csv
+import io
+import sys
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+from sqlalchemy import text
+from utils.clock import utc_offset
+from config import Config
+
+class SyntheticDataGenerator:
+    """Deterministic, vectorised data generation streamed through COPY"""
+
+    USERS_PER_SCALE = 10_000
+    SHOPS_PER_SCALE = 50
+    TRANSACTIONS_PER_SCALE = 1_000_000
+    OFFENDERS_PER_SCALE = 1_200
+
+    # Rows per COPY chunk; also the unit of seeding, so changing it changes the data
+    CHUNK_ROWS = 250_000
+
+    HISTORY_DAYS = 90
+    INCIDENT_DAYS = 365
+    HOME_SHOP_SHARE = 0.8
+    BULK_BUYER_SHARE = 0.02
+
+    TABLE_SEEDS = {'users': 1, 'shops': 2, 'transactions': 3, 'incidents': 4, 'profiles': 5}
+
+    # (district, weight, latitude, longitude)
+    DISTRICTS = [
+        ('Chennai', 0.22, 13.08, 80.27),
+        ('Coimbatore', 0.13, 11.02, 76.96),
+        ('Madurai', 0.11, 9.93, 78.12),
+        ('Trichy', 0.09, 10.79, 78.70),
+        ('Salem', 0.09, 11.66, 78.15),
+        ('Tirunelveli', 0.08, 8.71, 77.76),
+        ('Vellore', 0.08, 12.92, 79.13),
+        ('Erode', 0.07, 11.34, 77.72),
+        ('Thanjavur', 0.07, 10.79, 79.14),
+        ('Kanchipuram', 0.06, 12.83, 79.70),
+    ]
+
+    # Relative purchase volume by hour of day: evening peak, thin night tail
+    HOUR_WEIGHTS = [
+        0.6, 0.3, 0.2, 0.1, 0.1, 0.2, 0.3, 0.4, 0.6, 0.8, 1.0, 1.5,
+        2.5, 3.0, 3.0, 3.2, 3.8, 5.0, 7.5, 9.0, 9.5, 8.0, 4.0, 1.5
+    ]
+
+    # Relative volume by weekday (Monday first): Friday and Saturday peak
+    WEEKDAY_WEIGHTS = [0.9, 0.85, 0.9, 0.95, 1.3, 1.5, 1.2]
+
+    # (type, weight, abv, brands, price per 750ml range)
+    PRODUCTS = [
+        ('Brandy', 0.30, 40.0, ['Mansion House', 'Honey Bee', 'McDowell'], (400, 1800)),
+        ('Beer', 0.25, 5.0, ['Kingfisher', 'Tuborg', 'Carlsberg'], (150, 300)),
+        ('Whiskey', 0.22, 42.8, ['Royal Stag', 'McDowell', 'Officers Choice'], (500, 2000)),
+        ('Rum', 0.15, 42.8, ['Old Monk', 'Bacardi', 'McDowell'], (400, 1500)),
+        ('Vodka', 0.08, 40.0, ['Magic Moments', 'Smirnoff', 'Absolut'], (600, 2500)),
+    ]
+
+    QUANTITIES = [180, 375, 750, 1000]
+    QUANTITY_WEIGHTS = [0.45, 0.30, 0.20, 0.05]
+    BULK_QUANTITIES = [750, 1000, 2000, 3000, 5000]
+    BULK_QUANTITY_WEIGHTS = [0.15, 0.25, 0.30, 0.20, 0.10]
+
+    PAYMENT_METHODS = ['Cash', 'UPI', 'Card']
+    PAYMENT_WEIGHTS = [0.55, 0.35, 0.10]
+
+    INCIDENT_TYPES = ['Public Disturbance', 'DUI', 'Violence', 'Assault', 'Domestic Violence']
+    INCIDENT_WEIGHTS = [0.35, 0.25, 0.18, 0.12, 0.10]
+    SEVERITIES = ['Low', 'Medium', 'High']
+    SEVERITY_WEIGHTS = [0.5, 0.35, 0.15]
+    REPORTERS = ['Police', 'Shop Manager', 'Public']
+
+    FIRST_NAMES = [
+        'Arun', 'Bala', 'Dinesh', 'Ganesh', 'Hari', 'Karthik', 'Kumar', 'Manoj',
+        'Murugan', 'Prakash', 'Rajesh', 'Ramesh', 'Sanjay', 'Senthil', 'Suresh',
+        'Vijay', 'Anitha', 'Devi', 'Kavitha', 'Lakshmi', 'Meena', 'Priya', 'Revathi', 'Selvi'
+    ]
+    LAST_NAMES = [
+        'Subramanian', 'Krishnan', 'Raman', 'Natarajan', 'Pandian', 'Rajan',
+        'Shanmugam', 'Sundaram', 'Venkatesan', 'Velu', 'Murthy', 'Annamalai'
+    ]
+    STREETS = ['Gandhi Road', 'Anna Salai', 'Kamarajar Street', 'Nehru Nagar', 'Periyar Street', 'Main Road']
+
+    def __init__(self, engine, scale=1.0, seed=42, end_date=None):
+        self.engine = engine
+        self.scale = scale
+        self.seed = seed
+        self.end_date = end_date or date.today()
+
+        self.user_count = max(1, int(self.USERS_PER_SCALE * scale))
+        self.shop_count = max(len(self.DISTRICTS), int(self.SHOPS_PER_SCALE * scale))
+        self.transaction_count = int(self.TRANSACTIONS_PER_SCALE * scale)
+        self.offender_count = max(1, int(self.OFFENDERS_PER_SCALE * scale))
+
+        self.user_offset = 0
+        self.shop_offset = 0
+
+        # limit_day() counts a UTC transaction_date against the server's local
+        # day; generated history uses the current UTC offset throughout
+        self.utc_offset = int(utc_offset().total_seconds())
+
+    def rng(self, table, chunk=0):
+        """Generator seeded from (seed, table, chunk), independent of load order"""
+        return np.random.default_rng([self.seed, self.TABLE_SEEDS[table], chunk])
+
+    @staticmethod
+    def weights(values):
+        values = np.asarray(values, dtype=float)
+        return values / values.sum()
+
+    def copy(self, table, columns, rows):
+        """Stream rows into table with COPY ... FROM STDIN"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+
+        raw = self.engine.raw_connection()
+        try:
+            with raw.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            raw.commit()
+        finally:
+            raw.close()
+
+    def reset(self):
+        """Empty every table the generator or its derived rebuilds write to"""
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+                TRUNCATE users, shops, transactions, incidents, daily_limits,
+                         pattern_flags, alerts, user_activity, purchase_rollups
+                RESTART IDENTITY CASCADE
+            """))
+
+    def resolve_offsets(self):
+        """Append after existing rows so explicit ids never collide"""
+        with self.engine.connect() as conn:
+            self.user_offset = conn.execute(text("SELECT COALESCE(MAX(user_id), 0) FROM users")).scalar()
+            self.shop_offset = conn.execute(text("SELECT COALESCE(MAX(shop_id), 0) FROM shops")).scalar()
+
+    def sync_sequences(self):
+        """Move serial sequences past the explicitly numbered rows"""
+        with self.engine.begin() as conn:
+            for table, column in (('users', 'user_id'), ('shops', 'shop_id')):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+                    f"(SELECT COALESCE(MAX({column}), 1) FROM {table}))"
+                ))
+
+    def build_profiles(self):
+        """
+        Per-shop and per-user attributes that transactions and incidents draw
+        on: shop districts, user home shops, purchase propensity and bulk buyers
+        """
+        rng = self.rng('profiles')
+        district_weights = self.weights([d[1] for d in self.DISTRICTS])
+
+        # Every district gets at least one shop; the rest follow the skew
+        shop_district = np.concatenate([
+            np.arange(len(self.DISTRICTS)),
+            rng.choice(len(self.DISTRICTS), self.shop_count - len(self.DISTRICTS), p=district_weights)
+        ])
+        self.shop_district = shop_district
+        self.shop_weight = rng.lognormal(0, 0.5, self.shop_count)
+        self.shop_cdf = np.cumsum(self.weights(self.shop_weight))
+
+        # Home shop: a shop in the user's district, weighted by shop size
+        user_district = rng.choice(len(self.DISTRICTS), self.user_count, p=district_weights)
+        home_shop = np.empty(self.user_count, dtype=np.int64)
+        for d in range(len(self.DISTRICTS)):
+            members = np.flatnonzero(user_district == d)
+            shops = np.flatnonzero(shop_district == d)
+            home_shop[members] = shops[rng.choice(
+                len(shops), len(members), p=self.weights(self.shop_weight[shops])
+            )]
+        self.home_shop = home_shop
+
+        # Heavy-tailed purchase propensity; the top few percent buy most
+        propensity = rng.lognormal(0, 1.3, self.user_count)
+        self.user_cdf = np.cumsum(self.weights(propensity))
+        self.propensity = propensity
+        self.bulk_buyer = rng.random(self.user_count) < self.BULK_BUYER_SHARE
+
+    def generate_shops(self):
+        rng = self.rng('shops')
+        ids = np.arange(self.shop_count) + self.shop_offset + 1
+        names = [self.DISTRICTS[d][0] for d in self.shop_district]
+        latitude = np.round(
+            np.array([self.DISTRICTS[d][2] for d in self.shop_district]) + rng.normal(0, 0.05, self.shop_count), 6
+        )
+        longitude = np.round(
+            np.array([self.DISTRICTS[d][3] for d in self.shop_district]) + rng.normal(0, 0.05, self.shop_count), 6
+        )
+        # Purchases are located at their shop
+        self.shop_latitude, self.shop_longitude = latitude, longitude
+        pincodes = rng.integers(600001, 643253, self.shop_count)
+        streets = rng.choice(self.STREETS, self.shop_count)
+
+        rows = (
+            (int(shop_id), f"TASMAC {district} Shop {shop_id}", f"{street}, {district}", district,
+             str(pincode), float(lat), float(lon), f"TN-SYN-{shop_id:07d}")
+            for shop_id, district, street, pincode, lat, lon
+            in zip(ids, names, streets, pincodes, latitude, longitude)
+        )
+        self.copy('shops', [
+            'shop_id', 'shop_name', 'location', 'district', 'pincode',
+            'latitude', 'longitude', 'license_number'
+        ], rows)
+        return self.shop_count
+
+    def generate_users(self):
+        registered_since = datetime.combine(self.end_date, datetime.min.time()) - timedelta(days=730)
+
+        for chunk, start in enumerate(range(0, self.user_count, self.CHUNK_ROWS)):
+            rng = self.rng('users', chunk)
+            n = min(self.CHUNK_ROWS, self.user_count - start)
+            index = np.arange(start, start + n)
+            ids = index + self.user_offset + 1
+
+            # A multiplicative bijection keeps Aadhaar numbers unique but unordered
+            aadhaar = (ids.astype(np.int64) * 7919 + 123456789) % 900_000_000_000 + 100_000_000_000
+            first = rng.choice(self.FIRST_NAMES, n)
+            last = rng.choice(self.LAST_NAMES, n)
+            ages = np.clip(18 + rng.gamma(3.0, 7.0, n), 18, 80).astype(int)
+            doors = rng.integers(1, 300, n)
+            streets = rng.choice(self.STREETS, n)
+            phones = rng.integers(6_000_000_000, 9_999_999_999, n)
+            registered = rng.integers(0, 730 * 86400, n)
+
+            rows = (
+                (int(user_id), str(a), f"{f} {l}", int(age),
+                 f"{door} {street}, {self.DISTRICTS[self.shop_district[shop]][0]}", str(phone),
+                 (registered_since + timedelta(seconds=int(s))).isoformat(sep=' '),
+                 0.0, 'Green', False, 0, 0.0)
+                for user_id, a, f, l, age, door, street, shop, phone, s
+                in zip(ids, aadhaar, first, last, ages, doors, streets, self.home_shop[index], phones, registered)
+            )
+            self.copy('users', [
+                'user_id', 'aadhaar_mock', 'name', 'age', 'address', 'phone', 'registration_date',
+                'risk_score', 'risk_level', 'is_blocked', 'total_purchases', 'total_units_consumed'
+            ], rows)
+        return self.user_count
+
+    def generate_transactions(self, progress=None):
+        types = self.PRODUCTS
+        type_weights = self.weights([p[1] for p in types])
+        abv = np.array([p[2] for p in types])
+        price_low = np.array([p[4][0] for p in types], dtype=float)
+        price_high = np.array([p[4][1] for p in types], dtype=float)
+        hour_weights = self.weights(self.HOUR_WEIGHTS)
+
+        # Day offsets back from the end date, weighted by weekday
+        days = np.arange(self.HISTORY_DAYS)
+        weekday = np.array([(self.end_date - timedelta(days=int(d))).weekday() for d in days])
+        day_weights = self.weights(np.array(self.WEEKDAY_WEIGHTS)[weekday])
+        day_start = np.array([
+            np.datetime64(self.end_date - timedelta(days=int(d))) for d in days
+        ]).astype('datetime64[s]')
+
+        # Units already admitted per (user, limit day), in hundredths; the
+        # offset can move a purchase one day either side of the history
+        self.first_limit_day = np.datetime64(self.end_date - timedelta(days=self.HISTORY_DAYS), 'D')
+        self.limit_days = self.HISTORY_DAYS + 2
+        self.unit_limit = int(round(Config.DAILY_UNIT_LIMIT * 100))
+        self.admitted_units = np.zeros(
+            self.user_count * self.limit_days,
+            dtype=np.uint16 if self.unit_limit <= np.iinfo(np.uint16).max else np.int32
+        )
+        admitted_total = 0
+
+        for chunk, start in enumerate(range(0, self.transaction_count, self.CHUNK_ROWS)):
+            rng = self.rng('transactions', chunk)
+            n = min(self.CHUNK_ROWS, self.transaction_count - start)
+
+            users = np.minimum(np.searchsorted(self.user_cdf, rng.random(n)), self.user_count - 1)
+            away = rng.random(n) >= self.HOME_SHOP_SHARE
+            shops = self.home_shop[users]
+            shops[away] = np.minimum(np.searchsorted(self.shop_cdf, rng.random(away.sum())), self.shop_count - 1)
+
+            when = (
+                day_start[rng.choice(len(days), n, p=day_weights)]
+                + rng.choice(24, n, p=hour_weights) * np.timedelta64(3600, 's')
+                + rng.integers(0, 3600, n) * np.timedelta64(1, 's')
+            )
+
+            product = rng.choice(len(types), n, p=type_weights)
+            brand = rng.integers(0, 3, n)
+            bulk = self.bulk_buyer[users] & (rng.random(n) < 0.6)
+            quantity = np.where(
+                bulk,
+                rng.choice(self.BULK_QUANTITIES, n, p=self.BULK_QUANTITY_WEIGHTS),
+                rng.choice(self.QUANTITIES, n, p=self.QUANTITY_WEIGHTS)
+            )
+            units = np.round(quantity * abv[product] / 1000, 2)
+            amount = np.round(
+                quantity / 750 * rng.uniform(price_low[product], price_high[product]), 2
+            )
+            payment = rng.choice(self.PAYMENT_METHODS, n, p=self.PAYMENT_WEIGHTS)
+
+            keep = self.admit(users, when, units)
+            users, shops, when, product, brand = users[keep], shops[keep], when[keep], product[keep], brand[keep]
+            quantity, units, amount, payment = quantity[keep], units[keep], amount[keep], payment[keep]
+            admitted_total += len(keep)
+
+            user_ids = users + self.user_offset + 1
+            shop_ids = shops + self.shop_offset + 1
+            rows = (
+                (int(u), int(s), str(w).replace('T', ' '), types[p][0], types[p][3][b],
+                 int(q), float(un), types[p][2], float(a), pm, float(lat), float(lon))
+                for u, s, w, p, b, q, un, a, pm, lat, lon
+                in zip(user_ids, shop_ids, when, product, brand, quantity, units, amount, payment,
+                       self.shop_latitude[shops], self.shop_longitude[shops])
+            )
+            self.copy('transactions', [
+                'user_id', 'shop_id', 'transaction_date', 'alcohol_type', 'brand', 'quantity_ml',
+                'units', 'abv_percentage', 'amount_paid', 'payment_method', 'latitude', 'longitude'
+            ], rows)
+
+            if progress:
+                progress(start + n, self.transaction_count)
+        return admitted_total
+
+    def admit(self, users, when, units):
+        """
+        Apply the daily limit to one chunk of purchases, in time order per
+        (user, limit day) on top of what earlier chunks admitted
+        Returns the indices of the admitted purchases, in generated order
+        """
+        day = (when + np.timedelta64(self.utc_offset, 's')).astype('datetime64[D]') - self.first_limit_day
+        keys = users * self.limit_days + day.astype(np.int64)
+        hundredths = np.rint(units * 100).astype(np.int64)
+
+        order = np.lexsort((when, keys))
+        sorted_keys, sorted_units = keys[order], hundredths[order]
+
+        # Running total within each key; units are positive, so once a
+        # purchase does not fit none after it fits as a prefix either
+        running = np.cumsum(sorted_units)
+        group_start = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+        before_group = np.maximum.accumulate(np.where(group_start, running - sorted_units, 0))
+        fits = self.admitted_units[sorted_keys] + (running - before_group) <= self.unit_limit
+        np.add.at(self.admitted_units, sorted_keys[fits], sorted_units[fits])
+
+        # Past a key's first refusal, smaller later purchases may still fit
+        admitted = fits.copy()
+        for i in np.flatnonzero(~fits):
+            key = sorted_keys[i]
+            if self.admitted_units[key] + sorted_units[i] <= self.unit_limit:
+                self.admitted_units[key] += sorted_units[i]
+                admitted[i] = True
+        return np.sort(order[admitted])
+
+    def generate_incidents(self):
+        rng = self.rng('incidents')
+
+        # Offenders skew towards heavy users; each has one or more incidents
+        offender_weights = self.weights(self.propensity ** 1.5)
+        offenders = np.unique(np.minimum(
+            np.searchsorted(np.cumsum(offender_weights), rng.random(self.offender_count)),
+            self.user_count - 1
+        ))
+        repeats = rng.geometric(0.55, len(offenders))
+        users = np.repeat(offenders, repeats)
+        n = len(users)
+
+        dates = [self.end_date - timedelta(days=int(d)) for d in rng.integers(0, self.INCIDENT_DAYS, n)]
+        types = rng.choice(self.INCIDENT_TYPES, n, p=self.INCIDENT_WEIGHTS)
+        severities = rng.choice(self.SEVERITIES, n, p=self.SEVERITY_WEIGHTS)
+        reporters = rng.choice(self.REPORTERS, n)
+        reports = rng.integers(1000, 99999, n)
+
+        rows = (
+            (int(u + self.user_offset + 1), t, d.isoformat(),
+             self.DISTRICTS[self.shop_district[self.home_shop[u]]][0],
+             f"FIR{r}/{d.year}", f"{t} reported by {rep}", sev, rep)
+            for u, t, d, r, sev, rep in zip(users, types, dates, reports, severities, reporters)
+        )
+        self.copy('incidents', [
+            'user_id', 'incident_type', 'incident_date', 'location',
+            'police_report_number', 'description', 'severity', 'reported_by'
+        ], rows)
+        return n
+
+    def derive(self):
+        """Rebuild everything the write path normally maintains incrementally"""
+        from database import Session
+        from activity_tracker import ActivityTracker
+        from rollups import PurchaseRollups
+        from risk_batch import BatchRiskScorer
+
+        db = Session()
+        try:
+            # Dates are limit days: the server-local day of the UTC transaction_date
+            offset = {'offset': self.utc_offset}
+            db.execute(text("""
+                UPDATE users AS u
+                SET total_purchases = t.purchases,
+                    total_units_consumed = t.units,
+                    last_purchase_date = t.last_date
+                FROM (
+                    SELECT user_id, COUNT(*) AS purchases, SUM(units) AS units,
+                           MAX(transaction_date + make_interval(secs => :offset))::date AS last_date
+                    FROM transactions GROUP BY user_id
+                ) AS t
+                WHERE u.user_id = t.user_id
+            """), offset)
+            db.execute(text("""
+                INSERT INTO daily_limits (user_id, date, total_units_today, purchase_count_today)
+                SELECT user_id, (transaction_date + make_interval(secs => :offset))::date, SUM(units), COUNT(*)
+                FROM transactions GROUP BY 1, 2
+                ON CONFLICT (user_id, date) DO UPDATE SET
+                    total_units_today = EXCLUDED.total_units_today,
+                    purchase_count_today = EXCLUDED.purchase_count_today
+            """), offset)
+            db.commit()
+
+            buckets = ActivityTracker.rebuild(db)
+            rollups = PurchaseRollups.rebuild(db)
+            risk = BatchRiskScorer.rescore_all(db)
+        finally:
+            db.close()
+        return {'activity_buckets': buckets, 'rollup_buckets': rollups, 'risk': risk}
+
+    def generate(self, reset=False, derive=True, progress=None):
+        """Build the full dataset; returns row counts and timings"""
+        started = time.perf_counter()
+        if reset:
+            self.reset()
+        self.resolve_offsets()
+        self.build_profiles()
+
+        summary = {
+            'scale': self.scale,
+            'seed': self.seed,
+            'end_date': self.end_date.isoformat(),
+            'shops': self.generate_shops(),
+            'users': self.generate_users(),
+        }
+        self.sync_sequences()
+        summary['transactions'] = self.generate_transactions(progress)
+        summary['incidents'] = self.generate_incidents()
+
+        if derive:
+            summary['derived'] = self.derive()
+
+        from utils.read_cache import TableVersions
+        with self.engine.begin() as conn:
+            TableVersions.bump(conn, 'users', 'transactions', 'incidents')
+        summary['duration_seconds'] = round(time.perf_counter() - started, 1)
+        return summary
+
+
+if __name__ == '__main__':
+    from database import engine
+
+    parser = argparse.ArgumentParser(description='Generate a seeded benchmark dataset')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='1 = 10k users / 1M transactions; 100 = 1M users / 100M transactions')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', type=date.fromisoformat, default=None,
+                        help='Last day of generated history (default: today)')
+    parser.add_argument('--reset', action='store_true', help='Truncate generated tables first')
+    parser.add_argument('--no-derive', action='store_true',
+                        help='Skip rebuilding daily limits, activity, rollups and risk scores')
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(engine, args.scale, args.seed, args.end_date)
+
+    def progress(done, total):
+        print(f"   transactions {done:,}/{total:,}", end='\r', file=sys.stderr)
+
+    print(f"🚀 Generating scale {args.scale} (seed {args.seed})...")
+    summary = generator.generate(reset=args.reset, derive=not args.no_derive, progress=progress)
+    print()
+    print(f"✅ {summary['users']:,} users, {summary['shops']:,} shops, "
+          f"{summary['transactions']:,} transactions, {summary['incidents']:,} incidents "
+          f"in {summary['duration_seconds']}s")
@@ -16,7 +16,10 @@ function App() {
 
   useEffect(() => {
     // Connect to WebSocket
-    const newSocket = io('https://tasmac-safeguard-system-production.up.railway.app');
+    const newSocket = io('https://tasmac-safeguard-system-production.up.railway.app', {
+      // Websocket first: multi-worker deployments without sticky sessions reject polling
+      transports: ['websocket', 'polling']
+    });
     
     newSocket.on('connect', () => {
       console.log('Connected to server');
@@ -20,15 +20,9 @@ function AadhaarScanner({ onUserVerified }) {
     setError(null);
 
     try {
-      // Fetch all users and find by Aadhaar
-      const response = await api.get('/api/users/');
-      const user = response.data.users.find(u => u.aadhaar_mock === aadhaar);
-
-      if (!user) {
-        setError('User not found. Please register at TASMAC office.');
-        setLoading(false);
-        return;
-      }
+      // Look up the user by Aadhaar
+      const response = await api.get(`/api/users/aadhaar/${aadhaar}`);
+      const user = response.data;
 
       // Simulate card scan delay for realism
       setTimeout(() => {
@@ -37,7 +31,11 @@ function AadhaarScanner({ onUserVerified }) {
       }, 1500);
 
     } catch (err) {
-      setError('Failed to verify Aadhaar. Please try again.');
+      if (err.response?.status === 404) {
+        setError('User not found. Please register at TASMAC office.');
+      } else {
+        setError('Failed to verify Aadhaar. Please try again.');
+      }
       setLoading(false);
     }
   };
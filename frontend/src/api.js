@@ -4,6 +4,8 @@ const API_URL = process.env.REACT_APP_API_URL || 'https://tasmac-safeguard-syste
 
 export const api = axios.create({
   baseURL: API_URL,
+  // Sends the session cookie that keeps reads on the primary right after a write
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json',
   },
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import api from '../api';
 import { ShoppingCart, Calendar, Wine, DollarSign } from "lucide-react";
 import { Search, UserPlus, Shield, AlertCircle, CheckCircle } from 'lucide-react';
@@ -7,7 +7,9 @@ function PurchaseLog() {
   const [transactions, setTransactions] = useState([]);
   const [loading, setLoading] = useState(true);
   const [showLogForm, setShowLogForm] = useState(false);
+  const [userSearch, setUserSearch] = useState('');
   const [users, setUsers] = useState([]);
+  const latestUserSearch = useRef(0);
   const [shops, setShops] = useState([]);
   const [formData, setFormData] = useState({
     user_id: '',
@@ -22,10 +24,21 @@ function PurchaseLog() {
 
   useEffect(() => {
     fetchTransactions();
-    fetchUsers();
     fetchShops();
   }, []);
 
+  // Look users up by name or Aadhaar prefix as the cashier types
+  useEffect(() => {
+    const term = userSearch.trim();
+    if (term.length < 2) {
+      latestUserSearch.current++;
+      setUsers([]);
+      return;
+    }
+    const timer = setTimeout(() => searchUsers(term), 300);
+    return () => clearTimeout(timer);
+  }, [userSearch]);
+
   const fetchTransactions = async () => {
     try {
       setLoading(true);
@@ -38,9 +51,12 @@ function PurchaseLog() {
     }
   };
 
-  const fetchUsers = async () => {
+  const searchUsers = async (term) => {
+    const searchId = ++latestUserSearch.current;
     try {
-      const response = await api.get('/api/users/');
+      const response = await api.get('/api/users/', { params: { search: term, limit: 20 } });
+      // A slower response for an earlier term must not win
+      if (searchId !== latestUserSearch.current) return;
       setUsers(response.data.users);
     } catch (err) {
       console.error(err);
@@ -74,6 +90,7 @@ function PurchaseLog() {
         payment_method: formData.payment_method,
       });
       setShowLogForm(false);
+      setUserSearch('');
       setFormData({
         user_id: '',
         shop_id: '',
@@ -125,13 +142,23 @@ function PurchaseLog() {
               <label className="block text-sm font-medium text-gray-700 mb-1">
                 User *
               </label>
+              <input
+                type="text"
+                value={userSearch}
+                onChange={(e) => {
+                  setUserSearch(e.target.value);
+                  setFormData({ ...formData, user_id: '' });
+                }}
+                className="w-full px-3 py-2 mb-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-primary"
+                placeholder="Search by name or Aadhaar"
+              />
               <select
                 required
                 value={formData.user_id}
                 onChange={(e) => setFormData({ ...formData, user_id: e.target.value })}
                 className="w-full px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-primary"
               >
-                <option value="">Select User</option>
+                <option value="">{users.length ? 'Select User' : 'Type 2+ characters to search'}</option>
                 {users.map((user) => (
                   <option key={user.user_id} value={user.user_id}>
                     {user.name} ({user.aadhaar_mock})
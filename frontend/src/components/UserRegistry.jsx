@@ -1,14 +1,16 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import api from '../api';
 import { Search, UserPlus, Shield, AlertCircle, CheckCircle } from 'lucide-react';
 
 function UserRegistry() {
   const [users, setUsers] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
   const [filterRisk, setFilterRisk] = useState('');
   const [showAddForm, setShowAddForm] = useState(false);
+  const latestFetch = useRef(0);
   const [formData, setFormData] = useState({
     aadhaar_mock: '',
     name: '',
@@ -17,16 +19,28 @@ function UserRegistry() {
     phone: '',
   });
 
+  // Search runs on the server; wait for a pause in typing before asking
   useEffect(() => {
-    fetchUsers();
-  }, [filterRisk]);
+    const timer = setTimeout(fetchUsers, searchTerm ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [filterRisk, searchTerm]);
+
+  const listParams = () => {
+    const params = {};
+    if (filterRisk) params.risk_level = filterRisk;
+    if (searchTerm.trim()) params.search = searchTerm.trim();
+    return params;
+  };
 
   const fetchUsers = async () => {
+    const fetchId = ++latestFetch.current;
     try {
-      setLoading(true);
-      const params = filterRisk ? { risk_level: filterRisk } : {};
+      const params = listParams();
       const response = await api.get('/api/users/', { params });
+      // A slower response for an earlier search term must not win
+      if (fetchId !== latestFetch.current) return;
       setUsers(response.data.users);
+      setNextCursor(response.data.next_cursor);
       setError(null);
     } catch (err) {
       setError('Failed to fetch users');
@@ -36,6 +50,18 @@ function UserRegistry() {
     }
   };
 
+  const loadMoreUsers = async () => {
+    try {
+      const params = { ...listParams(), cursor: nextCursor };
+      const response = await api.get('/api/users/', { params });
+      setUsers([...users, ...response.data.users]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      setError('Failed to fetch users');
+      console.error(err);
+    }
+  };
+
   const handleRegister = async (e) => {
     e.preventDefault();
     try {
@@ -73,11 +99,6 @@ function UserRegistry() {
     }
   };
 
-  const filteredUsers = users.filter((user) =>
-    user.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    user.aadhaar_mock.includes(searchTerm)
-  );
-
   const getRiskBadge = (riskLevel) => {
     const styles = {
       Green: 'bg-green-100 text-green-800',
@@ -205,7 +226,7 @@ function UserRegistry() {
             <Search className="absolute left-3 top-1/2 transform -translate-y-1/2 text-gray-400 w-5 h-5" />
             <input
               type="text"
-              placeholder="Search by name or Aadhaar..."
+              placeholder="Search by name or Aadhaar prefix..."
               value={searchTerm}
               onChange={(e) => setSearchTerm(e.target.value)}
               className="w-full pl-10 pr-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-primary focus:border-transparent"
@@ -254,7 +275,7 @@ function UserRegistry() {
               </tr>
             </thead>
             <tbody className="bg-white divide-y divide-gray-200">
-              {filteredUsers.map((user) => (
+              {users.map((user) => (
                 <tr key={user.user_id} className="hover:bg-gray-50">
                   <td className="px-6 py-4 whitespace-nowrap">
                     <div className="text-sm font-medium text-gray-900">{user.name}</div>
@@ -313,8 +334,16 @@ function UserRegistry() {
         </div>
       </div>
 
-      <div className="text-sm text-gray-500">
-        Showing {filteredUsers.length} of {users.length} users
+      <div className="flex items-center justify-between text-sm text-gray-500">
+        <span>Showing {users.length} users</span>
+        {nextCursor && (
+          <button
+            onClick={loadMoreUsers}
+            className="px-4 py-2 border border-gray-300 rounded-lg hover:bg-gray-50"
+          >
+            Load more
+          </button>
+        )}
       </div>
     </div>
   );